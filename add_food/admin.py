@@ -1,3 +1,18 @@
 from django.contrib import admin
 
-# Register your models here.
+from add_food.models import EanApiResponse, EanLookupJob
+
+
+@admin.register(EanLookupJob)
+class EanLookupJobAdmin(admin.ModelAdmin):
+    list_display = ("ean_code", "status", "attempts", "created_at", "finished_at")
+    list_filter = ("status",)
+    search_fields = ("ean_code",)
+    readonly_fields = ("id", "product", "created_at", "started_at", "finished_at")
+
+
+@admin.register(EanApiResponse)
+class EanApiResponseAdmin(admin.ModelAdmin):
+    list_display = ("ean_code", "outcome", "hits", "misses", "expires_at")
+    list_filter = ("outcome",)
+    search_fields = ("ean_code",)
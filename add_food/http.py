@@ -0,0 +1,199 @@
+import logging
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger("add_food")
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Сервис недавно падал подряд - запрос не отправляется."""
+
+
+class CircuitBreaker:
+    """
+    Размыкатель цепи: после failure_threshold ошибок подряд запросы к сервису
+    сразу падают с CircuitOpenError в течение reset_timeout секунд. Затем
+    пропускается один пробный запрос: успех замыкает цепь, ошибка - снова
+    размыкает.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self._opened_at is None:
+                return
+            elapsed = time.monotonic() - self._opened_at
+            if elapsed < self.reset_timeout or self._probing:
+                raise CircuitOpenError(f"Circuit {self.name} is open")
+            self._probing = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info(f"[HTTP] Circuit {self.name} closed")
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.error(
+                        f"[HTTP] Circuit {self.name} opened after "
+                        f"{self._failures} failures"
+                    )
+                self._opened_at = time.monotonic()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+
+class RateLimiter:
+    """Токен-бакет: не больше rate запросов в секунду на все потоки."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+    """Отдельный RateLimiter на каждый хост."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, url: str) -> None:
+        host = urlparse(url).netloc
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                limiter = self._limiters[host] = RateLimiter(self.rate, self.burst)
+        limiter.acquire()
+
+
+def build_session() -> requests.Session:
+    """Сессия с пулом keep-alive соединений на хост и повторами с джиттером."""
+    retry = Retry(
+        total=settings.HTTP_MAX_RETRIES,
+        connect=settings.HTTP_MAX_RETRIES,
+        read=settings.HTTP_MAX_RETRIES,
+        status=settings.HTTP_MAX_RETRIES,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET"}),
+        backoff_factor=settings.HTTP_BACKOFF_FACTOR,
+        backoff_jitter=settings.HTTP_BACKOFF_JITTER,
+        respect_retry_after_header=True,
+        # Последний ответ отдаётся вызывающему коду как есть,
+        # 404 и 5xx разбираются в services
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=settings.HTTP_POOL_CONNECTIONS,
+        pool_maxsize=settings.HTTP_POOL_MAXSIZE,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = build_session()
+    return _session
+
+
+_ean_breaker = None
+
+
+def ean_breaker() -> CircuitBreaker:
+    global _ean_breaker
+    if _ean_breaker is None:
+        _ean_breaker = CircuitBreaker(
+            "ean_db",
+            failure_threshold=settings.HTTP_BREAKER_FAILURES,
+            reset_timeout=settings.HTTP_BREAKER_RESET_TIMEOUT,
+        )
+    return _ean_breaker
+
+
+def get(url: str, breaker: CircuitBreaker | None = None, **kwargs):
+    """
+    GET через общую сессию. Таймаут по умолчанию - пара (connect, read)
+    из настроек. Любые ошибки requests и 5xx (после всех повторов) считаются
+    отказом для breaker - иначе пробный запрос полуоткрытой цепи не снимает
+    флаг пробы, и цепь больше не пропускает запросы.
+    """
+    kwargs.setdefault(
+        "timeout", (settings.HTTP_CONNECT_TIMEOUT, settings.HTTP_READ_TIMEOUT)
+    )
+    if breaker is not None:
+        breaker.before_call()
+    try:
+        response = get_session().get(url, **kwargs)
+    except requests.exceptions.RequestException:
+        if breaker is not None:
+            breaker.record_failure()
+        raise
+    if breaker is not None:
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+    return response
@@ -0,0 +1,123 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.utils import timezone
+
+from add_food.models import EanLookupJob
+from add_food.services import (
+    ApiError,
+    add_product,
+    get_or_create_product,
+    schedule_image_download,
+)
+
+logger = logging.getLogger("add_food")
+
+Status = EanLookupJob.Status
+
+
+def enqueue_lookup(ean_code: str) -> EanLookupJob:
+    """
+    Ставит поиск EAN в очередь. Если для штрих-кода уже есть активная
+    задача - возвращает её, а не создаёт вторую.
+    """
+    active = EanLookupJob.objects.filter(
+        ean_code=ean_code, status__in=EanLookupJob.ACTIVE_STATUSES
+    )
+    job = active.first()
+    if job is not None:
+        return job
+    try:
+        with transaction.atomic():
+            job = EanLookupJob.objects.create(ean_code=ean_code)
+    except IntegrityError:
+        # Параллельный запрос успел поставить ту же задачу
+        job = active.get()
+    logger.info(f"[JOB] Enqueued lookup ean={ean_code} job={job.pk}")
+    return job
+
+
+def claim_next_job() -> EanLookupJob | None:
+    """
+    Забирает самую старую задачу из очереди. SKIP LOCKED позволяет
+    запускать несколько обработчиков без двойного выполнения.
+    """
+    with transaction.atomic():
+        job = (
+            EanLookupJob.objects.select_for_update(skip_locked=True)
+            .filter(status=Status.PENDING)
+            .order_by("created_at")
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = Status.RUNNING
+        job.attempts += 1
+        job.started_at = timezone.now()
+        job.save(update_fields=["status", "attempts", "started_at"])
+    return job
+
+
+def _finish(job: EanLookupJob, status: str, product=None, error: str = "") -> None:
+    job.status = status
+    job.product = product
+    job.error = error[:255]
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "product", "error", "finished_at"])
+
+
+def run_job(job: EanLookupJob) -> EanLookupJob:
+    """Выполняет поиск EAN и записывает продукт; итог сохраняется в задаче."""
+    try:
+        api_data = add_product(job.ean_code)
+        product = get_or_create_product(job.ean_code, api_data)
+        schedule_image_download(product, api_data.get("image_url"))
+    except ApiError as error:
+        logger.warning(f"[JOB] Lookup failed ean={job.ean_code} | reason: {error}")
+        _finish(job, Status.FAILED, error=str(error))
+    except DatabaseError:
+        logger.error(f"[JOB] Database error ean={job.ean_code}", exc_info=True)
+        _finish(job, Status.FAILED, error="Ошибка записи данных, попробуйте позже")
+    except Exception:
+        logger.exception(f"[JOB] Unexpected error ean={job.ean_code}")
+        _finish(job, Status.FAILED, error="Непредвиденная ошибка, попробуйте позже")
+    else:
+        logger.info(f"[JOB] Lookup done ean={job.ean_code} product={product.pk}")
+        _finish(job, Status.DONE, product=product)
+    return job
+
+
+def requeue_stale_jobs(timeout_seconds: int, max_attempts: int | None = None) -> int:
+    """
+    Возвращает в очередь задачи, чей обработчик завис или упал. Задачи,
+    исчерпавшие max_attempts попыток, помечаются FAILED - иначе задача,
+    которая роняет обработчик, перезапускалась бы бесконечно.
+    """
+    max_attempts = max_attempts or settings.EAN_JOB_MAX_ATTEMPTS
+    deadline = timezone.now() - timedelta(seconds=timeout_seconds)
+    stale = EanLookupJob.objects.filter(status=Status.RUNNING, started_at__lt=deadline)
+    failed = stale.filter(attempts__gte=max_attempts).update(
+        status=Status.FAILED,
+        error="Обработка не завершилась, попробуйте позже",
+        finished_at=timezone.now(),
+    )
+    if failed:
+        logger.error(f"[JOB] Gave up on {failed} stale lookup jobs")
+    count = stale.update(status=Status.PENDING)
+    if count:
+        logger.warning(f"[JOB] Requeued {count} stale lookup jobs")
+    return count
+
+
+def process_pending(max_jobs: int | None = None) -> int:
+    """Обрабатывает задачи, пока очередь не опустеет. Возвращает их количество."""
+    processed = 0
+    while max_jobs is None or processed < max_jobs:
+        job = claim_next_job()
+        if job is None:
+            break
+        run_job(job)
+        processed += 1
+    return processed
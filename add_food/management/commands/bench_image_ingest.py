@@ -0,0 +1,121 @@
+import io
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from add_food import http
+from add_food.services import download_image
+from food_hub.utils.images import content_path
+
+
+def _buffered_download(url: str) -> bytes:
+    """Прежняя загрузка: bytearray -> BytesIO для verify() -> bytes()."""
+    data = bytearray()
+    with http.get(url, stream=True) as response:
+        for chunk in response.iter_content(8192):
+            data.extend(chunk)
+    with Image.open(io.BytesIO(data)) as img:
+        img.verify()
+    return bytes(data)
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает пиковую память при параллельной загрузке картинок: "
+        "буферизация целиком в памяти против потоковой записи во временный "
+        "файл. Картинку отдаёт локальный HTTP сервер, файлы пишутся во "
+        "временный каталог. Память считает tracemalloc (только Python объекты)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--width", type=int, default=1600)
+        parser.add_argument("--height", type=int, default=1200)
+
+    def handle(self, *args, **options):
+        payload = self._make_jpeg(options["width"], options["height"])
+        self.stdout.write(f"Размер картинки: {len(payload) / 1024:.0f} КБ")
+
+        server = self._serve(payload)
+        url = f"http://127.0.0.1:{server.server_port}/image.jpg"
+        try:
+            with tempfile.TemporaryDirectory() as location:
+                storage = FileSystemStorage(location=location)
+                modes = {
+                    "буфер в памяти": lambda: self._buffered(url, storage),
+                    "потоковая": lambda: self._streaming(url, storage),
+                }
+                self.stdout.write(
+                    f"{'режим':<18}{'пик, МБ':>10}{'на загрузку, МБ':>18}"
+                    f"{'время, мс':>12}"
+                )
+                for name, ingest in modes.items():
+                    peak, elapsed = self._measure(
+                        ingest, options["concurrency"], options["repeat"]
+                    )
+                    self.stdout.write(
+                        f"{name:<18}{peak / 2**20:>10.2f}"
+                        f"{peak / options['concurrency'] / 2**20:>18.2f}"
+                        f"{elapsed * 1000:>12.0f}"
+                    )
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def _buffered(self, url, storage):
+        data = _buffered_download(url)
+        path = content_path(data)
+        if not storage.exists(path):
+            storage.save(path, ContentFile(data))
+
+    def _streaming(self, url, storage):
+        with download_image(url) as image_file:
+            path = content_path(image_file)
+            if not storage.exists(path):
+                storage.save(path, File(image_file, name=path))
+
+    def _measure(self, ingest, concurrency, repeat):
+        tracemalloc.start()
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                for _ in range(repeat):
+                    tracemalloc.reset_peak()
+                    list(pool.map(lambda _: ingest(), range(concurrency)))
+            elapsed = (time.perf_counter() - started) / repeat
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return peak, elapsed
+
+    def _make_jpeg(self, width, height):
+        # Шум почти не сжимается - файл получается размером с фото с камеры
+        bands = [Image.effect_noise((width, height), 64) for _ in range(3)]
+        buffer = io.BytesIO()
+        Image.merge("RGB", bands).save(buffer, "JPEG", quality=90)
+        return buffer.getvalue()
+
+    def _serve(self, payload):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "image/jpeg")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from add_food.models import EanApiResponse
+from add_food.services import api_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Статистика кэша ответов EAN API и очистка устаревших записей"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--purge-expired",
+            action="store_true",
+            help="Удалить записи с истёкшим сроком жизни",
+        )
+
+    def handle(self, *args, **options):
+        if options["purge_expired"]:
+            deleted, _ = EanApiResponse.objects.filter(
+                expires_at__lte=timezone.now()
+            ).delete()
+            self.stdout.write(f"Удалено устаревших записей: {deleted}")
+
+        stats = api_cache_stats()
+        requests_total = stats["hits"] + stats["misses"]
+        hit_ratio = stats["hits"] / requests_total if requests_total else 0
+        self.stdout.write(
+            f"Попаданий: {stats['hits']}, обращений к API: {stats['misses']}, "
+            f"доля попаданий: {hit_ratio:.0%}"
+        )
+        for outcome in EanApiResponse.Outcome:
+            self.stdout.write(f"{outcome.label}: {stats.get(outcome.value, 0)}")
@@ -0,0 +1,63 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from add_food.models import EanApiResponse
+from add_food.services import _image_task, get_square_image
+from food_hub.models import Product
+from food_hub.utils.images import DEFAULT_IMAGE_PATH
+
+
+class Command(BaseCommand):
+    help = (
+        "Догружает картинки продуктов, оставшихся на заглушке. Фоновая загрузка "
+        "после создания продукта живёт в памяти процесса и теряется при его "
+        "перезапуске; адрес картинки берётся из продукта или из кэша ответов API."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.IMAGE_DOWNLOAD_WORKERS,
+            help="Параллельных загрузок",
+        )
+        parser.add_argument(
+            "--limit", type=int, default=None, help="Не больше стольких продуктов"
+        )
+
+    def handle(self, *args, **options):
+        products = Product.objects.filter(img_field=DEFAULT_IMAGE_PATH).order_by("pk")
+        rows = list(
+            products.values_list("pk", "ean_code", "image_url")[: options["limit"]]
+        )
+        # Продукты, созданные до появления image_url, - по сохранённому ответу API
+        without_url = [ean for _, ean, url in rows if not url]
+        cached = {
+            ean: get_square_image(payload or {})
+            for ean, payload in EanApiResponse.objects.filter(
+                ean_code__in=without_url, outcome=EanApiResponse.Outcome.FOUND
+            ).values_list("ean_code", "payload")
+        }
+        tasks = [
+            (pk, ean, url or cached.get(ean))
+            for pk, ean, url in rows
+            if url or cached.get(ean)
+        ]
+
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+            for pk, ean, url in tasks:
+                pool.submit(_image_task, pk, ean, url)
+
+        fetched = (
+            Product.objects.filter(pk__in=[pk for pk, _, _ in tasks])
+            .exclude(img_field=DEFAULT_IMAGE_PATH)
+            .count()
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Готово. На заглушке: {len(rows)}, с адресом картинки: "
+                f"{len(tasks)}, загружено: {fetched}"
+            )
+        )
@@ -0,0 +1,144 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connections
+from django.utils import timezone
+
+from add_food import http
+from add_food.models import EanApiResponse
+from add_food.services import (
+    ApiError,
+    add_product,
+    schedule_image_download,
+    upsert_products,
+)
+from food_hub.models import Product, valid_ean13
+
+
+class Command(BaseCommand):
+    help = (
+        "Импорт товаров по списку EAN из файла или stdin. "
+        "Повторный запуск после сбоя продолжает с того же места: товары уже "
+        "в каталоге пропускаются, ответы API берутся из кэша, каждая пачка "
+        "записывается отдельной транзакцией."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            nargs="?",
+            default="-",
+            help="Файл со штрих-кодами, по одному в строке ('-' - stdin)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.EAN_IMPORT_WORKERS,
+            help="Параллельных запросов к EAN API",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=settings.EAN_IMPORT_RATE,
+            help="Запросов в секунду к хосту EAN API (0 - без ограничения)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Сколько штрих-кодов записывать одной транзакцией",
+        )
+
+    def handle(self, *args, **options):
+        eans, invalid = self._read_eans(options["path"])
+        for line in invalid:
+            self._report(line, "invalid")
+
+        existing = set(
+            Product.objects.filter(ean_code__in=eans).values_list(
+                "ean_code", flat=True
+            )
+        )
+        for ean in eans:
+            if ean in existing:
+                self._report(ean, "exists")
+        pending = [ean for ean in eans if ean not in existing]
+
+        self.limiter = http.HostRateLimiter(options["rate"])
+        self.cached = set(
+            EanApiResponse.objects.filter(
+                ean_code__in=pending, expires_at__gt=timezone.now()
+            ).values_list("ean_code", flat=True)
+        )
+        counts = {"exists": len(existing), "invalid": len(invalid)}
+        batch_size = options["batch_size"]
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+            for start in range(0, len(pending), batch_size):
+                batch = pending[start : start + batch_size]
+                results = pool.map(self._fetch, batch)
+                for outcome in self._write_batch(dict(zip(batch, results))):
+                    counts[outcome] = counts.get(outcome, 0) + 1
+
+        summary = ", ".join(f"{name}: {count}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Готово. {summary}"))
+
+    def _read_eans(self, path):
+        stream = sys.stdin if path == "-" else open(path, encoding="utf-8")
+        try:
+            lines = [line.strip() for line in stream]
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        eans, invalid = [], []
+        for line in dict.fromkeys(filter(None, lines)):
+            try:
+                valid_ean13(line)
+            except ValidationError:
+                invalid.append(line)
+            else:
+                eans.append(line)
+        return eans, invalid
+
+    def _fetch(self, ean):
+        """Выполняется в потоке пула: данные продукта или ApiError."""
+        try:
+            # Ответы из кэша не тратят лимит запросов к API
+            if ean not in self.cached:
+                self.limiter.acquire(settings.EAN_DB_API_URL)
+            return add_product(ean)
+        except ApiError as error:
+            return error
+        finally:
+            connections.close_all()
+
+    def _write_batch(self, results):
+        found = {
+            ean: data for ean, data in results.items() if not isinstance(data, ApiError)
+        }
+        try:
+            products = upsert_products(found)
+        except DatabaseError as error:
+            products = {}
+            results = {ean: error for ean in results}
+
+        outcomes = []
+        for ean, data in results.items():
+            if ean in products:
+                # Штрих-коды из каталога отсеяны до запросов к API
+                schedule_image_download(products[ean], data.get("image_url"))
+                outcome, detail = "created", ""
+            else:
+                outcome, detail = "failed", str(data)
+            self._report(ean, outcome, detail)
+            outcomes.append(outcome)
+        return outcomes
+
+    def _report(self, ean, outcome, detail=""):
+        line = f"{ean}\t{outcome}"
+        if detail:
+            line += f"\t{detail}"
+        self.stdout.write(line)
@@ -0,0 +1,41 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from add_food.jobs import process_pending, requeue_stale_jobs
+
+
+class Command(BaseCommand):
+    help = "Обработчик очереди поиска товаров по EAN (EanLookupJob)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Обработать текущую очередь и завершиться",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Пауза в секундах, когда очередь пуста",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("Обработчик EAN запущен")
+        total = 0
+        try:
+            while True:
+                requeue_stale_jobs(settings.EAN_JOB_STALE_TIMEOUT)
+                processed = process_pending()
+                total += processed
+                if processed:
+                    self.stdout.write(f"Обработано задач: {total}")
+                if options["once"]:
+                    break
+                if not processed:
+                    time.sleep(options["poll_interval"])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Готово, задач: {total}"))
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.1 on 2026-10-17 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("add_food", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EanApiResponse",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("ean_code", models.CharField(max_length=13, unique=True)),
+                (
+                    "outcome",
+                    models.CharField(
+                        choices=[
+                            ("found", "Найден"),
+                            ("not_found", "Не найден"),
+                            ("incomplete", "Неполные данные"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("payload", models.JSONField(blank=True, null=True)),
+                ("fetched_at", models.DateTimeField()),
+                ("expires_at", models.DateTimeField(db_index=True)),
+                ("hits", models.PositiveIntegerField(default=0)),
+                ("misses", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -1,3 +1,84 @@
+import uuid
+
 from django.db import models
+from django.db.models import Q
+
+
+class EanLookupJob(models.Model):
+    """Фоновый поиск товара по EAN во внешнем API (очередь в БД)."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "В очереди"
+        RUNNING = "running", "Выполняется"
+        DONE = "done", "Готово"
+        FAILED = "failed", "Ошибка"
+
+    ACTIVE_STATUSES = (Status.PENDING, Status.RUNNING)
+
+    # UUID вместо последовательного id - ссылку на статус нельзя подобрать
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    ean_code = models.CharField(max_length=13)
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.PENDING
+    )
+    product = models.ForeignKey(
+        "food_hub.Product",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="lookup_jobs",
+    )
+    error = models.CharField(max_length=255, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # Один активный запрос на штрих-код: повторные отправки формы
+            # ждут уже поставленную задачу
+            models.UniqueConstraint(
+                fields=["ean_code"],
+                condition=Q(status__in=["pending", "running"]),
+                name="unique_active_lookup_per_ean",
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["created_at"],
+                condition=Q(status="pending"),
+                name="lookup_job_pending_idx",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.ean_code} - {self.get_status_display()}"
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (self.Status.DONE, self.Status.FAILED)
+
+
+class EanApiResponse(models.Model):
+    """
+    Кэш ответов EAN API по штрих-коду. Хранятся и отрицательные результаты
+    (404, неполные данные), чтобы повторные сканы не уходили в платный API.
+    """
+
+    class Outcome(models.TextChoices):
+        FOUND = "found", "Найден"
+        NOT_FOUND = "not_found", "Не найден"
+        INCOMPLETE = "incomplete", "Неполные данные"
+
+    ean_code = models.CharField(max_length=13, unique=True)
+    outcome = models.CharField(max_length=10, choices=Outcome.choices)
+    payload = models.JSONField(null=True, blank=True)
+    fetched_at = models.DateTimeField()
+    expires_at = models.DateTimeField(db_index=True)
+    # Ответы из кэша и обращения к API по этому штрих-коду
+    hits = models.PositiveIntegerField(default=0)
+    misses = models.PositiveIntegerField(default=0)
 
-# Create your models here.
+    def __str__(self):
+        return f"{self.ean_code} - {self.get_outcome_display()}"
@@ -1,14 +1,30 @@
 import logging
 import os
-from io import BytesIO
-from urllib.parse import urlparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 
 import requests
 from django.conf import settings
-from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
 from PIL import Image
 
+from add_food import http
+from add_food.models import EanApiResponse
+from food_hub.models import Category, Company, Country, Product
+from food_hub.refcache import reference_cache
+from food_hub.utils.images import (
+    DEFAULT_IMAGE_PATH,
+    content_lock,
+    store_content,
+    store_thumbnails,
+)
+from search_hub.engine import bump_search_version
+
 
 class ApiError(Exception):
     pass
@@ -39,6 +55,8 @@ class IncompleteDataError(ApiError):
 
 
 logger = logging.getLogger("add_food")
+# Сколько байт скачать до первой попытки прочитать заголовок картинки
+IMAGE_SNIFF_BYTES = 64 * 1024
 
 
 def pick_lang(block: dict | None) -> str | None:
@@ -57,7 +75,9 @@ def api_request(ean_code: str) -> dict:
     try:
         url = settings.EAN_DB_API_URL
         logger.info(f"[API] Sent request for ean={ean_code}")
-        response = requests.get(f"{url}{ean_code}", headers=headers, timeout=10)
+        response = http.get(
+            f"{url}{ean_code}", headers=headers, breaker=http.ean_breaker()
+        )
 
         if response.status_code == 404:
             logger.error(
@@ -110,46 +130,108 @@ def get_square_image(data: dict) -> str | None:
     return None
 
 
-def download_image(image_url: str | None) -> bytes:
+def _sniff_image(image_file) -> tuple[str, int, int] | None:
+    """
+    Формат и размеры по уже скачанной части файла. Image.open читает только
+    заголовок и не декодирует пиксели. None - заголовок ещё не целиком.
+    """
+    image_file.seek(0)
+    try:
+        with Image.open(image_file) as img:
+            return img.format, img.width, img.height
+    except Image.DecompressionBombError:
+        raise ImageDownloadError("Image dimensions too large")
+    except Exception:
+        return None
+    finally:
+        image_file.seek(0, os.SEEK_END)
+
+
+def _check_header(header: tuple[str, int, int]) -> None:
+    image_format, width, height = header
+    if image_format not in ("PNG", "JPEG"):
+        logger.warning(f"[IMAGES] Disallowed image format: {image_format}")
+        raise ImageDownloadError("Disallowed image format")
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        logger.warning(f"[IMAGES] Image dimensions too large: {width}x{height}")
+        raise ImageDownloadError("Image dimensions too large")
+
+
+def download_image(image_url: str | None):
+    """
+    Скачивает картинку потоком во временный файл: до IMAGE_SPOOL_MAX_SIZE байт
+    в памяти, дальше на диске. Формат и размеры проверяются по заголовку,
+    как только он пришёл, - огромные и битые файлы отбрасываются, не скачиваясь
+    целиком. Возвращает файл, перемотанный в начало; закрывает его вызывающий.
+    """
     allowed_content_type = {"image/jpeg", "image/png"}
     max_image_bytes = 5 * 1024 * 1024
     if image_url is None:
         raise ImageDownloadError("Image url is None")
+    image_file = tempfile.SpooledTemporaryFile(
+        max_size=settings.IMAGE_SPOOL_MAX_SIZE
+    )
     try:
-        response = requests.get(image_url, stream=True, timeout=10)
-        response.raise_for_status()
+        # Ответ со stream=True держит соединение пула, пока его не закроют
+        with http.get(image_url, stream=True) as response:
+            response.raise_for_status()
 
-        content_type = response.headers.get("Content-Type", "").split(";")[0].strip()
-        if content_type not in allowed_content_type:
-            logger.warning(f"[IMAGES] Disallowed content type: {content_type}")
-            raise ImageDownloadError("Disallowed content type")
-
-        content_length = response.headers.get("Content-Length")
-        if content_length is not None:
-            try:
-                declared_size = int(content_length)
-            except ValueError:
-                declared_size = None
-            else:
-                if declared_size > max_image_bytes:
+            content_type = (
+                response.headers.get("Content-Type", "").split(";")[0].strip()
+            )
+            if content_type not in allowed_content_type:
+                logger.warning(f"[IMAGES] Disallowed content type: {content_type}")
+                raise ImageDownloadError("Disallowed content type")
+
+            content_length = response.headers.get("Content-Length")
+            if content_length is not None:
+                try:
+                    declared_size = int(content_length)
+                except ValueError:
+                    declared_size = None
+                else:
+                    if declared_size > max_image_bytes:
+                        logger.warning(
+                            f"[IMAGES] Declared file too large: {declared_size} bytes"
+                        )
+                        raise ImageDownloadError("Declared file too large")
+
+            size = 0
+            header = None
+            # Заголовок JPEG бывает длинным из-за EXIF: повторная попытка
+            # после каждого удвоения скачанного
+            next_sniff = IMAGE_SNIFF_BYTES
+            for chunk in response.iter_content(8192):
+                if not chunk:
+                    continue
+
+                image_file.write(chunk)
+                size += len(chunk)
+
+                if size > max_image_bytes:
                     logger.warning(
-                        f"[IMAGES] Declared file too large: {declared_size} bytes"
+                        "[IMAGES] Actual size exceeded limit during download"
+                    )
+                    raise ImageDownloadError(
+                        "Actual size exceeded limit during download"
                     )
-                    raise ImageDownloadError("Declared file too large")
-
-        data = bytearray()
-        for chunk in response.iter_content(8192):
-            if not chunk:
-                continue
 
-            data.extend(chunk)
+                if header is None and size >= next_sniff:
+                    header = _sniff_image(image_file)
+                    if header is not None:
+                        _check_header(header)
+                    next_sniff = size * 2
 
-            if len(data) > max_image_bytes:
-                logger.warning("[IMAGES] Actual size exceeded limit during download")
-                raise ImageDownloadError("Actual size exceeded limit during download")
+        if header is None:
+            header = _sniff_image(image_file)
+            if header is None:
+                logger.warning("[IMAGES] Downloaded file is not a valid image")
+                raise ImageDownloadError("Downloaded file is not a valid image")
+            _check_header(header)
 
+        image_file.seek(0)
         try:
-            with Image.open(BytesIO(data)) as img:
+            with Image.open(image_file) as img:
                 img.verify()
         except Exception:
             logger.warning(
@@ -157,38 +239,50 @@ def download_image(image_url: str | None) -> bytes:
             )
             raise ImageDownloadError("Downloaded file is not a valid image")
 
-        return bytes(data)
+        image_file.seek(0)
+        return image_file
 
     except requests.exceptions.RequestException:
+        image_file.close()
         logger.error(f"[IMAGES] Connection error", exc_info=True)
         raise ImageDownloadError("Unknown connection error")
+    except BaseException:
+        image_file.close()
+        raise
 
 
 def save_image(data: dict, image_url: str | None) -> str:
     product = data.get("product", {})
     ean_code = product.get("barcode", "unknown")
 
-    default_path = os.path.join("products", "default_image.png")
+    default_path = DEFAULT_IMAGE_PATH
     if image_url is None:
         logger.error(f"[IMAGES] Image url is None; Return default image")
         return default_path
 
     try:
-        image_bytes = download_image(image_url)
+        image_file = download_image(image_url)
     except ImageDownloadError:
         logger.warning(f"[IMAGES] Using default image for ean={ean_code}")
         return default_path
-    filename = os.path.basename(urlparse(image_url).path) or f"{ean_code}.jpg"
-    relative_path = os.path.join("products", filename)
-    try:
-        actual_path = default_storage.save(relative_path, ContentFile(image_bytes))
-        logger.info(f"[IMAGES] Image successfully saved for ean={ean_code}")
-        return actual_path
-    except Exception as error:
-        logger.warning(
-            f"[IMAGES] Failed to save image for ean={ean_code} | reason: {error}"
-        )
-        return default_path
+    with image_file:
+        try:
+            actual_path = store_content(image_file)
+            logger.info(f"[IMAGES] Image successfully saved for ean={ean_code}")
+        except Exception as error:
+            logger.warning(
+                f"[IMAGES] Failed to save image for ean={ean_code} | reason: {error}"
+            )
+            return default_path
+        try:
+            store_thumbnails(actual_path, image_file)
+        except Exception as error:
+            # Без превью карточка покажет оригинал; досоздаст build_thumbnails
+            logger.warning(
+                f"[IMAGES] Failed to build thumbnails for ean={ean_code} | "
+                f"reason: {error}"
+            )
+    return actual_path
 
 
 def get_dict_data(data: dict, save_path: str) -> dict[str, str]:
@@ -224,17 +318,242 @@ def get_dict_data(data: dict, save_path: str) -> dict[str, str]:
     }
 
 
-def add_product(ean_code: str) -> dict[str, str]:
+def _cache_ttl(outcome: str) -> timedelta:
+    seconds = {
+        EanApiResponse.Outcome.FOUND: settings.EAN_CACHE_TTL_FOUND,
+        EanApiResponse.Outcome.NOT_FOUND: settings.EAN_CACHE_TTL_NOT_FOUND,
+        EanApiResponse.Outcome.INCOMPLETE: settings.EAN_CACHE_TTL_INCOMPLETE,
+    }[outcome]
+    return timedelta(seconds=seconds)
+
+
+def _store_response(ean_code: str, outcome: str, payload: dict | None) -> None:
+    now = timezone.now()
+    entry, _ = EanApiResponse.objects.update_or_create(
+        ean_code=ean_code,
+        defaults={
+            "outcome": outcome,
+            "payload": payload,
+            "fetched_at": now,
+            "expires_at": now + _cache_ttl(outcome),
+        },
+    )
+    EanApiResponse.objects.filter(pk=entry.pk).update(misses=F("misses") + 1)
+
+
+def cached_api_request(ean_code: str) -> dict:
+    """
+    api_request() через кэш EanApiResponse. Свежая запись отдаётся без
+    обращения к API; сохранённые 404 и неполные данные снова поднимают
+    ProductNotFoundError / IncompleteDataError. Таймауты и ошибки
+    соединения не кэшируются.
+    """
+    entry = EanApiResponse.objects.filter(
+        ean_code=ean_code, expires_at__gt=timezone.now()
+    ).first()
+    if entry is not None:
+        EanApiResponse.objects.filter(pk=entry.pk).update(hits=F("hits") + 1)
+        logger.info(f"[CACHE] Hit ean={ean_code} outcome={entry.outcome}")
+        if entry.outcome == EanApiResponse.Outcome.NOT_FOUND:
+            raise ProductNotFoundError("Ошибка, товар не был найден")
+        if entry.outcome == EanApiResponse.Outcome.INCOMPLETE:
+            raise IncompleteDataError("Ошибка. Не все данные были найдены")
+        return entry.payload
+
+    logger.info(f"[CACHE] Miss ean={ean_code}")
+    try:
+        data = api_request(ean_code)
+    except ProductNotFoundError:
+        _store_response(ean_code, EanApiResponse.Outcome.NOT_FOUND, None)
+        raise
+    _store_response(ean_code, EanApiResponse.Outcome.FOUND, data)
+    return data
+
+
+def mark_incomplete(ean_code: str) -> None:
+    """Ответ API есть, но данных для продукта не хватает - кэшируем как неполный."""
+    EanApiResponse.objects.filter(ean_code=ean_code).update(
+        outcome=EanApiResponse.Outcome.INCOMPLETE,
+        expires_at=timezone.now() + _cache_ttl(EanApiResponse.Outcome.INCOMPLETE),
+    )
+
+
+def api_cache_stats() -> dict[str, int]:
+    """Счётчики кэша: попадания, обращения к API и записи по исходам."""
+    totals = EanApiResponse.objects.aggregate(hits=Sum("hits"), misses=Sum("misses"))
+    stats = {"hits": totals["hits"] or 0, "misses": totals["misses"] or 0}
+    outcomes = EanApiResponse.objects.values("outcome").annotate(count=Count("id"))
+    stats.update({row["outcome"]: row["count"] for row in outcomes})
+    return stats
+
+
+def add_product(ean_code: str) -> dict[str, str | None]:
     """
-    Fetches product data by EAN, downloads and saves its image.
-    Returns dict with keys: company, category, name, country, save_path.
+    Fetches product data by EAN (through the response cache) and validates it
+    before any image I/O. The image is not downloaded here: save_path is the
+    placeholder, image_url is passed to schedule_image_download() once the
+    product row exists.
+    Returns dict with keys: company, category, name, country, save_path,
+    image_url.
     Raises: ProductNotFoundError, IncompleteDataError, ResponseTimeOutError,
             ResponseConnectionError, ValueReadingJsonError.
     """
-    response = api_request(ean_code)
+    response = cached_api_request(ean_code)
+
+    try:
+        product_data = get_dict_data(response, DEFAULT_IMAGE_PATH)
+    except IncompleteDataError:
+        mark_incomplete(ean_code)
+        raise
+
+    product_data["image_url"] = get_square_image(response)
+    return product_data
+
+
+_image_executor = None
+_image_executor_lock = threading.Lock()
+
+
+def get_image_executor() -> ThreadPoolExecutor:
+    global _image_executor
+    if _image_executor is None:
+        with _image_executor_lock:
+            if _image_executor is None:
+                _image_executor = ThreadPoolExecutor(
+                    max_workers=settings.IMAGE_DOWNLOAD_WORKERS,
+                    thread_name_prefix="image-download",
+                )
+    return _image_executor
+
+
+def store_product_image(product_id: int, ean_code: str, image_url: str) -> str:
+    """
+    Скачивает и сохраняет картинку, затем заменяет ею заглушку продукта.
+    Файл здесь не удаляется, даже если заглушку уже заменили: он общий для
+    одинаковых картинок, ничьи файлы убирает cleanup_product_images.
+    """
+    path = save_image({"product": {"barcode": ean_code}}, image_url)
+    if path == DEFAULT_IMAGE_PATH:
+        return path
+    # Та же блокировка, что у cleanup_product_images: файл не удалят между
+    # проверкой и записью ссылки на него
+    with content_lock(path):
+        if not default_storage.exists(path):
+            logger.warning(f"[IMAGES] Image removed by cleanup for ean={ean_code}")
+            return DEFAULT_IMAGE_PATH
+        updated = Product.objects.filter(
+            pk=product_id, img_field=DEFAULT_IMAGE_PATH
+        ).update(img_field=path)
+    if not updated:
+        logger.info(f"[IMAGES] Placeholder already replaced for ean={ean_code}")
+        return path
+    logger.info(f"[IMAGES] Placeholder replaced for ean={ean_code}")
+    return path
+
+
+def _image_task(product_id: int, ean_code: str, image_url: str) -> None:
+    try:
+        store_product_image(product_id, ean_code, image_url)
+    except Exception:
+        logger.exception(f"[IMAGES] Background download failed for ean={ean_code}")
+    finally:
+        # Поток пула живёт дольше запроса - свои соединения с БД закрываем сами
+        connections.close_all()
+
 
-    image_url = get_square_image(response)
+def schedule_image_download(product: Product, image_url: str | None) -> None:
+    """
+    После коммита отдаёт загрузку картинки в пул потоков: ответ пользователю
+    не ждёт внешнего хоста с картинками.
+    """
+    if not image_url or product.img_field.name != DEFAULT_IMAGE_PATH:
+        return
+    product_id, ean_code = product.pk, product.ean_code
+
+    def submit():
+        get_image_executor().submit(_image_task, product_id, ean_code, image_url)
+
+    transaction.on_commit(submit)
+
+
+def _upsert_names(model, names, extra=None) -> dict[str, int]:
+    """
+    Id справочника по именам: сначала из reference_cache, для остальных -
+    INSERT ... ON CONFLICT (name) DO UPDATE SET name = EXCLUDED.name RETURNING id,
+    один запрос и для новых, и для уже существующих строк. Имя при конфликте
+    не меняется, поэтому триггеры поискового вектора не срабатывают.
+    """
+    ids = reference_cache.get_many(model, names)
+    missing = set(names) - ids.keys()
+    if not missing:
+        return ids
+    extra = extra or {}
+    # Сортировка - одинаковый порядок блокировок у параллельных импортов
+    objs = [model(name=name, **extra.get(name, {})) for name in sorted(missing)]
+    model.objects.bulk_create(
+        objs, update_conflicts=True, unique_fields=["name"], update_fields=["name"]
+    )
+    fresh = {obj.name: obj.pk for obj in objs}
+    # Кэшируется после коммита: откат не должен оставить в кэше чужие id
+    transaction.on_commit(lambda: reference_cache.set_many(model, fresh))
+    return {**ids, **fresh}
+
+
+def _write_products(items: dict[str, dict]) -> dict[str, Product]:
+    rows = items.values()
+    with transaction.atomic():
+        reference_cache.sync()
+        countries = _upsert_names(Country, {row["country"] for row in rows})
+        # Компания уникальна по имени: страна берётся из первой строки
+        company_extra = {}
+        for row in rows:
+            company_extra.setdefault(
+                row["company"], {"country_id": countries[row["country"]]}
+            )
+        companies = _upsert_names(Company, company_extra, company_extra)
+        categories = _upsert_names(Category, {row["category"] for row in rows})
+
+        products = [
+            Product(
+                ean_code=ean,
+                name=row["name"],
+                company_id=companies[row["company"]],
+                category_id=categories[row["category"]],
+                img_field=row["save_path"],
+                image_url=row.get("image_url") or "",
+            )
+            for ean, row in sorted(items.items())
+        ]
+        Product.objects.bulk_create(
+            products,
+            update_conflicts=True,
+            unique_fields=["ean_code"],
+            update_fields=["ean_code"],
+        )
+        # bulk_create не шлёт post_save - кэш поиска сбрасываем сами
+        transaction.on_commit(bump_search_version)
+    return {product.ean_code: product for product in products}
+
+
+def upsert_products(items: dict[str, dict]) -> dict[str, Product]:
+    """
+    Запись продуктов из данных add_product(): {ean: api_data}.
+    Справочники берутся из reference_cache, недостающие и продукты - по
+    одному upsert запросу на таблицу. Существующие строки не меняются
+    (компания сохраняет свою страну, продукт - имя и картинку).
+    Возвращает {ean: product} для всех переданных штрих-кодов.
+    """
+    if not items:
+        return {}
+    try:
+        return _write_products(items)
+    except IntegrityError:
+        # id из кэша мог указывать на строку, удалённую другим процессом
+        logger.warning("[DATA] Reference cache is stale, retrying without it")
+        reference_cache.clear()
+        return _write_products(items)
 
-    save_path = save_image(response, image_url)
 
-    return get_dict_data(response, save_path)
+def get_or_create_product(ean: str, api_data: dict) -> Product:
+    """Записывает продукт из данных add_product(); повторный EAN не дублируется."""
+    return upsert_products({ean: api_data})[ean]
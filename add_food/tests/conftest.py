@@ -0,0 +1,11 @@
+import pytest
+
+from food_hub.refcache import reference_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_reference_cache():
+    # id справочников из закоммиченных в других тестах строк уже не существуют
+    reference_cache.clear()
+    yield
+    reference_cache.clear()
@@ -1,3 +1,5 @@
+import io
+
 import pytest
 
 from add_food.services import (
@@ -10,6 +12,9 @@ from add_food.services import (
     ValueReadingJsonError,
 )
 
+# add_product() читает и пишет кэш ответов API
+pytestmark = pytest.mark.django_db
+
 
 def _product_data(
     titles=None,
@@ -46,7 +51,7 @@ def patch_get_square_image(mocker):
 
 @pytest.fixture(autouse=True)
 def patch_download_image(mocker):
-    mocker.patch("add_food.services.download_image", return_value=b"fake")
+    mocker.patch("add_food.services.download_image", return_value=io.BytesIO(b"fake"))
 
 
 @pytest.fixture(autouse=True)
@@ -69,6 +74,7 @@ class TestAddProduct:
             "category": "Сладости",
             "country": "Россия",
             "save_path": "products/default_image.png",
+            "image_url": None,
         }
 
     @pytest.mark.parametrize(
@@ -155,10 +161,25 @@ class TestAddProduct:
             "add_food.services.get_square_image",
             return_value="http://example.com/img.png",
         )
-        mocker.patch(
+        save = mocker.patch(
             "add_food.services.save_image",
             return_value="products/img.png",
         )
 
         result = add_product("4600000000001")
-        assert result["save_path"] == "products/img.png"
+        # Картинка скачивается позже, в add_product только заглушка и ссылка
+        assert result["save_path"] == "products/default_image.png"
+        assert result["image_url"] == "http://example.com/img.png"
+        save.assert_not_called()
+
+    def test_incomplete_data_skips_image_io(self, mocker):
+        data = _product_data()
+        data["product"]["titles"] = {}
+        mocker.patch("add_food.services.api_request", return_value=data)
+        square = mocker.patch("add_food.services.get_square_image")
+        save = mocker.patch("add_food.services.save_image")
+
+        with pytest.raises(IncompleteDataError):
+            add_product("4600000000001")
+        square.assert_not_called()
+        save.assert_not_called()
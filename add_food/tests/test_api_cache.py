@@ -0,0 +1,114 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from add_food.models import EanApiResponse
+from add_food.services import (
+    IncompleteDataError,
+    ProductNotFoundError,
+    ResponseTimeOutError,
+    add_product,
+    api_cache_stats,
+    cached_api_request,
+)
+
+EAN = "4600000000001"
+
+pytestmark = pytest.mark.django_db
+
+
+def _product_data(titles=None):
+    return {
+        "product": {
+            "barcode": EAN,
+            "titles": {"ru": "Печенье"} if titles is None else titles,
+            "manufacturer": {"titles": {"ru": "Кондитер"}},
+            "categories": [{"titles": {"ru": "Сладости"}}],
+            "barcodeDetails": {"country": "Россия"},
+            "images": [],
+        }
+    }
+
+
+@pytest.fixture(autouse=True)
+def patch_save_image(mocker):
+    mocker.patch(
+        "add_food.services.save_image", return_value="products/default_image.png"
+    )
+
+
+def test_found_response_is_cached(mocker):
+    api = mocker.patch("add_food.services.api_request", return_value=_product_data())
+    assert cached_api_request(EAN) == _product_data()
+    assert cached_api_request(EAN) == _product_data()
+    assert api.call_count == 1
+    entry = EanApiResponse.objects.get(ean_code=EAN)
+    assert entry.outcome == EanApiResponse.Outcome.FOUND
+    assert (entry.hits, entry.misses) == (1, 1)
+
+
+def test_not_found_is_cached(mocker):
+    api = mocker.patch(
+        "add_food.services.api_request",
+        side_effect=ProductNotFoundError("Ошибка, товар не был найден"),
+    )
+    for _ in range(3):
+        with pytest.raises(ProductNotFoundError):
+            add_product(EAN)
+    assert api.call_count == 1
+    assert api_cache_stats()["not_found"] == 1
+
+
+def test_incomplete_data_is_cached(mocker):
+    api = mocker.patch(
+        "add_food.services.api_request", return_value=_product_data(titles={})
+    )
+    for _ in range(2):
+        with pytest.raises(IncompleteDataError):
+            add_product(EAN)
+    assert api.call_count == 1
+    assert EanApiResponse.objects.get().outcome == EanApiResponse.Outcome.INCOMPLETE
+
+
+def test_transient_errors_are_not_cached(mocker):
+    api = mocker.patch(
+        "add_food.services.api_request",
+        side_effect=ResponseTimeOutError("Превышено время ожидания"),
+    )
+    for _ in range(2):
+        with pytest.raises(ResponseTimeOutError):
+            cached_api_request(EAN)
+    assert api.call_count == 2
+    assert not EanApiResponse.objects.exists()
+
+
+def test_expired_entry_is_refetched(mocker, settings):
+    settings.EAN_CACHE_TTL_NOT_FOUND = 60
+    mocker.patch(
+        "add_food.services.api_request",
+        side_effect=ProductNotFoundError("Ошибка, товар не был найден"),
+    )
+    with pytest.raises(ProductNotFoundError):
+        cached_api_request(EAN)
+    EanApiResponse.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+    api = mocker.patch("add_food.services.api_request", return_value=_product_data())
+    assert cached_api_request(EAN) == _product_data()
+    api.assert_called_once()
+    entry = EanApiResponse.objects.get()
+    assert entry.outcome == EanApiResponse.Outcome.FOUND
+    assert entry.misses == 2
+
+
+def test_stats_and_purge_command(mocker, capsys):
+    mocker.patch("add_food.services.api_request", return_value=_product_data())
+    cached_api_request(EAN)
+    cached_api_request(EAN)
+    assert api_cache_stats() == {"hits": 1, "misses": 1, "found": 1}
+
+    EanApiResponse.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+    call_command("ean_cache", purge_expired=True)
+    assert "Удалено устаревших записей: 1" in capsys.readouterr().out
+    assert not EanApiResponse.objects.exists()
@@ -8,7 +8,7 @@ from add_food.services import api_request, ApiError, ProductNotFoundError, Respo
 
 @pytest.fixture
 def mock_requests_get():
-    with patch("add_food.services.requests.get") as mock_get:
+    with patch("add_food.http.get") as mock_get:
         yield mock_get
 
 
@@ -1,5 +1,11 @@
+import io
+import struct
+import zlib
+
 import requests
 import pytest
+from PIL import Image
+
 from add_food.services import download_image, ImageDownloadError
 
 MAX_IMAGE_BYTES = 5 * 1024 * 1024
@@ -15,17 +21,24 @@ def _mock_img_bytes():
     )
 
 
+def _mock_response(mocker):
+    # Ответ используется как контекстный менеджер
+    response = mocker.MagicMock()
+    response.__enter__.return_value = response
+    return response
+
+
 def test_download_image_success(mocker):
     img_bytes = _mock_img_bytes()
 
-    mock_resp = mocker.Mock()
+    mock_resp = _mock_response(mocker)
     mock_resp.raise_for_status.return_value = None
     mock_resp.headers = {"Content-Type": "image/png"}
     mock_resp.iter_content.return_value = [img_bytes]
 
-    mocker.patch("requests.get", return_value=mock_resp)
+    mocker.patch("add_food.http.get", return_value=mock_resp)
 
-    mock_img = mocker.MagicMock()
+    mock_img = mocker.MagicMock(format="PNG", width=1, height=1)
     mock_ctx = mocker.MagicMock()
     mock_ctx.__enter__.return_value = mock_img
     mock_ctx.__exit__.return_value = False
@@ -33,23 +46,23 @@ def test_download_image_success(mocker):
     mocker.patch("add_food.services.Image.open", return_value=mock_ctx)
 
     result = download_image("http://x")
-    assert result == img_bytes
+    assert result.read() == img_bytes
 
 
 def test_download_image_disallowed_content_type(mocker):
-    mock_resp = mocker.Mock()
+    mock_resp = _mock_response(mocker)
     mock_resp.raise_for_status.return_value = None
     mock_resp.headers = {"Content-Type": "application/pdf"}
     mock_resp.iter_content.return_value = []
 
-    mocker.patch("requests.get", return_value=mock_resp)
+    mocker.patch("add_food.http.get", return_value=mock_resp)
 
     with pytest.raises(ImageDownloadError):
         download_image("http://x")
 
 
 def test_download_image_declared_too_large(mocker):
-    mock_resp = mocker.Mock()
+    mock_resp = _mock_response(mocker)
     mock_resp.raise_for_status.return_value = None
     mock_resp.headers = {
         "Content-Type": "image/jpeg",
@@ -57,48 +70,50 @@ def test_download_image_declared_too_large(mocker):
     }
     mock_resp.iter_content.return_value = []
 
-    mocker.patch("requests.get", return_value=mock_resp)
+    mocker.patch("add_food.http.get", return_value=mock_resp)
 
     with pytest.raises(ImageDownloadError):
         download_image("http://x")
 
 
 def test_download_image_real_size_too_large(mocker):
-    mock_resp = mocker.Mock()
+    mock_resp = _mock_response(mocker)
     mock_resp.raise_for_status.return_value = None
     mock_resp.headers = {"Content-Type": "image/png"}
 
     huge_chunk = b"0" * (MAX_IMAGE_BYTES + 100)
     mock_resp.iter_content.return_value = [huge_chunk]
 
-    mocker.patch("requests.get", return_value=mock_resp)
+    mocker.patch("add_food.http.get", return_value=mock_resp)
 
     with pytest.raises(ImageDownloadError):
         download_image("http://x")
+    # Оборванная загрузка возвращает соединение в пул
+    mock_resp.__exit__.assert_called_once()
 
 
 def test_download_image_invalid_image(mocker):
-    mock_resp = mocker.Mock()
+    mock_resp = _mock_response(mocker)
     mock_resp.raise_for_status.return_value = None
     mock_resp.headers = {"Content-Type": "image/jpeg"}
 
     mock_resp.iter_content.return_value = [b"not-an-image"]
 
-    mocker.patch("requests.get", return_value=mock_resp)
+    mocker.patch("add_food.http.get", return_value=mock_resp)
 
     with pytest.raises(ImageDownloadError):
         download_image("http://x")
 
 
 def test_download_image_timeout(mocker):
-    mocker.patch("requests.get", side_effect=requests.exceptions.Timeout)
+    mocker.patch("add_food.http.get", side_effect=requests.exceptions.Timeout)
 
     with pytest.raises(ImageDownloadError):
         download_image("http://x")
 
 
 def test_download_image_connection_error(mocker):
-    mocker.patch("requests.get", side_effect=requests.exceptions.ConnectionError)
+    mocker.patch("add_food.http.get", side_effect=requests.exceptions.ConnectionError)
 
     with pytest.raises(ImageDownloadError):
         download_image("http://x")
@@ -110,7 +125,7 @@ def test_download_image_none_url(mocker):
 
 
 def test_download_image_invalid_content_length(mocker):
-    mock_resp = mocker.Mock()
+    mock_resp = _mock_response(mocker)
     mock_resp.raise_for_status.return_value = None
     mock_resp.headers = {
         "Content-Type": "image/png",
@@ -120,36 +135,94 @@ def test_download_image_invalid_content_length(mocker):
     img_bytes = _mock_img_bytes()
     mock_resp.iter_content.return_value = [img_bytes]
 
-    mocker.patch("requests.get", return_value=mock_resp)
+    mocker.patch("add_food.http.get", return_value=mock_resp)
 
-    mock_img = mocker.MagicMock()
+    mock_img = mocker.MagicMock(format="PNG", width=1, height=1)
     mock_ctx = mocker.MagicMock()
     mock_ctx.__enter__.return_value = mock_img
     mock_ctx.__exit__.return_value = False
     mocker.patch("add_food.services.Image.open", return_value=mock_ctx)
 
     result = download_image("http://x")
-    assert result == img_bytes
+    assert result.read() == img_bytes
 
 
 def test_download_image_empty_chunks(mocker):
     img_bytes = _mock_img_bytes()
 
-    mock_resp = mocker.Mock()
+    mock_resp = _mock_response(mocker)
     mock_resp.raise_for_status.return_value = None
     mock_resp.headers = {"Content-Type": "image/png"}
     mock_resp.iter_content.return_value = [b"", b"", img_bytes]
 
-    mocker.patch("requests.get", return_value=mock_resp)
+    mocker.patch("add_food.http.get", return_value=mock_resp)
 
-    mock_img = mocker.MagicMock()
+    mock_img = mocker.MagicMock(format="PNG", width=1, height=1)
     mock_ctx = mocker.MagicMock()
     mock_ctx.__enter__.return_value = mock_img
     mock_ctx.__exit__.return_value = False
     mocker.patch("add_food.services.Image.open", return_value=mock_ctx)
 
     result = download_image("http://x")
-    assert result == img_bytes
+    assert result.read() == img_bytes
+
+
+def _png_header(width, height, body=70_000):
+    """Заголовок PNG с заданными размерами и пустым IDAT - пикселей нет."""
+
+    def chunk(kind, data):
+        crc = struct.pack(">I", zlib.crc32(kind + data))
+        return struct.pack(">I", len(data)) + kind + data + crc
+
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", ihdr) + chunk(b"IDAT", b"\0" * body)
+
+
+def _streaming_response(mocker, first_chunk):
+    def chunks(size):
+        yield first_chunk
+        raise AssertionError("Download continued after the header was rejected")
+
+    mock_resp = _mock_response(mocker)
+    mock_resp.raise_for_status.return_value = None
+    mock_resp.headers = {"Content-Type": "image/png"}
+    mock_resp.iter_content.side_effect = chunks
+    mocker.patch("add_food.http.get", return_value=mock_resp)
+
+
+def test_download_image_rejects_large_dimensions_early(mocker, settings):
+    settings.IMAGE_MAX_PIXELS = 100
+    _streaming_response(mocker, _png_header(20, 20))
+
+    with pytest.raises(ImageDownloadError, match="dimensions"):
+        download_image("http://x")
+
+
+def test_download_image_rejects_decompression_bomb_early(mocker):
+    _streaming_response(mocker, _png_header(30_000, 30_000))
+
+    with pytest.raises(ImageDownloadError, match="dimensions"):
+        download_image("http://x")
+
+
+def test_download_image_real_png_spools_to_disk(mocker, settings):
+    settings.IMAGE_SPOOL_MAX_SIZE = 1024
+    buffer = io.BytesIO()
+    Image.effect_noise((200, 200), 64).save(buffer, "PNG")
+    img_bytes = buffer.getvalue()
+
+    mock_resp = _mock_response(mocker)
+    mock_resp.raise_for_status.return_value = None
+    mock_resp.headers = {"Content-Type": "image/png"}
+    mock_resp.iter_content.return_value = [
+        img_bytes[i : i + 8192] for i in range(0, len(img_bytes), 8192)
+    ]
+    mocker.patch("add_food.http.get", return_value=mock_resp)
+
+    with download_image("http://x") as result:
+        # Больше IMAGE_SPOOL_MAX_SIZE - файл уже на диске, а не в памяти
+        assert result._rolled
+        assert result.read() == img_bytes
 
 
 class TestImageDownloadErrorInheritance:
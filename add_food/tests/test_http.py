@@ -0,0 +1,118 @@
+from unittest.mock import Mock
+
+import pytest
+import requests
+
+from add_food import http
+from add_food.services import ResponseConnectionError, api_request
+
+
+@pytest.fixture
+def breaker():
+    return http.CircuitBreaker("test", failure_threshold=2, reset_timeout=30)
+
+
+@pytest.fixture
+def session(mocker):
+    session = Mock()
+    mocker.patch("add_food.http.get_session", return_value=session)
+    return session
+
+
+@pytest.fixture
+def clock(mocker):
+    now = [1000.0]
+    mocker.patch("add_food.http.time.monotonic", side_effect=lambda: now[0])
+    return now
+
+
+def test_session_is_shared_and_pooled(settings, mocker):
+    mocker.patch("add_food.http._session", None)
+    settings.HTTP_POOL_MAXSIZE = 7
+    session = http.get_session()
+    assert http.get_session() is session
+    adapter = session.get_adapter("https://ean-db.com/api/")
+    assert adapter._pool_maxsize == 7
+    retry = adapter.max_retries
+    assert retry.total == settings.HTTP_MAX_RETRIES
+    assert retry.backoff_jitter == settings.HTTP_BACKOFF_JITTER
+    assert 503 in retry.status_forcelist
+
+
+def test_get_uses_split_timeouts(settings, session):
+    settings.HTTP_CONNECT_TIMEOUT = 2
+    settings.HTTP_READ_TIMEOUT = 7
+    http.get("https://example.com/")
+    session.get.assert_called_once_with("https://example.com/", timeout=(2, 7))
+
+
+def test_breaker_opens_after_failures(session, breaker, clock):
+    session.get.side_effect = requests.exceptions.ConnectionError()
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            http.get("https://example.com/", breaker=breaker)
+    assert breaker.is_open
+
+    session.get.reset_mock()
+    with pytest.raises(http.CircuitOpenError):
+        http.get("https://example.com/", breaker=breaker)
+    session.get.assert_not_called()
+
+
+def test_breaker_counts_server_errors(session, breaker, clock):
+    session.get.return_value = Mock(status_code=503)
+    http.get("https://example.com/", breaker=breaker)
+    http.get("https://example.com/", breaker=breaker)
+    assert breaker.is_open
+
+
+def test_breaker_half_open_probe(session, breaker, clock):
+    session.get.side_effect = requests.exceptions.Timeout()
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.Timeout):
+            http.get("https://example.com/", breaker=breaker)
+
+    clock[0] += 31
+    session.get.side_effect = None
+    session.get.return_value = Mock(status_code=200)
+    http.get("https://example.com/", breaker=breaker)
+    assert not breaker.is_open
+
+
+def test_failed_probe_reopens(session, breaker, clock):
+    session.get.side_effect = requests.exceptions.Timeout()
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.Timeout):
+            http.get("https://example.com/", breaker=breaker)
+
+    clock[0] += 31
+    with pytest.raises(requests.exceptions.Timeout):
+        http.get("https://example.com/", breaker=breaker)
+    with pytest.raises(http.CircuitOpenError):
+        http.get("https://example.com/", breaker=breaker)
+
+
+def test_probe_with_other_request_error_reopens(session, breaker, clock):
+    session.get.side_effect = requests.exceptions.ConnectionError()
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            http.get("https://example.com/", breaker=breaker)
+
+    clock[0] += 31
+    session.get.side_effect = requests.exceptions.TooManyRedirects()
+    with pytest.raises(requests.exceptions.TooManyRedirects):
+        http.get("https://example.com/", breaker=breaker)
+
+    clock[0] += 31
+    session.get.side_effect = None
+    session.get.return_value = Mock(status_code=200)
+    http.get("https://example.com/", breaker=breaker)
+    assert not breaker.is_open
+
+
+def test_open_circuit_is_connection_error_for_services(mocker):
+    mocker.patch(
+        "add_food.http.get", side_effect=http.CircuitOpenError("Circuit ean_db is open")
+    )
+    with pytest.raises(ResponseConnectionError):
+        api_request("4600000000001")
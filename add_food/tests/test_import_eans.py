@@ -0,0 +1,98 @@
+import io
+
+import pytest
+import requests
+from django.core.management import call_command
+
+from add_food.models import EanApiResponse
+from food_hub.models import Company, Product
+
+FOUND = {
+    "4600000000015": ("Печенье", "Кондитер"),
+    "4600000000022": ("Вафли", "Кондитер"),
+    "4600000000039": ("Пряники", "Пекарня"),
+}
+MISSING = "4600000000046"
+
+# Потоки команды работают со своими соединениями - нужны настоящие коммиты
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+class StubResponse:
+    def __init__(self, status_code=200, payload=None):
+        self.status_code = status_code
+        self._payload = payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(str(self.status_code))
+
+    def json(self):
+        return self._payload
+
+
+@pytest.fixture
+def stub_api(mocker, settings):
+    settings.EAN_DB_API_URL = "https://ean.test/product/"
+
+    def fake_get(url, *args, **kwargs):
+        ean = url.rsplit("/", 1)[-1]
+        if ean not in FOUND:
+            return StubResponse(status_code=404)
+        name, company = FOUND[ean]
+        return StubResponse(
+            payload={
+                "product": {
+                    "barcode": ean,
+                    "titles": {"ru": name},
+                    "manufacturer": {"titles": {"ru": company}},
+                    "categories": [{"titles": {"ru": "Сладости"}}],
+                    "barcodeDetails": {"country": "Россия"},
+                    "images": [],
+                }
+            }
+        )
+
+    return mocker.patch("add_food.http.get", side_effect=fake_get)
+
+
+def test_import_reports_each_ean(stub_api, mocker):
+    lines = [*FOUND, MISSING, "123", *FOUND]
+    mocker.patch("sys.stdin", io.StringIO("\n".join(lines)))
+    out = io.StringIO()
+    call_command("import_eans", rate=0, workers=3, batch_size=2, stdout=out)
+    report = dict(
+        line.split("\t")[:2] for line in out.getvalue().splitlines() if "\t" in line
+    )
+    assert report == {
+        **{ean: "created" for ean in FOUND},
+        MISSING: "failed",
+        "123": "invalid",
+    }
+    assert Product.objects.count() == 3
+    assert Company.objects.count() == 2
+    assert stub_api.call_count == 4
+
+
+def test_rerun_is_resumable(stub_api, mocker, tmp_path):
+    path = tmp_path / "eans.txt"
+    path.write_text("\n".join([*FOUND, MISSING]))
+    call_command("import_eans", str(path), rate=0, stdout=io.StringIO())
+    stub_api.reset_mock()
+
+    out = io.StringIO()
+    call_command("import_eans", str(path), rate=0, stdout=out)
+    # Созданные товары пропущены, 404 отдан из кэша - API не вызывается
+    stub_api.assert_not_called()
+    assert "exists: 3" in out.getvalue()
+    assert "failed: 1" in out.getvalue()
+    assert EanApiResponse.objects.get(ean_code=MISSING).hits == 1
+
+
+def test_rate_limit_applies_to_api_calls(stub_api, mocker, tmp_path):
+    acquire = mocker.patch("add_food.http.HostRateLimiter.acquire")
+    path = tmp_path / "eans.txt"
+    path.write_text("\n".join(FOUND))
+    call_command("import_eans", str(path), rate=1, stdout=io.StringIO())
+    assert acquire.call_count == 3
+    acquire.assert_called_with("https://ean.test/product/")
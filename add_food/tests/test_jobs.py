@@ -0,0 +1,182 @@
+from datetime import timedelta
+
+import pytest
+import requests
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from add_food.jobs import (
+    claim_next_job,
+    enqueue_lookup,
+    process_pending,
+    requeue_stale_jobs,
+    run_job,
+)
+from add_food.models import EanLookupJob
+from food_hub.models import Product
+
+VALID_EAN = "4006381333931"
+MISSING_EAN = "4600000000000"
+
+
+class StubResponse:
+    def __init__(self, status_code=200, payload=None):
+        self.status_code = status_code
+        self._payload = payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(str(self.status_code))
+
+    def json(self):
+        return self._payload
+
+
+def _payload(ean):
+    return {
+        "product": {
+            "barcode": ean,
+            "titles": {"ru": "Печенье"},
+            "manufacturer": {"titles": {"ru": "Кондитер"}},
+            "categories": [{"titles": {"ru": "Сладости"}}],
+            "barcodeDetails": {"country": "Россия"},
+            "images": [],
+        }
+    }
+
+
+@pytest.fixture
+def stub_api(mocker, settings):
+    """EAN API: VALID_EAN найден, остальные штрих-коды - 404."""
+    settings.EAN_DB_API_URL = "https://ean.test/product/"
+
+    def fake_get(url, *args, **kwargs):
+        ean = url.rsplit("/", 1)[-1]
+        if ean == VALID_EAN:
+            return StubResponse(payload=_payload(ean))
+        return StubResponse(status_code=404)
+
+    return mocker.patch("add_food.http.get", side_effect=fake_get)
+
+
+@pytest.mark.django_db
+class TestQueue:
+    def test_enqueue_reuses_active_job(self):
+        first = enqueue_lookup(VALID_EAN)
+        assert enqueue_lookup(VALID_EAN).pk == first.pk
+        assert EanLookupJob.objects.count() == 1
+
+    def test_enqueue_after_failure_creates_new_job(self):
+        first = enqueue_lookup(VALID_EAN)
+        first.status = EanLookupJob.Status.FAILED
+        first.save()
+        assert enqueue_lookup(VALID_EAN).pk != first.pk
+
+    def test_claim_takes_oldest_pending(self):
+        first = enqueue_lookup(VALID_EAN)
+        enqueue_lookup(MISSING_EAN)
+        job = claim_next_job()
+        assert job.pk == first.pk
+        assert job.status == EanLookupJob.Status.RUNNING
+        assert job.attempts == 1
+        assert claim_next_job().ean_code == MISSING_EAN
+        assert claim_next_job() is None
+
+    def test_requeue_stale_jobs(self):
+        enqueue_lookup(VALID_EAN)
+        job = claim_next_job()
+        EanLookupJob.objects.filter(pk=job.pk).update(
+            started_at=timezone.now() - timedelta(minutes=10)
+        )
+        assert requeue_stale_jobs(60) == 1
+        assert claim_next_job().pk == job.pk
+
+    def test_stale_job_fails_after_max_attempts(self):
+        enqueue_lookup(VALID_EAN)
+        job = claim_next_job()
+        EanLookupJob.objects.filter(pk=job.pk).update(
+            attempts=3, started_at=timezone.now() - timedelta(minutes=10)
+        )
+        assert requeue_stale_jobs(60, max_attempts=3) == 0
+        job.refresh_from_db()
+        assert job.status == EanLookupJob.Status.FAILED
+        assert job.finished_at is not None
+        assert claim_next_job() is None
+
+
+@pytest.mark.django_db
+class TestRunJob:
+    def test_success_creates_product(self, stub_api):
+        enqueue_lookup(VALID_EAN)
+        job = run_job(claim_next_job())
+        assert job.status == EanLookupJob.Status.DONE
+        assert job.product == Product.objects.get(ean_code=VALID_EAN)
+        assert job.finished_at is not None
+
+    def test_api_error_fails_job(self, stub_api):
+        enqueue_lookup(MISSING_EAN)
+        job = run_job(claim_next_job())
+        assert job.status == EanLookupJob.Status.FAILED
+        assert job.error == "Ошибка, товар не был найден"
+        assert not Product.objects.exists()
+
+    def test_unexpected_error_fails_job(self, mocker):
+        mocker.patch("add_food.jobs.add_product", side_effect=RuntimeError("boom"))
+        enqueue_lookup(VALID_EAN)
+        job = run_job(claim_next_job())
+        assert job.status == EanLookupJob.Status.FAILED
+        assert "boom" not in job.error
+
+    def test_worker_command_once(self, stub_api):
+        enqueue_lookup(VALID_EAN)
+        enqueue_lookup(MISSING_EAN)
+        call_command("run_ean_worker", once=True)
+        statuses = dict(EanLookupJob.objects.values_list("ean_code", "status"))
+        assert statuses == {VALID_EAN: "done", MISSING_EAN: "failed"}
+        assert process_pending() == 0
+
+
+@pytest.mark.django_db
+class TestAsyncViews:
+    @pytest.fixture(autouse=True)
+    def async_mode(self, settings):
+        settings.EAN_LOOKUP_ASYNC = True
+
+    def test_post_enqueues_and_redirects(self, client, mocker):
+        api = mocker.patch("add_food.views.add_product")
+        response = client.post(reverse("add_food:add_product"), {"ean_code": VALID_EAN})
+        job = EanLookupJob.objects.get()
+        api.assert_not_called()
+        assert response.url == reverse("add_food:lookup_status", args=[job.pk])
+
+    def test_pending_status_polls(self, client):
+        job = enqueue_lookup(VALID_EAN)
+        url = reverse("add_food:lookup_status", args=[job.pk])
+        response = client.get(url)
+        assert response.templates[0].name == "add_food/lookup_status.html"
+        assert 'hx-trigger="every 1s"' in response.content.decode()
+
+    def test_done_status_redirects_htmx(self, client, stub_api):
+        job = enqueue_lookup(VALID_EAN)
+        process_pending()
+        url = reverse("add_food:lookup_status", args=[job.pk])
+        response = client.get(url, headers={"HX-Request": "true"})
+        assert response["HX-Redirect"] == reverse("rate_food:add_rate")
+        product = Product.objects.get(ean_code=VALID_EAN)
+        assert client.session["current_product_id"] == product.pk
+
+    def test_failed_status_shows_error(self, client, stub_api):
+        job = enqueue_lookup(MISSING_EAN)
+        process_pending()
+        url = reverse("add_food:lookup_status", args=[job.pk])
+        response = client.get(url, headers={"HX-Request": "true"})
+        content = response.content.decode()
+        assert "Ошибка, товар не был найден" in content
+        assert "hx-trigger" not in content
+
+    def test_unknown_job_404(self, client):
+        url = reverse(
+            "add_food:lookup_status", args=["00000000-0000-0000-0000-000000000000"]
+        )
+        assert client.get(url).status_code == 404
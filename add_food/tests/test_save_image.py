@@ -1,16 +1,30 @@
+import hashlib
+import io
 import os
 
+from PIL import Image
+
 from add_food.services import save_image, ImageDownloadError
 
 def test_save_image_success(mocker, settings, tmp_path):
     mock_download = mocker.patch(
         "add_food.services.download_image",
-        return_value=b"fake_image_data"
+        return_value=io.BytesIO(b"fake_image_data")
     )
 
+    digest = hashlib.sha256(b"fake_image_data").hexdigest()
+    expected_path = f"products/{digest[:2]}/{digest}.jpg"
+    mocker.patch("food_hub.utils.images.default_storage.exists", return_value=False)
+    written = {}
+
+    def fake_save(path, content):
+        # Файл закрывается после save_image - содержимое читаем сразу
+        written[path] = content.read()
+        return path
+
     mock_save = mocker.patch(
-        "add_food.services.default_storage.save",
-        return_value="products/image.jpg"
+        "food_hub.utils.images.default_storage.save",
+        side_effect=fake_save
     )
 
     data = {"product": {"barcode": "123"}}
@@ -22,13 +36,10 @@ def test_save_image_success(mocker, settings, tmp_path):
 
     mock_save.assert_called_once()
 
-    called_path = mock_save.call_args.args[0]
-    called_content = mock_save.call_args.args[1]
+    # Имя файла - хэш содержимого, а не имя из URL
+    assert written == {expected_path: b"fake_image_data"}
 
-    assert called_path == "products/image.jpg"
-    assert called_content.read() == b"fake_image_data"
-
-    assert result == "products/image.jpg"
+    assert result == expected_path
 
 
 def test_save_image_download_error(mocker, settings, tmp_path):
@@ -38,7 +49,7 @@ def test_save_image_download_error(mocker, settings, tmp_path):
     )
 
     mock_save = mocker.patch(
-        "add_food.services.default_storage.save",
+        "food_hub.utils.images.default_storage.save",
         return_value="products/image.jpg"
     )
 
@@ -58,7 +69,7 @@ def test_save_image_url_is_none(mocker, settings, tmp_path):
     )
 
     mock_save = mocker.patch(
-        "add_food.services.default_storage.save",
+        "food_hub.utils.images.default_storage.save",
         return_value="products/image.jpg"
     )
 
@@ -76,11 +87,11 @@ def test_save_image_url_is_none(mocker, settings, tmp_path):
 def test_save_image_storage_error(mocker, settings, tmp_path):
     mocker.patch(
         "add_food.services.download_image",
-        return_value=b"image_data"
+        return_value=io.BytesIO(b"image_data")
     )
 
     mocker.patch(
-        "add_food.services.default_storage.save",
+        "food_hub.utils.images.default_storage.save",
         side_effect=Exception("Disk full")
     )
 
@@ -96,7 +107,7 @@ def test_save_image_with_real_storage(mocker, settings, tmp_path):
 
     mocker.patch(
         "add_food.services.download_image",
-        return_value=b"fake_png_data"
+        return_value=io.BytesIO(b"fake_png_data")
     )
 
     data = {"product": {"barcode": "123"}}
@@ -111,3 +122,35 @@ def test_save_image_with_real_storage(mocker, settings, tmp_path):
 
     with open(full_path, "rb") as f:
         assert f.read() == b"fake_png_data"
+
+
+def test_save_image_deduplicates_content(mocker, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    png = b"\x89PNG\r\n\x1a\n" + b"same_bytes"
+    mocker.patch(
+        "add_food.services.download_image",
+        side_effect=lambda url: io.BytesIO(png),
+    )
+
+    first = save_image({"product": {"barcode": "111"}}, "http://a.example.com/x.png")
+    second = save_image({"product": {"barcode": "222"}}, "http://b.example.com/x.png")
+
+    assert first == second
+    assert first.endswith(".png")
+    assert len(list(tmp_path.rglob("*.png"))) == 1
+
+
+def test_save_image_builds_thumbnails(mocker, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    buffer = io.BytesIO()
+    Image.new("RGB", (800, 600), "red").save(buffer, "PNG")
+    mocker.patch("add_food.services.download_image", return_value=buffer)
+
+    result = save_image({"product": {"barcode": "123"}}, "http://example.com/x.png")
+
+    assert sorted(path.name.split("_")[1] for path in tmp_path.rglob("*.webp")) == [
+        "160.webp",
+        "320.webp",
+        "640.webp",
+    ]
+    assert os.path.exists(os.path.join(tmp_path, result))
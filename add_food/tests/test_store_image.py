@@ -0,0 +1,163 @@
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from add_food.services import (
+    DEFAULT_IMAGE_PATH,
+    _image_task,
+    get_or_create_product,
+    schedule_image_download,
+    store_product_image,
+)
+from add_food.models import EanApiResponse
+from food_hub.models import Category, Company, Country, Product
+
+EAN = "4006381333931"
+IMAGE_URL = "https://img.example.com/4006381333931.png"
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def product():
+    country = Country.objects.create(name="Germany")
+    company = Company.objects.create(name="Test Corp", country=country)
+    category = Category.objects.create(name="Snacks")
+    return Product.objects.create(
+        ean_code=EAN,
+        name="Test Product",
+        category=category,
+        company=company,
+        img_field=DEFAULT_IMAGE_PATH,
+    )
+
+
+@pytest.fixture
+def executor(mocker):
+    executor = mocker.Mock()
+    mocker.patch("add_food.services.get_image_executor", return_value=executor)
+    return executor
+
+
+def test_store_replaces_placeholder(mocker, product):
+    mocker.patch("add_food.services.save_image", return_value="products/new.png")
+    mocker.patch("food_hub.utils.images.default_storage.exists", return_value=True)
+    assert store_product_image(product.pk, EAN, IMAGE_URL) == "products/new.png"
+    product.refresh_from_db()
+    assert product.img_field.name == "products/new.png"
+
+
+def test_store_keeps_placeholder_on_failed_download(mocker, product):
+    mocker.patch("add_food.services.save_image", return_value=DEFAULT_IMAGE_PATH)
+    store_product_image(product.pk, EAN, IMAGE_URL)
+    product.refresh_from_db()
+    assert product.img_field.name == DEFAULT_IMAGE_PATH
+
+
+def test_store_keeps_file_when_image_already_set(mocker, product):
+    Product.objects.filter(pk=product.pk).update(img_field="products/manual.png")
+    mocker.patch("add_food.services.save_image", return_value="products/new.png")
+    mocker.patch("food_hub.utils.images.default_storage.exists", return_value=True)
+    delete = mocker.patch("food_hub.utils.images.default_storage.delete")
+    store_product_image(product.pk, EAN, IMAGE_URL)
+    # Ничьи файлы убирает cleanup_product_images, а не загрузка
+    delete.assert_not_called()
+    product.refresh_from_db()
+    assert product.img_field.name == "products/manual.png"
+
+
+def test_store_keeps_placeholder_when_file_was_cleaned_up(mocker, product):
+    mocker.patch("add_food.services.save_image", return_value="products/new.png")
+    mocker.patch("food_hub.utils.images.default_storage.exists", return_value=False)
+    assert store_product_image(product.pk, EAN, IMAGE_URL) == DEFAULT_IMAGE_PATH
+    product.refresh_from_db()
+    assert product.img_field.name == DEFAULT_IMAGE_PATH
+
+
+def test_schedule_submits_after_commit(
+    product, executor, django_capture_on_commit_callbacks
+):
+    with django_capture_on_commit_callbacks(execute=False) as callbacks:
+        schedule_image_download(product, IMAGE_URL)
+    executor.submit.assert_not_called()
+    callbacks[0]()
+    executor.submit.assert_called_once_with(_image_task, product.pk, EAN, IMAGE_URL)
+
+
+@pytest.mark.parametrize("image_url", [None, ""])
+def test_schedule_skips_without_url(
+    product, executor, image_url, django_capture_on_commit_callbacks
+):
+    with django_capture_on_commit_callbacks(execute=True):
+        schedule_image_download(product, image_url)
+    executor.submit.assert_not_called()
+
+
+def test_view_answers_before_image_download(
+    client, mocker, executor, django_capture_on_commit_callbacks
+):
+    mocker.patch(
+        "add_food.views.add_product",
+        return_value={
+            "name": "Test Product",
+            "country": "Germany",
+            "company": "Test Corp",
+            "category": "Snacks",
+            "save_path": DEFAULT_IMAGE_PATH,
+            "image_url": IMAGE_URL,
+        },
+    )
+    save = mocker.patch("add_food.services.save_image")
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(reverse("add_food:add_product"), {"ean_code": EAN})
+
+    assert response.url == reverse("rate_food:add_rate")
+    product = Product.objects.get(ean_code=EAN)
+    assert product.img_field.name == DEFAULT_IMAGE_PATH
+    save.assert_not_called()
+    executor.submit.assert_called_once_with(_image_task, product.pk, EAN, IMAGE_URL)
+
+
+def test_upsert_keeps_image_url(product):
+    created = get_or_create_product(
+        "4600000000015",
+        {
+            "name": "Печенье",
+            "company": "Кондитер",
+            "country": "Россия",
+            "category": "Сладости",
+            "save_path": DEFAULT_IMAGE_PATH,
+            "image_url": IMAGE_URL,
+        },
+    )
+    assert Product.objects.get(pk=created.pk).image_url == IMAGE_URL
+
+
+def test_fetch_command_retries_placeholders(mocker, product):
+    Product.objects.filter(pk=product.pk).update(image_url=IMAGE_URL)
+    task = mocker.patch("add_food.management.commands.fetch_product_images._image_task")
+    call_command("fetch_product_images", workers=1)
+    task.assert_called_once_with(product.pk, EAN, IMAGE_URL)
+
+
+def test_fetch_command_uses_cached_response(mocker, product):
+    EanApiResponse.objects.create(
+        ean_code=EAN,
+        outcome=EanApiResponse.Outcome.FOUND,
+        payload={"product": {"images": [{"url": IMAGE_URL}]}},
+        fetched_at=timezone.now(),
+        expires_at=timezone.now(),
+    )
+    task = mocker.patch("add_food.management.commands.fetch_product_images._image_task")
+    call_command("fetch_product_images", workers=1)
+    task.assert_called_once_with(product.pk, EAN, IMAGE_URL)
+
+
+def test_fetch_command_skips_replaced_images(mocker, product):
+    Product.objects.filter(pk=product.pk).update(
+        img_field="products/manual.png", image_url=IMAGE_URL
+    )
+    task = mocker.patch("add_food.management.commands.fetch_product_images._image_task")
+    call_command("fetch_product_images", workers=1)
+    task.assert_not_called()
@@ -0,0 +1,102 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from add_food.services import get_or_create_product, upsert_products
+from food_hub.models import Category, Company, Country, Product
+from food_hub.refcache import reference_cache
+
+pytestmark = pytest.mark.django_db
+
+
+def api_data(name="Печенье", company="Кондитер", country="Россия", category="Сладости"):
+    return {
+        "name": name,
+        "company": company,
+        "country": country,
+        "category": category,
+        "save_path": "products/default_image.png",
+    }
+
+
+def statements(queries):
+    return [
+        query["sql"].split()[0]
+        for query in queries
+        if not query["sql"].startswith(("SAVEPOINT", "RELEASE"))
+    ]
+
+
+def test_new_product_takes_one_statement_per_table():
+    with CaptureQueriesContext(connection) as ctx:
+        product = get_or_create_product("4600000000015", api_data())
+    # Версия reference_cache читается один раз на пачку
+    assert statements(ctx.captured_queries) == ["SELECT"] + ["INSERT"] * 4
+    assert Product.objects.get(pk=product.pk).company.country.name == "Россия"
+
+
+def test_existing_rows_are_reused_unchanged():
+    first = get_or_create_product("4600000000015", api_data())
+    Product.objects.filter(pk=first.pk).update(img_field="products/real.png")
+    again = get_or_create_product(
+        "4600000000015", api_data(name="Другое имя", country="Германия")
+    )
+    assert again.pk == first.pk
+    stored = Product.objects.get(pk=first.pk)
+    assert stored.name == "Печенье"
+    assert stored.img_field.name == "products/real.png"
+    # Компания уникальна по имени и остаётся в своей стране
+    assert Company.objects.get().country.name == "Россия"
+    assert Country.objects.count() == 2
+
+
+def test_batch_shares_reference_rows():
+    products = upsert_products(
+        {
+            "4600000000015": api_data(name="Печенье"),
+            "4600000000022": api_data(name="Вафли"),
+            "4600000000039": api_data(name="Пряники", category="Выпечка"),
+        }
+    )
+    assert len({p.pk for p in products.values()}) == 3
+    assert Company.objects.count() == 1
+    assert Category.objects.count() == 2
+
+
+def test_upsert_bumps_search_version(mocker, django_capture_on_commit_callbacks):
+    bump = mocker.patch("add_food.services.bump_search_version")
+    with django_capture_on_commit_callbacks(execute=True):
+        get_or_create_product("4600000000015", api_data())
+    bump.assert_called_once()
+
+
+def test_cached_references_skip_statements(django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        get_or_create_product("4600000000015", api_data(name="Печенье"))
+    with CaptureQueriesContext(connection) as ctx:
+        product = get_or_create_product("4600000000022", api_data(name="Вафли"))
+    # Страна, компания и категория из кэша - остаются чтение версии
+    # и вставка продукта
+    assert statements(ctx.captured_queries) == ["SELECT", "INSERT"]
+    assert product.company_id == Company.objects.get().pk
+    assert reference_cache.stats()["hits"] == 3
+
+
+# Внешние ключи в PostgreSQL отложенные - нарушение всплывает только при коммите
+@pytest.mark.django_db(transaction=True)
+def test_stale_reference_is_retried():
+    reference_cache.set_many(Country, {"Россия": 999999})
+    product = get_or_create_product("4600000000015", api_data())
+    assert Product.objects.get(pk=product.pk).company.country.name == "Россия"
+
+
+def test_cache_stats_requires_staff(client, django_user_model):
+    url = reverse("add_food:cache_stats")
+    assert client.get(url).status_code == 302
+
+    staff = django_user_model.objects.create_user("staff", password="x", is_staff=True)
+    client.force_login(staff)
+    data = client.get(url).json()
+    assert set(data) == {"reference_cache", "ean_api_cache"}
+    assert data["reference_cache"]["maxsize"] == 1024
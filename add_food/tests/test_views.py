@@ -2,7 +2,6 @@ from unittest.mock import patch
 from django.test import TestCase
 from django.urls import reverse
 from django.db import DatabaseError, IntegrityError
-from add_food.forms import AddProductForm
 from add_food.services import ApiError
 from food_hub.models import Category, Company, Country, Product
 
@@ -43,16 +42,19 @@ class AddProductViewTests(TestCase):
 
     def test_existing_product_redirects(self):
         make_product()
-        with patch("add_food.views.add_product") as mock_api, \
-             patch.object(AddProductForm, "validate_unique"):
+        with patch("add_food.views.add_product") as mock_api:
             response = self.client.post(self.url, self.form_data)
             mock_api.assert_not_called()
         self.assertRedirects(response, reverse("rate_food:add_rate"))
 
+    def test_existing_product_passes_form(self):
+        make_product()
+        response = self.client.post(self.url, self.form_data)
+        self.assertRedirects(response, reverse("rate_food:add_rate"))
+
     def test_existing_product_saves_id_in_session(self):
         product = make_product()
-        with patch.object(AddProductForm, "validate_unique"):
-            self.client.post(self.url, self.form_data)
+        self.client.post(self.url, self.form_data)
         self.assertEqual(self.client.session["current_product_id"], product.pk)
 
 
@@ -73,9 +75,8 @@ class AddProductViewTests(TestCase):
     @patch("add_food.views.add_product")
     def test_duplicate_ean_no_duplicate_created(self, mock_api):
         mock_api.return_value = make_api_data()
-        with patch.object(AddProductForm, "validate_unique"):
-            self.client.post(self.url, self.form_data)
-            self.client.post(self.url, self.form_data)
+        self.client.post(self.url, self.form_data)
+        self.client.post(self.url, self.form_data)
         self.assertEqual(Product.objects.filter(ean_code=VALID_EAN).count(), 1)
 
 
@@ -6,4 +6,10 @@ app_name = "add_food"
 
 urlpatterns = [
     path("", views.AddProductView.as_view(), name="add_product"),
+    path(
+        "lookup/<uuid:job_id>/",
+        views.LookupStatusView.as_view(),
+        name="lookup_status",
+    ),
+    path("stats/caches/", views.CacheStatsView.as_view(), name="cache_stats"),
 ]
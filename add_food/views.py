@@ -1,10 +1,26 @@
-from django.db import DatabaseError, IntegrityError, transaction
-from django.shortcuts import redirect, render
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import DatabaseError
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.decorators import method_decorator
+from django.views import View
 from django.views.generic.edit import FormView
+from django_htmx.http import HttpResponseClientRedirect
 
 from add_food.forms import AddProductForm
-from add_food.services import ApiError, add_product
-from food_hub.models import Category, Company, Country, Product
+from add_food.jobs import enqueue_lookup
+from add_food.models import EanLookupJob
+from add_food.services import (
+    ApiError,
+    add_product,
+    api_cache_stats,
+    get_or_create_product,
+    schedule_image_download,
+)
+from food_hub.models import Product
+from food_hub.refcache import reference_cache
+from rate_food.wizard import start_url
 
 
 class AddProductView(FormView):
@@ -12,26 +28,7 @@ class AddProductView(FormView):
     form_class = AddProductForm
 
     def _get_or_create_product(self, ean: str, api_data: dict) -> Product:
-        with transaction.atomic():
-            country, _ = Country.objects.get_or_create(name=api_data["country"])
-            company, _ = Company.objects.get_or_create(
-                name=api_data["company"], country=country
-            )
-            category, _ = Category.objects.get_or_create(name=api_data["category"])
-            try:
-                with transaction.atomic():
-                    product, _ = Product.objects.get_or_create(
-                        ean_code=ean,
-                        defaults={
-                            "name": api_data["name"],
-                            "category": category,
-                            "company": company,
-                            "img_field": api_data["save_path"],
-                        },
-                    )
-            except IntegrityError:
-                product = Product.objects.get(ean_code=ean)
-        return product
+        return get_or_create_product(ean, api_data)
 
     def form_valid(self, form):
         ean = form.cleaned_data["ean_code"]
@@ -39,6 +36,11 @@ class AddProductView(FormView):
         try:
             product = Product.objects.get(ean_code=ean)
         except Product.DoesNotExist:
+            if settings.EAN_LOOKUP_ASYNC:
+                # Внешний API не держит веб-воркер: запрос выполнит run_ean_worker
+                job = enqueue_lookup(ean)
+                return redirect("add_food:lookup_status", job_id=job.pk)
+
             try:
                 api_data = add_product(ean)
             except ApiError as error:
@@ -50,6 +52,38 @@ class AddProductView(FormView):
             except DatabaseError:
                 form.add_error("ean_code", "Ошибка записи данных, попробуйте позже")
                 return render(self.request, self.template_name, {"form": form})
+            # Продукт создан с заглушкой, картинка подтянется в фоне
+            schedule_image_download(product, api_data.get("image_url"))
+
+        return redirect(start_url(self.request, product.pk))
+
+
+class LookupStatusView(View):
+    template_name = "add_food/lookup_status.html"
+    partial_template_name = "add_food/partials/lookup_status.html"
+
+    def get(self, request, job_id):
+        job = get_object_or_404(EanLookupJob, pk=job_id)
+
+        if job.status == EanLookupJob.Status.DONE and job.product_id:
+            rate_url = start_url(request, job.product_id)
+            # Опрос идёт через HTMX - переход делает клиент
+            if request.htmx:
+                return HttpResponseClientRedirect(rate_url)
+            return redirect(rate_url)
+
+        template = self.partial_template_name if request.htmx else self.template_name
+        return render(request, template, {"job": job})
+
+
+@method_decorator(staff_member_required, name="dispatch")
+class CacheStatsView(View):
+    """Размер и попадания кэшей add_food - для мониторинга."""
 
-        self.request.session["current_product_id"] = product.pk
-        return redirect("rate_food:add_rate")
+    def get(self, request):
+        return JsonResponse(
+            {
+                "reference_cache": reference_cache.stats(),
+                "ean_api_cache": api_cache_stats(),
+            }
+        )
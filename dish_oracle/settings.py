@@ -15,6 +15,7 @@ from pathlib import Path
 import environ
 
 from django.contrib.messages import constants as messages
+from django.core.exceptions import ImproperlyConfigured
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -33,6 +34,73 @@ ALLOWED_HOSTS = env.list("ALLOWED_HOSTS", default=["localhost"])
 
 EAN_DB_API_URL = env("EAN_DB_API_URL")
 EAN_DB_JWT = env("EAN_DB_JWT")
+# Поиск EAN в фоне: форма ставит задачу, её выполняет manage.py run_ean_worker
+EAN_LOOKUP_ASYNC = env.bool("EAN_LOOKUP_ASYNC", default=False)
+# Через сколько секунд задача в статусе running считается зависшей
+EAN_JOB_STALE_TIMEOUT = env.int("EAN_JOB_STALE_TIMEOUT", default=300)
+# Сколько раз задача может зависнуть, прежде чем будет помечена failed
+EAN_JOB_MAX_ATTEMPTS = env.int("EAN_JOB_MAX_ATTEMPTS", default=3)
+# Время жизни кэша ответов EAN API в секундах: найденные, 404, неполные данные
+EAN_CACHE_TTL_FOUND = env.int("EAN_CACHE_TTL_FOUND", default=30 * 24 * 3600)
+EAN_CACHE_TTL_NOT_FOUND = env.int("EAN_CACHE_TTL_NOT_FOUND", default=24 * 3600)
+EAN_CACHE_TTL_INCOMPLETE = env.int("EAN_CACHE_TTL_INCOMPLETE", default=7 * 24 * 3600)
+
+# manage.py import_eans: параллельных запросов и запросов в секунду к EAN API
+EAN_IMPORT_WORKERS = env.int("EAN_IMPORT_WORKERS", default=4)
+EAN_IMPORT_RATE = env.float("EAN_IMPORT_RATE", default=5)
+# Сколько пар имя -> id справочников держать в памяти процесса
+REFERENCE_CACHE_SIZE = env.int("REFERENCE_CACHE_SIZE", default=1024)
+# Потоков для фоновой загрузки картинок новых продуктов
+IMAGE_DOWNLOAD_WORKERS = env.int("IMAGE_DOWNLOAD_WORKERS", default=4)
+# Качество WebP превью карточек (0-100)
+IMAGE_THUMBNAIL_QUALITY = env.int("IMAGE_THUMBNAIL_QUALITY", default=80)
+# Скачиваемая картинка держится в памяти до стольких байт, дальше - на диске
+IMAGE_SPOOL_MAX_SIZE = env.int("IMAGE_SPOOL_MAX_SIZE", default=512 * 1024)
+# Картинки с большим числом пикселей отбрасываются по заголовку
+IMAGE_MAX_PIXELS = env.int("IMAGE_MAX_PIXELS", default=25_000_000)
+
+# HTTP клиент add_food: таймауты в секундах, повторы с экспоненциальной
+# паузой и джиттером, пул соединений на хост
+HTTP_CONNECT_TIMEOUT = env.float("HTTP_CONNECT_TIMEOUT", default=3.05)
+HTTP_READ_TIMEOUT = env.float("HTTP_READ_TIMEOUT", default=10)
+HTTP_MAX_RETRIES = env.int("HTTP_MAX_RETRIES", default=2)
+HTTP_BACKOFF_FACTOR = env.float("HTTP_BACKOFF_FACTOR", default=0.3)
+HTTP_BACKOFF_JITTER = env.float("HTTP_BACKOFF_JITTER", default=0.2)
+HTTP_POOL_CONNECTIONS = env.int("HTTP_POOL_CONNECTIONS", default=4)
+HTTP_POOL_MAXSIZE = env.int("HTTP_POOL_MAXSIZE", default=10)
+# Сколько отказов EAN API подряд размыкают цепь и на сколько секунд
+HTTP_BREAKER_FAILURES = env.int("HTTP_BREAKER_FAILURES", default=5)
+HTTP_BREAKER_RESET_TIMEOUT = env.int("HTTP_BREAKER_RESET_TIMEOUT", default=30)
+
+# Search settings
+# Порог word_similarity для нечёткого (trigram) этапа поиска, 0..1
+SEARCH_TRIGRAM_THRESHOLD = env.float("SEARCH_TRIGRAM_THRESHOLD", default=0.6)
+# Максимум строк нечёткого этапа и минимальная длина запроса для него
+SEARCH_FUZZY_LIMIT = env.int("SEARCH_FUZZY_LIMIT", default=50)
+SEARCH_FUZZY_MIN_LENGTH = env.int("SEARCH_FUZZY_MIN_LENGTH", default=3)
+# Подсказки при вводе: сколько строк отдавать и какие префиксы кэшировать
+SEARCH_SUGGEST_LIMIT = env.int("SEARCH_SUGGEST_LIMIT", default=8)
+SEARCH_SUGGEST_CACHE_PREFIX_LENGTH = env.int(
+    "SEARCH_SUGGEST_CACHE_PREFIX_LENGTH", default=3
+)
+SEARCH_SUGGEST_CACHE_TIMEOUT = env.int("SEARCH_SUGGEST_CACHE_TIMEOUT", default=300)
+# Кэш результатов поиска (упорядоченные id): время жизни и максимум id
+SEARCH_RESULT_CACHE_TIMEOUT = env.int("SEARCH_RESULT_CACHE_TIMEOUT", default=600)
+SEARCH_MAX_RESULTS = env.int("SEARCH_MAX_RESULTS", default=500)
+# Карточек на страницу результатов и верхняя граница для ?page_size=
+SEARCH_PAGE_SIZE = env.int("SEARCH_PAGE_SIZE", default=24)
+SEARCH_MAX_PAGE_SIZE = env.int("SEARCH_MAX_PAGE_SIZE", default=96)
+# Меню тегов категории для оценки: сбрасывается при изменении тегов,
+# ранжирование по популярности обновляется раз в столько секунд
+TAG_MENU_CACHE_TIMEOUT = env.int("TAG_MENU_CACHE_TIMEOUT", default=300)
+# Мастер оценки хранит шаги в подписанных токенах внутри форм, а не в сессии;
+# токен действителен столько секунд
+RATING_WIZARD_SIGNED_STATE = env.bool("RATING_WIZARD_SIGNED_STATE", default=False)
+RATING_WIZARD_STATE_MAX_AGE = env.int("RATING_WIZARD_STATE_MAX_AGE", default=1800)
+# Массовая загрузка оценок: строк в одной транзакции и максимум строк
+# в одном запросе к JSON API
+RATING_INGEST_BATCH_SIZE = env.int("RATING_INGEST_BATCH_SIZE", default=500)
+RATING_INGEST_MAX_ROWS = env.int("RATING_INGEST_MAX_ROWS", default=5000)
 
 # Application definition
 
@@ -93,10 +161,49 @@ DATABASES = {
         "PASSWORD": env("DB_PASSWORD"),
         "HOST": env("DB_HOST", default="127.0.0.1"),
         "PORT": env("DB_PORT", default="5432"),
+        "OPTIONS": {
+            # Оператор %> (индексы gin_trgm_ops) берёт порог из этой переменной
+            "options": (
+                f"-c pg_trgm.word_similarity_threshold={SEARCH_TRIGRAM_THRESHOLD}"
+            ),
+        },
     }
 }
 
 
+# Cache and sessions
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# CACHE_URL: locmemcache:// (по умолчанию, свой в каждом процессе),
+# filecache:///var/tmp/dish_oracle, rediscache://127.0.0.1:6379/1.
+# Здесь лежат результаты поиска, подсказки, меню тегов и сессии (cache,
+# cached_db). Их версии и версия справочников хранятся в таблице
+# CacheVersion, поэтому сброс доходит до всех процессов и с локальным
+# бэкендом; общий бэкенд лишь избавляет от прогрева кэша в каждом процессе
+CACHES = {"default": env.cache_url("CACHE_URL", default="locmemcache://")}
+
+# SESSION_BACKEND:
+#   db - строка django_session на каждый шаг, старые чистит clearsessions;
+#   cached_db - чтение из кэша, запись в кэш и БД;
+#   cache - только кэш (с locmemcache сессии не видны другим процессам);
+#   file - файлы в SESSION_FILE_PATH (по умолчанию временный каталог);
+#   signed_cookies - всё состояние в подписанной cookie
+SESSION_ENGINES = {
+    "db": "django.contrib.sessions.backends.db",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "cache": "django.contrib.sessions.backends.cache",
+    "file": "django.contrib.sessions.backends.file",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}
+SESSION_BACKEND = env.str("SESSION_BACKEND", default="db")
+if SESSION_BACKEND not in SESSION_ENGINES:
+    raise ImproperlyConfigured(
+        f"SESSION_BACKEND={SESSION_BACKEND!r}, ожидается одно из: "
+        f"{', '.join(SESSION_ENGINES)}"
+    )
+SESSION_ENGINE = SESSION_ENGINES[SESSION_BACKEND]
+SESSION_FILE_PATH = env.str("SESSION_FILE_PATH", default=None)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
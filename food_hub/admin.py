@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from food_hub.aggregates import refresh_product_aggregates
 from food_hub.models import Category, Company, Country, Product, ProductRating, TasteTag
 
 
@@ -46,3 +47,9 @@ class ProductRatingAdmin(admin.ModelAdmin):
     search_fields = ("product__name", "comment")
     readonly_fields = ("created_at", "updated_at")
     filter_horizontal = ("taste_tags",)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Оценку могли перенести на другой продукт - пересчитываем оба продукта
+        product_ids = {form.instance.product_id, form.initial.get("product")}
+        refresh_product_aggregates([pk for pk in product_ids if pk is not None])
@@ -0,0 +1,232 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import (
+    Case,
+    Count,
+    F,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+
+from food_hub.models import (
+    CategoryTagRateStat,
+    ProductRating,
+    ProductRatingSummary,
+    ProductTagStat,
+)
+
+RATE_VALUES = range(1, 6)
+
+
+def _average(total: int, count: int) -> Decimal:
+    if not count:
+        return Decimal("0")
+    return (Decimal(total) / count).quantize(Decimal("0.01"))
+
+
+def register_rating(rating: ProductRating, tag_ids=None) -> ProductRatingSummary:
+    """
+    Учитывает только что созданную оценку в сводке и статистике тегов продукта.
+    Должна вызываться внутри той же transaction.atomic(), что и создание
+    оценки: строка сводки блокируется до конца транзакции, поэтому
+    параллельные оценки одного продукта обновляют агрегаты по очереди.
+    tag_ids=None - теги читаются из уже сохранённой оценки.
+    """
+    summary, _ = ProductRatingSummary.objects.select_for_update().get_or_create(
+        product_id=rating.product_id
+    )
+    if tag_ids is None:
+        tag_ids = list(rating.taste_tags.values_list("id", flat=True))
+    _increment_tag_stats(rating.product_id, tag_ids)
+
+    rate_field = f"rate_{rating.rate}_count"
+    setattr(summary, rate_field, getattr(summary, rate_field) + 1)
+    summary.ratings_count += 1
+    summary.ratings_sum += rating.rate
+    summary.avg_rate = _average(summary.ratings_sum, summary.ratings_count)
+    summary.last_rate = rating.rate
+    summary.save()
+    return summary
+
+
+def _increment_tag_stats(product_id: int, tag_ids) -> None:
+    tag_ids = set(tag_ids)
+    if not tag_ids:
+        return
+    stats = ProductTagStat.objects.filter(
+        product_id=product_id, taste_tag_id__in=tag_ids
+    )
+    existing = set(stats.values_list("taste_tag_id", flat=True))
+    if existing:
+        stats.update(ratings_count=F("ratings_count") + 1)
+    ProductTagStat.objects.bulk_create(
+        ProductTagStat(product_id=product_id, taste_tag_id=tag_id, ratings_count=1)
+        for tag_id in tag_ids - existing
+    )
+
+
+def register_tag_picks(category_id: int, rate: int, tag_ids) -> None:
+    """Учитывает теги, выбранные при одной оценке rate в категории."""
+    if category_id is None:
+        return
+    increment_tag_picks({(category_id, rate, tag_id): 1 for tag_id in set(tag_ids)})
+
+
+def increment_tag_picks(increments: dict[tuple[int, int, int], int]) -> None:
+    """
+    Увеличивает счётчики выбора тегов: ключ - (category_id, rate, tag_id),
+    значение - на сколько. Недостающие строки создаются с нулём, затем все
+    увеличиваются одним UPDATE: параллельные оценки не конфликтуют
+    на уникальном ключе.
+    """
+    if not increments:
+        return
+    CategoryTagRateStat.objects.bulk_create(
+        [
+            CategoryTagRateStat(category_id=category_id, rate=rate, taste_tag_id=tag_id)
+            for category_id, rate, tag_id in increments
+        ],
+        ignore_conflicts=True,
+    )
+    matches = Q()
+    deltas = []
+    for (category_id, rate, tag_id), delta in increments.items():
+        key = Q(category_id=category_id, rate=rate, taste_tag_id=tag_id)
+        matches |= key
+        deltas.append(When(key, then=Value(delta)))
+    CategoryTagRateStat.objects.filter(matches).update(
+        picks_count=F("picks_count") + Case(*deltas, default=Value(0))
+    )
+
+
+def refresh_category_tag_stats() -> int:
+    """
+    Полный пересчёт счётчиков выбора тегов по категориям и оценкам.
+    Удалённые оценки счётчики не уменьшают - их поправляет этот пересчёт.
+    """
+    rows = (
+        ProductRating.taste_tags.through.objects.order_by()
+        .values(
+            "productrating__product__category_id",
+            "productrating__rate",
+            "tastetag_id",
+        )
+        .annotate(count=Count("id"))
+    )
+    fresh = [
+        CategoryTagRateStat(
+            category_id=row["productrating__product__category_id"],
+            rate=row["productrating__rate"],
+            taste_tag_id=row["tastetag_id"],
+            picks_count=row["count"],
+        )
+        for row in rows
+    ]
+
+    with transaction.atomic():
+        CategoryTagRateStat.objects.all().delete()
+        CategoryTagRateStat.objects.bulk_create(fresh, batch_size=1000)
+    return len(fresh)
+
+
+def refresh_rating_summaries(product_ids=None) -> int:
+    """
+    Пересчитывает сводки по таблице ProductRating одним агрегирующим запросом.
+    product_ids=None - полный пересчёт. Продукты без оценок теряют сводку.
+    Возвращает количество записанных сводок.
+    """
+    ratings = ProductRating.objects.all()
+    summaries = ProductRatingSummary.objects.all()
+    if product_ids is not None:
+        ratings = ratings.filter(product_id__in=product_ids)
+        summaries = summaries.filter(product_id__in=product_ids)
+
+    latest_rate = (
+        ProductRating.objects.filter(product_id=OuterRef("product_id"))
+        .order_by("-created_at", "-id")
+        .values("rate")[:1]
+    )
+    rows = (
+        ratings.order_by()
+        .values("product_id")
+        .annotate(
+            count=Count("id"),
+            total=Sum("rate"),
+            latest=Subquery(latest_rate),
+            **{
+                f"rate_{rate}_count": Count("id", filter=Q(rate=rate))
+                for rate in RATE_VALUES
+            },
+        )
+    )
+    fresh = [
+        ProductRatingSummary(
+            product_id=row["product_id"],
+            ratings_count=row["count"],
+            ratings_sum=row["total"],
+            avg_rate=_average(row["total"], row["count"]),
+            last_rate=row["latest"],
+            **{f"rate_{rate}_count": row[f"rate_{rate}_count"] for rate in RATE_VALUES},
+        )
+        for row in rows
+    ]
+
+    with transaction.atomic():
+        summaries.exclude(product_id__in=[s.product_id for s in fresh]).delete()
+        ProductRatingSummary.objects.bulk_create(
+            fresh,
+            update_conflicts=True,
+            unique_fields=["product"],
+            update_fields=[
+                "ratings_count",
+                "ratings_sum",
+                "avg_rate",
+                "last_rate",
+                *(f"rate_{rate}_count" for rate in RATE_VALUES),
+                "updated_at",
+            ],
+        )
+    return len(fresh)
+
+
+def refresh_tag_stats(product_ids=None) -> int:
+    """
+    Пересчитывает статистику тегов по связям оценок с тегами.
+    product_ids=None - полный пересчёт. Возвращает количество строк.
+    """
+    links = ProductRating.taste_tags.through.objects.all()
+    stats = ProductTagStat.objects.all()
+    if product_ids is not None:
+        links = links.filter(productrating__product_id__in=product_ids)
+        stats = stats.filter(product_id__in=product_ids)
+
+    rows = (
+        links.order_by()
+        .values("productrating__product_id", "tastetag_id")
+        .annotate(count=Count("id"))
+    )
+    fresh = [
+        ProductTagStat(
+            product_id=row["productrating__product_id"],
+            taste_tag_id=row["tastetag_id"],
+            ratings_count=row["count"],
+        )
+        for row in rows
+    ]
+
+    with transaction.atomic():
+        stats.delete()
+        ProductTagStat.objects.bulk_create(fresh, batch_size=1000)
+    return len(fresh)
+
+
+def refresh_product_aggregates(product_ids=None) -> None:
+    """Пересчёт всех денормализованных агрегатов продуктов."""
+    with transaction.atomic():
+        refresh_rating_summaries(product_ids)
+        refresh_tag_stats(product_ids)
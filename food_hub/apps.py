@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'food_hub'
+
+    def ready(self):
+        from food_hub import signals  # noqa: F401
@@ -0,0 +1,85 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from food_hub.models import Product
+from food_hub.utils.images import (
+    CONTENT_PATH_RE,
+    missing_thumbnails,
+    render_thumbnails,
+    save_thumbnails,
+)
+
+
+def _render(job):
+    """Выполняется в дочернем процессе: только Pillow, без БД и storage."""
+    path, data, quality = job
+    try:
+        return path, render_thumbnails(data, quality), ""
+    except Exception as error:
+        return path, None, str(error)
+
+
+class Command(BaseCommand):
+    help = (
+        "Создаёт недостающие WebP превью для картинок продуктов. "
+        "Декодирование и сжатие идут в пуле процессов, чтение и запись файлов - "
+        "в основном процессе."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Процессов для обработки картинок",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=50,
+            help="Сколько картинок держать в памяти одновременно",
+        )
+
+    def handle(self, *args, **options):
+        paths = (
+            Product.objects.order_by()
+            .values_list("img_field", flat=True)
+            .distinct()
+        )
+        pending = [
+            path
+            for path in paths
+            if CONTENT_PATH_RE.match(path) and missing_thumbnails(path)
+        ]
+        self.stdout.write(f"Картинок без превью: {len(pending)}")
+
+        built = failed = 0
+        batch_size = options["batch_size"]
+        with ProcessPoolExecutor(max_workers=options["workers"]) as pool:
+            for start in range(0, len(pending), batch_size):
+                jobs = []
+                for path in pending[start : start + batch_size]:
+                    try:
+                        with default_storage.open(path, "rb") as image:
+                            data = image.read()
+                    except OSError as error:
+                        self.stderr.write(f"{path}\t{error}")
+                        failed += 1
+                        continue
+                    jobs.append((path, data, settings.IMAGE_THUMBNAIL_QUALITY))
+
+                for path, thumbnails, error in pool.map(_render, jobs):
+                    if thumbnails is None:
+                        self.stderr.write(f"{path}\t{error}")
+                        failed += 1
+                        continue
+                    save_thumbnails(path, thumbnails)
+                    built += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Готово. Создано: {built}, ошибок: {failed}")
+        )
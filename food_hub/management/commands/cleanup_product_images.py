@@ -0,0 +1,86 @@
+import itertools
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+
+from food_hub.models import Product
+from food_hub.utils.images import (
+    DEFAULT_IMAGE_PATH,
+    content_lock,
+    owner_paths,
+    thumbnail_paths,
+    walk_storage,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет файлы картинок продуктов и их превью, на которые не ссылается "
+        "ни один продукт. Один файл может принадлежать нескольким продуктам."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только показать, что будет удалено",
+        )
+        parser.add_argument(
+            "--min-age",
+            type=int,
+            default=3600,
+            help=(
+                "Не трогать файлы моложе стольких секунд: фоновая загрузка "
+                "пишет файл раньше, чем ссылку на него"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        references = dict(
+            Product.objects.values("img_field")
+            .annotate(refs=Count("id"))
+            .values_list("img_field", "refs")
+        )
+        # Превью живут, пока жив оригинал
+        for path, refs in list(references.items()):
+            for thumb in thumbnail_paths(path).values():
+                references[thumb] = refs
+        cutoff = timezone.now() - timedelta(seconds=options["min_age"])
+        scanned = deleted = freed = 0
+        files = itertools.chain(walk_storage("products"), walk_storage("thumbs"))
+        for path in files:
+            scanned += 1
+            if path == DEFAULT_IMAGE_PATH or references.get(path):
+                continue
+            if default_storage.get_modified_time(path) > cutoff:
+                continue
+            size = default_storage.size(path)
+            if not options["dry_run"] and not self._delete_orphan(path, cutoff):
+                continue
+            deleted += 1
+            freed += size
+            self.stdout.write(path)
+
+        action = "Будет удалено" if options["dry_run"] else "Удалено"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Файлов проверено: {scanned}. {action}: {deleted} "
+                f"({freed / 1024:.0f} КБ)"
+            )
+        )
+
+    def _delete_orphan(self, path, cutoff) -> bool:
+        """
+        Повторная проверка и удаление под блокировкой содержимого: загрузка
+        могла за время обхода снова взять этот файл и сослаться на него.
+        """
+        with content_lock(path):
+            if Product.objects.filter(img_field__in=owner_paths(path)).exists():
+                return False
+            if default_storage.get_modified_time(path) > cutoff:
+                return False
+            default_storage.delete(path)
+        return True
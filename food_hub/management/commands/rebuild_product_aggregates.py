@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from food_hub.aggregates import (
+    refresh_category_tag_stats,
+    refresh_product_aggregates,
+)
+from food_hub.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Полностью пересчитывает сводки рейтингов, статистику тегов продуктов "
+        "и популярность тегов в категориях"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Сколько продуктов пересчитывать в одной транзакции",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        product_ids = Product.objects.order_by("id").values_list("id", flat=True)
+        done = 0
+        last_id = 0
+        while True:
+            batch = list(product_ids.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            refresh_product_aggregates(batch)
+            done += len(batch)
+            last_id = batch[-1]
+            self.stdout.write(f"Пересчитано продуктов: {done}")
+        stats = refresh_category_tag_stats()
+        self.stdout.write(f"Счётчиков тегов в категориях: {stats}")
+        self.stdout.write(self.style.SUCCESS(f"Готово, продуктов: {done}"))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-17 12:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("food_hub", "0004_alter_product_name"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["created_at", "id"], name="product_created_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.2.1 on 2026-10-17 13:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from decimal import Decimal
+
+
+def backfill_rating_summaries(apps, schema_editor):
+    ProductRating = apps.get_model("food_hub", "ProductRating")
+    ProductRatingSummary = apps.get_model("food_hub", "ProductRatingSummary")
+
+    rows = (
+        ProductRating.objects.order_by()
+        .values("product_id")
+        .annotate(
+            count=Count("id"),
+            total=Sum("rate"),
+            **{f"rate_{rate}_count": Count("id", filter=Q(rate=rate)) for rate in range(1, 6)},
+        )
+    )
+    summaries = []
+    for row in rows:
+        latest = (
+            ProductRating.objects.filter(product_id=row["product_id"])
+            .order_by("-created_at", "-id")
+            .values_list("rate", flat=True)
+            .first()
+        )
+        summaries.append(
+            ProductRatingSummary(
+                product_id=row["product_id"],
+                ratings_count=row["count"],
+                ratings_sum=row["total"],
+                avg_rate=(Decimal(row["total"]) / row["count"]).quantize(Decimal("0.01")),
+                last_rate=latest,
+                **{f"rate_{rate}_count": row[f"rate_{rate}_count"] for rate in range(1, 6)},
+            )
+        )
+    ProductRatingSummary.objects.bulk_create(summaries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("food_hub", "0005_product_created_id_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductRatingSummary",
+            fields=[
+                (
+                    "product",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="rating_summary",
+                        serialize=False,
+                        to="food_hub.product",
+                    ),
+                ),
+                ("ratings_count", models.PositiveIntegerField(default=0)),
+                ("ratings_sum", models.PositiveIntegerField(default=0)),
+                (
+                    "avg_rate",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=3),
+                ),
+                ("last_rate", models.PositiveSmallIntegerField(blank=True, null=True)),
+                ("rate_1_count", models.PositiveIntegerField(default=0)),
+                ("rate_2_count", models.PositiveIntegerField(default=0)),
+                ("rate_3_count", models.PositiveIntegerField(default=0)),
+                ("rate_4_count", models.PositiveIntegerField(default=0)),
+                ("rate_5_count", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Сводка рейтинга продукта",
+                "verbose_name_plural": "Сводки рейтингов продуктов",
+            },
+        ),
+        migrations.RunPython(backfill_rating_summaries, migrations.RunPython.noop),
+    ]
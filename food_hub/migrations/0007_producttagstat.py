@@ -0,0 +1,85 @@
+# Generated by Django 5.2.1 on 2026-10-17 13:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_tag_stats(apps, schema_editor):
+    ProductRating = apps.get_model("food_hub", "ProductRating")
+    ProductTagStat = apps.get_model("food_hub", "ProductTagStat")
+
+    rows = (
+        ProductRating.taste_tags.through.objects.order_by()
+        .values("productrating__product_id", "tastetag_id")
+        .annotate(count=Count("id"))
+    )
+    ProductTagStat.objects.bulk_create(
+        [
+            ProductTagStat(
+                product_id=row["productrating__product_id"],
+                taste_tag_id=row["tastetag_id"],
+                ratings_count=row["count"],
+            )
+            for row in rows
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("food_hub", "0006_productratingsummary"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductTagStat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("ratings_count", models.PositiveIntegerField(default=0)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="tag_stats",
+                        to="food_hub.product",
+                    ),
+                ),
+                (
+                    "taste_tag",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="product_stats",
+                        to="food_hub.tastetag",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Статистика тега продукта",
+                "verbose_name_plural": "Статистика тегов продуктов",
+                "indexes": [
+                    models.Index(
+                        fields=["taste_tag", "product"],
+                        name="food_hub_pr_taste_t_8d2f5d_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("product", "taste_tag"),
+                        name="unique_tag_stat_per_product",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_tag_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.2.1 on 2026-10-17 14:05
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Вектор собирается триггером, чтобы его обновляли любые пути записи:
+# ORM, bulk_create, upsert и правки компании/категории из админки.
+CREATE_TRIGGERS = """
+CREATE FUNCTION food_hub_product_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('russian', coalesce(NEW.name, '')), 'A')
+        || setweight(to_tsvector('russian', coalesce(
+            (SELECT name FROM food_hub_company WHERE id = NEW.company_id), ''
+        )), 'B')
+        || setweight(to_tsvector('russian', coalesce(
+            (SELECT name FROM food_hub_category WHERE id = NEW.category_id), ''
+        )), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER product_search_vector_update
+    BEFORE INSERT OR UPDATE OF name, company_id, category_id ON food_hub_product
+    FOR EACH ROW EXECUTE FUNCTION food_hub_product_search_vector();
+
+CREATE FUNCTION food_hub_company_search_vector() RETURNS trigger AS $$
+BEGIN
+    UPDATE food_hub_product SET name = name WHERE company_id = NEW.id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER company_search_vector_update
+    AFTER UPDATE OF name ON food_hub_company
+    FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+    EXECUTE FUNCTION food_hub_company_search_vector();
+
+CREATE FUNCTION food_hub_category_search_vector() RETURNS trigger AS $$
+BEGIN
+    UPDATE food_hub_product SET name = name WHERE category_id = NEW.id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER category_search_vector_update
+    AFTER UPDATE OF name ON food_hub_category
+    FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+    EXECUTE FUNCTION food_hub_category_search_vector();
+
+UPDATE food_hub_product SET name = name;
+"""
+
+DROP_TRIGGERS = """
+DROP TRIGGER IF EXISTS category_search_vector_update ON food_hub_category;
+DROP FUNCTION IF EXISTS food_hub_category_search_vector();
+DROP TRIGGER IF EXISTS company_search_vector_update ON food_hub_company;
+DROP FUNCTION IF EXISTS food_hub_company_search_vector();
+DROP TRIGGER IF EXISTS product_search_vector_update ON food_hub_product;
+DROP FUNCTION IF EXISTS food_hub_product_search_vector();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("food_hub", "0007_producttagstat"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="product_search_vector_gin"
+            ),
+        ),
+        migrations.RunSQL(CREATE_TRIGGERS, DROP_TRIGGERS),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.1 on 2026-10-17 15:20
+
+from django.core.files.storage import default_storage
+from django.db import migrations
+
+from food_hub.utils.images import CONTENT_PATH_RE, DEFAULT_IMAGE_PATH, store_content
+
+
+def move_to_content_paths(apps, schema_editor):
+    """
+    Переносит картинки в products/ab/<sha256>.<ext>. Старые файлы не удаляются:
+    после миграции их уберёт manage.py cleanup_product_images.
+    """
+    Product = apps.get_model("food_hub", "Product")
+    paths = (
+        Product.objects.exclude(img_field__in=["", DEFAULT_IMAGE_PATH])
+        .order_by()
+        .values_list("img_field", flat=True)
+        .distinct()
+    )
+    for old_path in list(paths):
+        if CONTENT_PATH_RE.match(old_path):
+            continue
+        try:
+            with default_storage.open(old_path, "rb") as image:
+                data = image.read()
+        except OSError:
+            # Файла нет - оставляем ссылку как есть
+            continue
+        new_path = store_content(data)
+        Product.objects.filter(img_field=old_path).update(img_field=new_path)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("food_hub", "0008_product_search_vector"),
+    ]
+
+    operations = [
+        migrations.RunPython(move_to_content_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 5.2.1 on 2026-10-17 16:05
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_tag_rate_stats(apps, schema_editor):
+    ProductRating = apps.get_model("food_hub", "ProductRating")
+    CategoryTagRateStat = apps.get_model("food_hub", "CategoryTagRateStat")
+
+    rows = (
+        ProductRating.taste_tags.through.objects.order_by()
+        .values(
+            "productrating__product__category_id",
+            "productrating__rate",
+            "tastetag_id",
+        )
+        .annotate(count=Count("id"))
+    )
+    CategoryTagRateStat.objects.bulk_create(
+        [
+            CategoryTagRateStat(
+                category_id=row["productrating__product__category_id"],
+                rate=row["productrating__rate"],
+                taste_tag_id=row["tastetag_id"],
+                picks_count=row["count"],
+            )
+            for row in rows
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("food_hub", "0009_content_addressed_images"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CategoryTagRateStat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "rate",
+                    models.PositiveSmallIntegerField(
+                        validators=[
+                            django.core.validators.MinValueValidator(1),
+                            django.core.validators.MaxValueValidator(5),
+                        ]
+                    ),
+                ),
+                ("picks_count", models.PositiveIntegerField(default=0)),
+                (
+                    "category",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="tag_rate_stats",
+                        to="food_hub.category",
+                    ),
+                ),
+                (
+                    "taste_tag",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="category_rate_stats",
+                        to="food_hub.tastetag",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Популярность тега в категории",
+                "verbose_name_plural": "Популярность тегов в категориях",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("category", "rate", "taste_tag"),
+                        name="unique_tag_rate_stat_per_category",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_tag_rate_stats, migrations.RunPython.noop),
+    ]
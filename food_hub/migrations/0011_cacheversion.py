@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-17 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("food_hub", "0010_categorytagratestat"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CacheVersion",
+            fields=[
+                (
+                    "key",
+                    models.CharField(max_length=100, primary_key=True, serialize=False),
+                ),
+                ("version", models.BigIntegerField()),
+            ],
+            options={
+                "verbose_name": "Версия кэша",
+                "verbose_name_plural": "Версии кэшей",
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.1 on 2026-10-17 19:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("food_hub", "0011_cacheversion"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="productrating",
+            name="wizard_nonce",
+            field=models.CharField(
+                blank=True, editable=False, max_length=32, null=True, unique=True
+            ),
+        ),
+    ]
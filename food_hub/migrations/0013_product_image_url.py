@@ -0,0 +1,24 @@
+# Generated by Django 5.2.1 on 2026-10-17 20:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("food_hub", "0012_productrating_wizard_nonce"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="image_url",
+            field=models.URLField(
+                blank=True,
+                default="",
+                editable=False,
+                help_text="Адрес картинки из EAN API",
+                max_length=2048,
+            ),
+        ),
+    ]
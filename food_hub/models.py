@@ -1,9 +1,12 @@
+import time
+
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.urls import reverse
 from stdnum import ean
 from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 
 from food_hub.utils.validators import (
     ean13_validator,
@@ -133,6 +136,19 @@ class Company(models.Model):
         return self.name
 
 
+class ProductQuerySet(models.QuerySet):
+    def for_cards(self):
+        """Всё, что читает product_card.html, без запросов на каждую карточку."""
+        return self.select_related("company", "rating_summary").prefetch_related(
+            models.Prefetch(
+                "tag_stats",
+                queryset=ProductTagStat.objects.select_related("taste_tag").order_by(
+                    "-ratings_count", "taste_tag__name"
+                ),
+            )
+        )
+
+
 class Product(models.Model):
     company = models.ForeignKey(Company, on_delete=models.CASCADE)
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
@@ -148,9 +164,23 @@ class Product(models.Model):
         help_text="13-значный EAN код продукта",
     )
     img_field = models.ImageField(upload_to="products/")
+    # Пока продукт на заглушке, картинка догружается по этому адресу
+    # (manage.py fetch_product_images)
+    image_url = models.URLField(
+        max_length=2048,
+        blank=True,
+        default="",
+        editable=False,
+        help_text="Адрес картинки из EAN API",
+    )
+    # Заполняется триггером БД (миграция 0008): name - вес A,
+    # company.name - B, category.name - C. Из Python не пишется.
+    search_vector = SearchVectorField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProductQuerySet.as_manager()
+
     class Meta:
         ordering = ["created_at"]
         verbose_name = "Продукт"
@@ -160,6 +190,12 @@ class Product(models.Model):
                 name="product_name_trgm_gin",
                 fields=["name"], 
                 opclasses=["gin_trgm_ops"]),
+            models.Index(
+                name="product_created_id_idx",
+                fields=["created_at", "id"]),
+            GinIndex(
+                name="product_search_vector_gin",
+                fields=["search_vector"]),
         ]
         constraints = [
             models.UniqueConstraint(
@@ -191,6 +227,11 @@ class ProductRating(models.Model):
     taste_tags = models.ManyToManyField(TasteTag, related_name="ratings")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Одноразовый ключ подписанного состояния мастера оценки: повторная
+    # отправка того же токена упирается в уникальность
+    wizard_nonce = models.CharField(
+        max_length=32, unique=True, null=True, blank=True, editable=False
+    )
 
     class Meta:
         ordering = ["-created_at"]
@@ -202,3 +243,140 @@ class ProductRating(models.Model):
 
     def __str__(self):
         return f"Rating {self.rate} for {self.product.name}"
+
+
+class ProductRatingSummary(models.Model):
+    """
+    Денормализованная сводка оценок продукта. Обновляется в той же
+    транзакции, что и запись ProductRating (см. food_hub.aggregates),
+    чтобы списки продуктов не считали рейтинг на каждой карточке.
+    """
+
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="rating_summary",
+    )
+    ratings_count = models.PositiveIntegerField(default=0)
+    ratings_sum = models.PositiveIntegerField(default=0)
+    avg_rate = models.DecimalField(max_digits=3, decimal_places=2, default=0)
+    last_rate = models.PositiveSmallIntegerField(null=True, blank=True)
+    rate_1_count = models.PositiveIntegerField(default=0)
+    rate_2_count = models.PositiveIntegerField(default=0)
+    rate_3_count = models.PositiveIntegerField(default=0)
+    rate_4_count = models.PositiveIntegerField(default=0)
+    rate_5_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Сводка рейтинга продукта"
+        verbose_name_plural = "Сводки рейтингов продуктов"
+
+    def __str__(self):
+        return f"Summary {self.avg_rate} ({self.ratings_count}) for {self.product_id}"
+
+    @property
+    def histogram(self) -> list[int]:
+        """Количество оценок 1–5 по порядку."""
+        return [getattr(self, f"rate_{rate}_count") for rate in range(1, 6)]
+
+
+class ProductTagStat(models.Model):
+    """
+    Материализованный агрегат "продукт -> тег вкуса": сколько оценок продукта
+    отмечены тегом. Заменяет ArrayAgg по ratings__taste_tags в списках.
+    """
+
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="tag_stats"
+    )
+    taste_tag = models.ForeignKey(
+        TasteTag, on_delete=models.CASCADE, related_name="product_stats"
+    )
+    ratings_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Статистика тега продукта"
+        verbose_name_plural = "Статистика тегов продуктов"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "taste_tag"], name="unique_tag_stat_per_product"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["taste_tag", "product"]),
+        ]
+
+    def __str__(self):
+        return f"{self.taste_tag_id} x{self.ratings_count} for {self.product_id}"
+
+
+class CategoryTagRateStat(models.Model):
+    """
+    Счётчик "категория x оценка -> тег": сколько раз тег выбирали, ставя
+    продукту категории эту оценку. По нему ранжируются теги на шаге выбора.
+    """
+
+    category = models.ForeignKey(
+        Category, on_delete=models.CASCADE, related_name="tag_rate_stats"
+    )
+    taste_tag = models.ForeignKey(
+        TasteTag, on_delete=models.CASCADE, related_name="category_rate_stats"
+    )
+    rate = models.PositiveSmallIntegerField(
+        validators=[MinValueValidator(1), MaxValueValidator(5)]
+    )
+    picks_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Популярность тега в категории"
+        verbose_name_plural = "Популярность тегов в категориях"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["category", "rate", "taste_tag"],
+                name="unique_tag_rate_stat_per_category",
+            )
+        ]
+
+    def __str__(self):
+        return (
+            f"{self.taste_tag_id} x{self.picks_count} "
+            f"at {self.rate} in {self.category_id}"
+        )
+
+
+class CacheVersionManager(models.Manager):
+    def current(self, key: str) -> int:
+        """Версия ключа; 0, пока её ни разу не сбрасывали."""
+        version = self.filter(key=key).values_list("version", flat=True).first()
+        return version or 0
+
+    def bump(self, key: str) -> None:
+        # Метка времени, а не инкремент: upsert без чтения и гонок
+        self.bulk_create(
+            [self.model(key=key, version=time.time_ns())],
+            update_conflicts=True,
+            unique_fields=["key"],
+            update_fields=["version"],
+        )
+
+
+class CacheVersion(models.Model):
+    """
+    Версия кэша (справочники, результаты поиска, меню тегов). Хранится
+    в базе, а не в CACHES: при локальном бэкенде кэша сброс в одном процессе
+    не дошёл бы до остальных.
+    """
+
+    key = models.CharField(max_length=100, primary_key=True)
+    version = models.BigIntegerField()
+
+    objects = CacheVersionManager()
+
+    class Meta:
+        verbose_name = "Версия кэша"
+        verbose_name_plural = "Версии кэшей"
+
+    def __str__(self):
+        return f"{self.key}={self.version}"
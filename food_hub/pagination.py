@@ -0,0 +1,55 @@
+from dataclasses import dataclass
+from datetime import datetime
+
+from django.db.models import Q
+from django.utils.encoding import force_bytes, force_str
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+
+@dataclass
+class KeysetPage:
+    object_list: list
+    next_cursor: str | None
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+
+def encode_cursor(obj) -> str:
+    """Кодирует позицию (created_at, id) последней записи страницы."""
+    raw = f"{obj.created_at.isoformat()}|{obj.pk}"
+    return urlsafe_base64_encode(force_bytes(raw))
+
+
+def decode_cursor(cursor: str | None) -> tuple[datetime, int] | None:
+    if not cursor:
+        return None
+    try:
+        raw = force_str(urlsafe_base64_decode(cursor))
+        created_at, pk = raw.split("|")
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def keyset_paginate(queryset, cursor: str | None, page_size: int) -> KeysetPage:
+    """
+    Keyset-пагинация по (created_at, id): каждая страница читает не больше
+    page_size + 1 строк по индексу, независимо от размера таблицы.
+    Некорректный курсор трактуется как начало ленты.
+    """
+    position = decode_cursor(cursor)
+    queryset = queryset.order_by("created_at", "id")
+    if position is not None:
+        created_at, pk = position
+        queryset = queryset.filter(
+            Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+        )
+
+    # Лишняя строка нужна только чтобы узнать, есть ли следующая страница
+    rows = list(queryset[: page_size + 1])
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        return KeysetPage(rows, encode_cursor(rows[-1]))
+    return KeysetPage(rows, None)
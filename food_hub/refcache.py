@@ -0,0 +1,84 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from food_hub.models import CacheVersion
+
+VERSION_KEY = "food_hub:refcache"
+
+
+class ReferenceCache:
+    """
+    LRU кэш имя -> id для справочников (страны, компании, категории) в памяти
+    процесса. Версия хранится в таблице CacheVersion: сигналы меняют её при
+    переименовании или удалении строки, и каждый процесс (веб, воркеры,
+    импорт) сбрасывает свои записи при следующем sync() - независимо
+    от бэкенда CACHES. sync() вызывается один раз на пачку записи: один
+    запрос по первичному ключу вместо upsert по каждому справочнику.
+    """
+
+    def __init__(self):
+        self._data = OrderedDict()
+        self._version = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _sync_version(self) -> None:
+        version = CacheVersion.objects.current(VERSION_KEY)
+        if version != self._version:
+            self._data.clear()
+            self._version = version
+
+    def sync(self) -> None:
+        with self._lock:
+            self._sync_version()
+
+    def get_many(self, model, names) -> dict[str, int]:
+        label = model._meta.label
+        found = {}
+        with self._lock:
+            for name in names:
+                key = (label, name)
+                if key in self._data:
+                    self._data.move_to_end(key)
+                    found[name] = self._data[key]
+                    self.hits += 1
+                else:
+                    self.misses += 1
+        return found
+
+    def set_many(self, model, mapping: dict[str, int]) -> None:
+        label = model._meta.label
+        with self._lock:
+            # Версию не перечитываем: сброс после sync() заметит следующий sync()
+            for name, pk in mapping.items():
+                self._data[(label, name)] = pk
+                self._data.move_to_end((label, name))
+            while len(self._data) > settings.REFERENCE_CACHE_SIZE:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": settings.REFERENCE_CACHE_SIZE,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def invalidate_reference_cache() -> None:
+    CacheVersion.objects.bump(VERSION_KEY)
+
+
+reference_cache = ReferenceCache()
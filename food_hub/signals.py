@@ -0,0 +1,34 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from food_hub.aggregates import refresh_product_aggregates
+from food_hub.models import Category, Company, Country, ProductRating
+from food_hub.refcache import invalidate_reference_cache
+
+
+@receiver(post_delete, sender=ProductRating)
+def refresh_aggregates_on_rating_delete(sender, instance, **kwargs):
+    # Удаление идёт из админки или каскадом от продукта - пересчитываем
+    # агрегаты продукта целиком, иначе не восстановить last_rate
+    refresh_product_aggregates([instance.product_id])
+
+
+def _invalidate_references(sender, created=False, **kwargs):
+    # Новые строки кэш не портят - они просто ещё не закэшированы.
+    # Версия меняется в той же транзакции, что и строка: другие процессы
+    # не увидят переименование раньше новой версии
+    if not created:
+        invalidate_reference_cache()
+
+
+for model in (Country, Company, Category):
+    post_save.connect(
+        _invalidate_references,
+        sender=model,
+        dispatch_uid=f"refcache_{model.__name__}_save",
+    )
+    post_delete.connect(
+        _invalidate_references,
+        sender=model,
+        dispatch_uid=f"refcache_{model.__name__}_delete",
+    )
@@ -0,0 +1,34 @@
+from django import template
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+
+from food_hub.utils.images import THUMBNAIL_WIDTHS, thumbnail_paths
+
+register = template.Library()
+
+
+def _thumbnails_ready(paths: dict[int, str]) -> bool:
+    # Превью неизменны, как и сама картинка: положительный ответ
+    # кэшируется навсегда, отрицательный перепроверяется после backfill
+    largest = paths[max(THUMBNAIL_WIDTHS)]
+    key = f"thumbs:ready:{largest}"
+    if cache.get(key):
+        return True
+    ready = default_storage.exists(largest)
+    if ready:
+        cache.set(key, True, None)
+    return ready
+
+
+@register.filter
+def srcset(image) -> str:
+    """
+    Значение атрибута srcset для картинки продукта: "url 160w, url 320w, ...".
+    Пустая строка, если превью у картинки нет.
+    """
+    paths = thumbnail_paths(getattr(image, "name", image))
+    if not paths or not _thumbnails_ready(paths):
+        return ""
+    return ", ".join(
+        f"{default_storage.url(path)} {width}w" for width, path in paths.items()
+    )
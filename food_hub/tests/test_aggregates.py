@@ -0,0 +1,188 @@
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.db import transaction
+
+import food_hub.models as models
+from food_hub.aggregates import (
+    refresh_category_tag_stats,
+    refresh_product_aggregates,
+    refresh_rating_summaries,
+    register_rating,
+    register_tag_picks,
+)
+
+
+@pytest.fixture
+def product(db):
+    country = models.Country.objects.create(name="Россия")
+    company = models.Company.objects.create(name="Компания", country=country)
+    category = models.Category.objects.create(name="Десерты")
+    return models.Product.objects.create(
+        company=company, category=category, name="Мороженое", ean_code="4006381333931"
+    )
+
+
+@pytest.fixture
+def tags(db):
+    return [
+        models.TasteTag.objects.create(
+            name=name, taste_type=models.TasteTag.TypeTag.POSITIVE, slug=slug
+        )
+        for name, slug in [("Сладкий", "sladkiy"), ("Сливочный", "slivochniy")]
+    ]
+
+
+def rate(product, value, tags=()):
+    with transaction.atomic():
+        rating = models.ProductRating.objects.create(product=product, rate=value)
+        rating.taste_tags.set(tags)
+        register_rating(rating, [tag.pk for tag in tags])
+    return rating
+
+
+def tag_counts(product):
+    return dict(
+        models.ProductTagStat.objects.filter(product=product).values_list(
+            "taste_tag__name", "ratings_count"
+        )
+    )
+
+
+class TestRegisterRating:
+    def test_first_rating_creates_summary(self, product):
+        rate(product, 4)
+        summary = models.ProductRatingSummary.objects.get(product=product)
+        assert summary.ratings_count == 1
+        assert summary.ratings_sum == 4
+        assert summary.avg_rate == Decimal("4.00")
+        assert summary.last_rate == 4
+        assert summary.histogram == [0, 0, 0, 1, 0]
+
+    def test_ratings_accumulate(self, product):
+        for value in (5, 4, 4):
+            rate(product, value)
+        summary = models.ProductRatingSummary.objects.get(product=product)
+        assert summary.ratings_count == 3
+        assert summary.avg_rate == Decimal("4.33")
+        assert summary.last_rate == 4
+        assert summary.histogram == [0, 0, 0, 2, 1]
+
+
+class TestTagStats:
+    def test_counts_per_tag(self, product, tags):
+        sweet, creamy = tags
+        rate(product, 5, [sweet, creamy])
+        rate(product, 4, [sweet])
+        assert tag_counts(product) == {"Сладкий": 2, "Сливочный": 1}
+
+    def test_tags_read_from_rating(self, product, tags):
+        rating = models.ProductRating.objects.create(product=product, rate=5)
+        rating.taste_tags.set(tags)
+        register_rating(rating)
+        assert tag_counts(product) == {"Сладкий": 1, "Сливочный": 1}
+
+    def test_rating_delete_updates_stats(self, product, tags):
+        sweet, creamy = tags
+        rate(product, 5, [sweet, creamy])
+        rate(product, 4, [sweet]).delete()
+        assert tag_counts(product) == {"Сладкий": 1, "Сливочный": 1}
+
+    def test_for_cards_orders_by_popularity(self, product, tags):
+        sweet, creamy = tags
+        rate(product, 5, [creamy])
+        rate(product, 5, [sweet, creamy])
+        card = models.Product.objects.for_cards().get(pk=product.pk)
+        assert [s.taste_tag.name for s in card.tag_stats.all()] == [
+            "Сливочный",
+            "Сладкий",
+        ]
+
+    def test_rebuild_command(self, product, tags):
+        sweet, creamy = tags
+        rate(product, 5, [sweet, creamy])
+        rate(product, 2, [creamy])
+        models.ProductTagStat.objects.all().delete()
+        models.ProductRatingSummary.objects.all().delete()
+
+        call_command("rebuild_product_aggregates", batch_size=1)
+
+        assert tag_counts(product) == {"Сладкий": 1, "Сливочный": 2}
+        summary = models.ProductRatingSummary.objects.get(product=product)
+        assert summary.histogram == [0, 1, 0, 0, 1]
+
+    def test_refresh_drops_stale_rows(self, product, tags):
+        rate(product, 5, tags)
+        models.ProductRating.taste_tags.through.objects.all().delete()
+        refresh_product_aggregates([product.pk])
+        assert tag_counts(product) == {}
+
+
+class TestRefreshRatingSummaries:
+    def test_refresh_matches_incremental(self, product):
+        for value in (1, 5, 3):
+            rate(product, value)
+        incremental = models.ProductRatingSummary.objects.get(product=product)
+        models.ProductRatingSummary.objects.all().delete()
+
+        assert refresh_rating_summaries() == 1
+        rebuilt = models.ProductRatingSummary.objects.get(product=product)
+        assert rebuilt.histogram == incremental.histogram
+        assert rebuilt.avg_rate == incremental.avg_rate
+        assert rebuilt.last_rate == incremental.last_rate
+
+    def test_rating_delete_updates_summary(self, product):
+        rate(product, 2)
+        last = rate(product, 5)
+        last.delete()
+        summary = models.ProductRatingSummary.objects.get(product=product)
+        assert summary.ratings_count == 1
+        assert summary.last_rate == 2
+
+    def test_last_rating_delete_drops_summary(self, product):
+        rate(product, 3).delete()
+        assert not models.ProductRatingSummary.objects.filter(product=product).exists()
+
+    def test_product_delete_cascades(self, product):
+        rate(product, 3)
+        rate(product, 4)
+        product.delete()
+        assert not models.ProductRatingSummary.objects.exists()
+
+
+def tag_picks(category, rate):
+    return dict(
+        models.CategoryTagRateStat.objects.filter(
+            category=category, rate=rate
+        ).values_list("taste_tag__name", "picks_count")
+    )
+
+
+class TestCategoryTagStats:
+    def test_register_picks_increments(self, product, tags):
+        sweet, creamy = tags
+        register_tag_picks(product.category_id, 5, [sweet.pk, creamy.pk])
+        register_tag_picks(product.category_id, 5, [sweet.pk])
+        register_tag_picks(product.category_id, 4, [creamy.pk])
+        assert tag_picks(product.category, 5) == {"Сладкий": 2, "Сливочный": 1}
+        assert tag_picks(product.category, 4) == {"Сливочный": 1}
+
+    def test_register_without_tags_is_noop(self, product):
+        register_tag_picks(product.category_id, 5, [])
+        assert not models.CategoryTagRateStat.objects.exists()
+
+    def test_refresh_matches_ratings(self, product, tags):
+        sweet, creamy = tags
+        rate(product, 5, [sweet, creamy])
+        rate(product, 5, [sweet])
+        rate(product, 2, [creamy])
+
+        assert refresh_category_tag_stats() == 3
+        assert tag_picks(product.category, 5) == {"Сладкий": 2, "Сливочный": 1}
+        assert tag_picks(product.category, 2) == {"Сливочный": 1}
+
+    def test_rebuild_command_refreshes_picks(self, product, tags):
+        rate(product, 4, tags[:1])
+        call_command("rebuild_product_aggregates")
+        assert tag_picks(product.category, 4) == {"Сладкий": 1}
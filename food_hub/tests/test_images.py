@@ -0,0 +1,226 @@
+import importlib
+import io
+import os
+import time
+from datetime import timedelta
+
+import pytest
+from django.apps import apps
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+import food_hub.models as models
+from food_hub.management.commands.cleanup_product_images import Command
+from food_hub.templatetags.product_images import srcset
+from food_hub.utils.images import (
+    CONTENT_PATH_RE,
+    content_path,
+    render_thumbnails,
+    store_content,
+    store_thumbnails,
+    thumbnail_paths,
+)
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"image"
+
+
+def real_png(width=1000, height=500):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), "green").save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    # Кэш готовности превью ссылается на файлы прошлого теста
+    cache.clear()
+    return tmp_path
+
+
+@pytest.fixture
+def make_product(db):
+    country = models.Country.objects.create(name="Россия")
+    company = models.Company.objects.create(name="Компания", country=country)
+    category = models.Category.objects.create(name="Десерты")
+
+    def _make(ean, img_field):
+        return models.Product.objects.create(
+            company=company,
+            category=category,
+            name=f"Продукт {ean}",
+            ean_code=ean,
+            img_field=img_field,
+        )
+
+    return _make
+
+
+def age(media, path, seconds):
+    stamp = time.time() - seconds
+    os.utime(media / path, (stamp, stamp))
+
+
+class TestContentPath:
+    def test_png_and_jpg_extensions(self):
+        assert content_path(PNG).endswith(".png")
+        assert content_path(b"\xff\xd8jpeg").endswith(".jpg")
+
+    def test_path_matches_pattern(self):
+        assert CONTENT_PATH_RE.match(content_path(PNG))
+
+    def test_store_is_idempotent(self, media):
+        assert store_content(PNG) == store_content(PNG)
+        assert len(list(media.rglob("*.png"))) == 1
+
+
+class TestThumbnails:
+    def test_render_fits_each_width(self):
+        thumbnails = render_thumbnails(real_png(), quality=80)
+        sizes = {
+            width: Image.open(io.BytesIO(data)).size
+            for width, data in thumbnails.items()
+        }
+        assert sizes == {160: (160, 80), 320: (320, 160), 640: (640, 320)}
+        assert Image.open(io.BytesIO(thumbnails[160])).format == "WEBP"
+
+    def test_small_image_is_not_upscaled(self):
+        thumbnails = render_thumbnails(real_png(200, 100), quality=80)
+        assert Image.open(io.BytesIO(thumbnails[640])).size == (200, 100)
+
+    def test_no_thumbnails_for_legacy_paths(self):
+        assert thumbnail_paths("products/default_image.png") == {}
+        assert thumbnail_paths("products/old_name.jpg") == {}
+
+    def test_srcset(self, media):
+        data = real_png()
+        path = store_content(data)
+        assert srcset(path) == ""
+
+        store_thumbnails(path, data)
+
+        candidates = srcset(path).split(", ")
+        assert [item.rsplit(" ", 1)[1] for item in candidates] == [
+            "160w",
+            "320w",
+            "640w",
+        ]
+        assert candidates[0].startswith("/media/thumbs/")
+
+    def test_card_renders_srcset(self, media, make_product, client):
+        data = real_png()
+        path = store_content(data)
+        store_thumbnails(path, data)
+        make_product("4006381333931", path)
+
+        response = client.get(reverse("food_hub:product_list"))
+
+        assert 'srcset="/media/thumbs/' in response.content.decode()
+
+    def test_backfill_command(self, media, make_product):
+        path = store_content(real_png())
+        broken = store_content(b"\xff\xd8not an image")
+        make_product("4006381333931", path)
+        make_product("5901234123457", broken)
+
+        call_command("build_thumbnails", workers=1)
+
+        assert all(default_storage.exists(p) for p in thumbnail_paths(path).values())
+        assert not any(
+            default_storage.exists(p) for p in thumbnail_paths(broken).values()
+        )
+
+
+class TestCleanupCommand:
+    def test_keeps_referenced_and_default(self, media, make_product):
+        shared = store_content(PNG)
+        orphan = store_content(b"\xff\xd8orphan")
+        default_storage.save("products/default_image.png", ContentFile(PNG))
+        make_product("4006381333931", shared)
+        make_product("5901234123457", shared)
+        for path in (shared, orphan, "products/default_image.png"):
+            age(media, path, 7200)
+
+        call_command("cleanup_product_images")
+
+        assert default_storage.exists(shared)
+        assert default_storage.exists("products/default_image.png")
+        assert not default_storage.exists(orphan)
+
+    def test_thumbnails_follow_original(self, media, make_product):
+        kept, dropped = real_png(), real_png(300, 300)
+        kept_path, dropped_path = store_content(kept), store_content(dropped)
+        store_thumbnails(kept_path, kept)
+        store_thumbnails(dropped_path, dropped)
+        make_product("4006381333931", kept_path)
+        for path in media.rglob("*.*"):
+            age(media, path.relative_to(media), 7200)
+
+        call_command("cleanup_product_images")
+
+        assert all(
+            default_storage.exists(p) for p in thumbnail_paths(kept_path).values()
+        )
+        assert not any(
+            default_storage.exists(p) for p in thumbnail_paths(dropped_path).values()
+        )
+
+    def test_skips_recent_files(self, media, db):
+        orphan = store_content(PNG)
+        call_command("cleanup_product_images")
+        assert default_storage.exists(orphan)
+
+    def test_reused_file_is_young_again(self, media, db):
+        orphan = store_content(PNG)
+        age(media, orphan, 7200)
+        # Новая загрузка тех же байт - файл снова нужен
+        store_content(PNG)
+        call_command("cleanup_product_images")
+        assert default_storage.exists(orphan)
+
+    def test_rechecks_references_before_delete(self, media, make_product):
+        orphan = store_content(PNG)
+        age(media, orphan, 7200)
+        cutoff = timezone.now() - timedelta(hours=1)
+        # Ссылка появилась после того, как команда собрала ссылки продуктов
+        make_product("4006381333931", orphan)
+        assert not Command()._delete_orphan(orphan, cutoff)
+        assert default_storage.exists(orphan)
+
+    def test_dry_run(self, media, db):
+        orphan = store_content(PNG)
+        age(media, orphan, 7200)
+        call_command("cleanup_product_images", dry_run=True)
+        assert default_storage.exists(orphan)
+
+
+class TestContentAddressMigration:
+    def migrate(self):
+        migration = importlib.import_module(
+            "food_hub.migrations.0009_content_addressed_images"
+        )
+        migration.move_to_content_paths(apps, None)
+
+    def test_rewrites_paths_and_merges_duplicates(self, media, make_product):
+        default_storage.save("products/a.png", ContentFile(PNG))
+        default_storage.save("products/b.png", ContentFile(PNG))
+        first = make_product("4006381333931", "products/a.png")
+        second = make_product("5901234123457", "products/b.png")
+
+        self.migrate()
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        assert first.img_field.name == second.img_field.name == content_path(PNG)
+        assert default_storage.exists(content_path(PNG))
+
+    def test_missing_file_is_left_alone(self, media, make_product):
+        product = make_product("4006381333931", "products/missing.png")
+        self.migrate()
+        product.refresh_from_db()
+        assert product.img_field.name == "products/missing.png"
@@ -162,3 +162,24 @@ class TestProduct:
         )
         save_and_clean(product)
         assert len(product.name) == 100
+
+    @pytest.mark.django_db
+    def test_search_vector_filled_by_trigger(self, company, category):
+        product = models.Product.objects.create(
+            company=company, category=category, name="Пломбир", ean_code="4006381333931"
+        )
+        product.refresh_from_db()
+        assert "'пломбир':1A" in product.search_vector
+        assert "'компан':2B" in product.search_vector
+        assert "'десерт':3C" in product.search_vector
+
+    @pytest.mark.django_db
+    def test_search_vector_follows_category_rename(self, company, category):
+        product = models.Product.objects.create(
+            company=company, category=category, name="Пломбир", ean_code="4006381333931"
+        )
+        category.name = "Мороженое"
+        category.save()
+        product.refresh_from_db()
+        assert "'морожен':3C" in product.search_vector
+        assert "десерт" not in product.search_vector
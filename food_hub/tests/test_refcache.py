@@ -0,0 +1,75 @@
+import pytest
+from django.core.cache import cache
+
+import food_hub.models as models
+from food_hub.refcache import ReferenceCache, invalidate_reference_cache
+
+
+@pytest.fixture
+def ref_cache(db):
+    return ReferenceCache()
+
+
+def test_hits_and_misses(ref_cache):
+    ref_cache.set_many(models.Country, {"Россия": 1})
+    assert ref_cache.get_many(models.Country, ["Россия", "Германия"]) == {"Россия": 1}
+    # Одинаковое имя в разных справочниках - разные ключи
+    assert ref_cache.get_many(models.Category, ["Россия"]) == {}
+    assert ref_cache.stats() == {
+        "size": 1,
+        "maxsize": 1024,
+        "hits": 1,
+        "misses": 2,
+        "hit_rate": 0.3333,
+    }
+
+
+def test_lru_eviction(ref_cache, settings):
+    settings.REFERENCE_CACHE_SIZE = 2
+    ref_cache.set_many(models.Country, {"A": 1, "B": 2})
+    ref_cache.get_many(models.Country, ["A"])
+    ref_cache.set_many(models.Country, {"C": 3})
+    assert ref_cache.get_many(models.Country, ["A", "B", "C"]) == {"A": 1, "C": 3}
+
+
+def test_version_change_clears_entries(ref_cache):
+    ref_cache.set_many(models.Country, {"Россия": 1})
+    ref_cache.get_many(models.Country, ["Россия"])
+    invalidate_reference_cache()
+    # Без sync() версия не перечитывается - один запрос на пачку записи
+    assert ref_cache.get_many(models.Country, ["Россия"]) == {"Россия": 1}
+    ref_cache.sync()
+    assert ref_cache.get_many(models.Country, ["Россия"]) == {}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_rename_and_delete_invalidate(ref_cache):
+    country = models.Country.objects.create(name="Россия")
+    ref_cache.set_many(models.Country, {"Россия": country.pk})
+    # Создание новых строк кэш не сбрасывает
+    models.Category.objects.create(name="Десерты")
+    ref_cache.sync()
+    assert ref_cache.get_many(models.Country, ["Россия"]) == {"Россия": country.pk}
+
+    country.name = "Беларусь"
+    country.save()
+    ref_cache.sync()
+    assert ref_cache.get_many(models.Country, ["Россия"]) == {}
+
+    ref_cache.set_many(models.Country, {"Беларусь": country.pk})
+    country.delete()
+    ref_cache.sync()
+    assert ref_cache.get_many(models.Country, ["Беларусь"]) == {}
+
+
+def test_version_does_not_depend_on_django_cache(ref_cache):
+    # Версия в базе: локальный кэш другого процесса её не подменит
+    invalidate_reference_cache()
+    ref_cache.sync()
+    ref_cache.set_many(models.Country, {"Россия": 1})
+    cache.clear()
+    ref_cache.sync()
+    assert ref_cache.get_many(models.Country, ["Россия"]) == {"Россия": 1}
+    invalidate_reference_cache()
+    ref_cache.sync()
+    assert ref_cache.get_many(models.Country, ["Россия"]) == {}
@@ -0,0 +1,107 @@
+import pytest
+from django.urls import reverse
+
+import food_hub.models as models
+from food_hub.aggregates import register_rating
+from food_hub.pagination import decode_cursor, encode_cursor
+
+
+@pytest.fixture
+def country(db):
+    return models.Country.objects.create(name="Россия")
+
+
+@pytest.fixture
+def company(db, country):
+    return models.Company.objects.create(name="Компания", country=country)
+
+
+@pytest.fixture
+def category(db):
+    return models.Category.objects.create(name="Десерты")
+
+
+@pytest.fixture
+def make_products(db, company, category):
+    def _make(count):
+        return [
+            models.Product.objects.create(
+                company=company,
+                category=category,
+                name=f"Продукт {i}",
+                ean_code=f"{i:013d}",
+            )
+            for i in range(count)
+        ]
+
+    return _make
+
+
+class TestCursor:
+    def test_roundtrip(self, make_products):
+        product = make_products(1)[0]
+        assert decode_cursor(encode_cursor(product)) == (
+            product.created_at,
+            product.pk,
+        )
+
+    @pytest.mark.parametrize("cursor", [None, "", "garbage", "bm90LWEtY3Vyc29y"])
+    def test_invalid_cursor(self, cursor):
+        assert decode_cursor(cursor) is None
+
+
+class TestProductsView:
+    def test_first_page_is_bounded(self, client, make_products):
+        make_products(25)
+        response = client.get(reverse("food_hub:product_list"))
+        assert response.status_code == 200
+        assert response.templates[0].name == "food_hub/product_list.html"
+        assert len(response.context["products"]) == 20
+        assert response.context["next_cursor"] is not None
+
+    def test_pages_cover_catalogue_once(self, client, make_products):
+        products = make_products(45)
+        url = reverse("food_hub:product_list")
+        seen = []
+        cursor = None
+        while True:
+            params = {"cursor": cursor} if cursor else {}
+            response = client.get(url, params, headers={"HX-Request": "true"})
+            seen.extend(p.pk for p in response.context["products"])
+            cursor = response.context["next_cursor"]
+            if cursor is None:
+                break
+        assert seen == [p.pk for p in products]
+
+    def test_htmx_returns_partial(self, client, make_products):
+        make_products(3)
+        response = client.get(
+            reverse("food_hub:product_list"), headers={"HX-Request": "true"}
+        )
+        assert response.templates[0].name == "food_hub/partials/product_feed.html"
+        assert response.context["next_cursor"] is None
+        assert "feed-more" not in response.content.decode()
+
+    def test_invalid_cursor_starts_from_beginning(self, client, make_products):
+        products = make_products(2)
+        response = client.get(reverse("food_hub:product_list"), {"cursor": "xxx"})
+        assert [p.pk for p in response.context["products"]] == [
+            p.pk for p in products
+        ]
+
+    def test_cards_without_per_card_queries(
+        self, client, make_products, django_assert_num_queries
+    ):
+        tag = models.TasteTag.objects.create(
+            name="Сладкий", taste_type=models.TasteTag.TypeTag.POSITIVE, slug="sladkiy"
+        )
+        for product in make_products(5):
+            rating = models.ProductRating.objects.create(product=product, rate=4)
+            rating.taste_tags.add(tag)
+            register_rating(rating)
+        # страница продуктов + prefetch статистики тегов, сессия не читается
+        with django_assert_num_queries(2):
+            response = client.get(reverse("food_hub:product_list"))
+        content = response.content.decode()
+        assert content.count("pcard__avg") == 5
+        assert content.count("Сладкий") == 5
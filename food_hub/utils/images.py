@@ -0,0 +1,156 @@
+import hashlib
+import io
+import os
+import re
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+
+DEFAULT_IMAGE_PATH = "products/default_image.png"
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+CONTENT_PATH_RE = re.compile(r"^products/([0-9a-f]{2})/([0-9a-f]{64})\.(png|jpg)$")
+THUMBNAIL_PATH_RE = re.compile(r"^thumbs/([0-9a-f]{2})/([0-9a-f]{64})_\d+\.webp$")
+THUMBNAIL_WIDTHS = (160, 320, 640)
+
+
+def _as_file(content):
+    """Байты или файл -> файл в начале: файлы читаются кусками, без копии в память."""
+    if isinstance(content, (bytes, bytearray)):
+        return io.BytesIO(content)
+    content.seek(0)
+    return content
+
+
+def content_path(content, prefix: str = "products") -> str:
+    """
+    Путь по содержимому: products/ab/<sha256>.<ext>. Одинаковые картинки
+    разных продуктов попадают в один файл. Подкаталог по первым символам
+    хэша не даёт одной папке разрастись до сотен тысяч файлов.
+    """
+    source = _as_file(content)
+    # download_image пропускает только PNG и JPEG
+    extension = "png" if source.read(len(PNG_SIGNATURE)) == PNG_SIGNATURE else "jpg"
+    source.seek(0)
+    digest = hashlib.file_digest(source, "sha256").hexdigest()
+    source.seek(0)
+    return f"{prefix}/{digest[:2]}/{digest}.{extension}"
+
+
+def store_content(content, prefix: str = "products") -> str:
+    """
+    Сохраняет байты или файл по content_path(); уже существующий файл
+    не пишется повторно, только обновляется время изменения - иначе старый
+    ничей файл, который снова понадобился, уйдёт под cleanup_product_images.
+    """
+    path = content_path(content, prefix)
+    if default_storage.exists(path):
+        try:
+            os.utime(default_storage.path(path))
+        except NotImplementedError:
+            pass
+        return path
+    saved = default_storage.save(path, File(_as_file(content), name=path))
+    if saved != path:
+        # Параллельная запись того же содержимого: storage дал файлу суффикс
+        default_storage.delete(saved)
+    return path
+
+
+def thumbnail_paths(path: str) -> dict[int, str]:
+    """
+    Пути превью для картинки из content_path(): thumbs/ab/<sha256>_320.webp.
+    Для заглушки и картинок со старыми путями превью нет - пустой словарь.
+    """
+    match = CONTENT_PATH_RE.match(path or "")
+    if match is None:
+        return {}
+    folder, digest, _ = match.groups()
+    return {
+        width: f"thumbs/{folder}/{digest}_{width}.webp" for width in THUMBNAIL_WIDTHS
+    }
+
+
+def render_thumbnails(content, quality: int) -> dict[int, bytes]:
+    """
+    WebP превью вписанные в квадрат каждой ширины. Маленькие картинки
+    не увеличиваются. Функция не трогает Django и подходит для ProcessPoolExecutor.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(_as_file(content)) as source:
+        image = ImageOps.exif_transpose(source)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+
+    result = {}
+    for width in THUMBNAIL_WIDTHS:
+        thumbnail = image.copy()
+        thumbnail.thumbnail((width, width), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        thumbnail.save(buffer, "WEBP", quality=quality, method=4)
+        result[width] = buffer.getvalue()
+    return result
+
+
+def missing_thumbnails(path: str) -> dict[int, str]:
+    return {
+        width: thumb
+        for width, thumb in thumbnail_paths(path).items()
+        if not default_storage.exists(thumb)
+    }
+
+
+def save_thumbnails(path: str, thumbnails: dict[int, bytes]) -> None:
+    for width, thumb in thumbnail_paths(path).items():
+        if width in thumbnails and not default_storage.exists(thumb):
+            default_storage.save(thumb, ContentFile(thumbnails[width]))
+
+
+def store_thumbnails(path: str, content) -> None:
+    """Создаёт недостающие превью картинки, сохранённой по content_path()."""
+    if missing_thumbnails(path):
+        save_thumbnails(
+            path, render_thumbnails(content, settings.IMAGE_THUMBNAIL_QUALITY)
+        )
+
+
+def owner_paths(path: str) -> list[str]:
+    """
+    Пути оригинала, на которые ссылаются продукты, для картинки или превью.
+    Расширение превью не хранит - подходят оба варианта оригинала.
+    """
+    match = CONTENT_PATH_RE.match(path) or THUMBNAIL_PATH_RE.match(path)
+    if match is None:
+        return [path]
+    folder, digest = match.groups()[:2]
+    return [f"products/{folder}/{digest}.{ext}" for ext in ("png", "jpg")]
+
+
+@contextmanager
+def content_lock(path: str):
+    """
+    Транзакция с advisory-блокировкой на содержимое картинки: оригинал
+    и его превью блокируются одним ключом. Под ней проверяются ссылки
+    продуктов и удаляется ничей файл, и под ней же продукт получает ссылку
+    на файл - проверка и действие не разъезжаются между процессами.
+    """
+    key = owner_paths(path)[0]
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_advisory_xact_lock(hashtextextended(%s, 0))", [key]
+            )
+        yield
+
+
+def walk_storage(directory: str):
+    """Все файлы каталога default_storage рекурсивно."""
+    if not default_storage.exists(directory):
+        return
+    dirs, files = default_storage.listdir(directory)
+    for name in files:
+        yield f"{directory}/{name}"
+    for name in dirs:
+        yield from walk_storage(f"{directory}/{name}")
@@ -1,14 +1,24 @@
 from django.views.generic.base import TemplateView
 from food_hub.models import Product
-from django.contrib.postgres.aggregates import ArrayAgg
+from food_hub.pagination import keyset_paginate
 
 
 class ProductsView(TemplateView):
     template_name = "food_hub/product_list.html"
+    partial_template_name = "food_hub/partials/product_feed.html"
+    page_size = 20
+
+    def get_template_names(self):
+        # HTMX "Загрузить ещё" получает только следующую порцию карточек
+        if self.request.htmx:
+            return [self.partial_template_name]
+        return [self.template_name]
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        products = Product.objects.select_related('company').annotate(
-            tag_names=ArrayAgg('ratings__taste_tags__name', distinct=True))
-        context["products"] = products
+        page = keyset_paginate(
+            Product.objects.for_cards(), self.request.GET.get("cursor"), self.page_size
+        )
+        context["products"] = page.object_list
+        context["next_cursor"] = page.next_cursor
         return context
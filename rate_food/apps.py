@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class RateFoodConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "rate_food"
+
+    def ready(self):
+        from rate_food import signals  # noqa: F401
@@ -0,0 +1,125 @@
+import re
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from stdnum import ean
+
+from food_hub.models import Category, Company, Country, Product, TasteTag
+
+STEPS = ("add", "rate page", "rate", "save")
+TOKEN_RE = re.compile(r'name="wizard_state" value="([^"]+)"')
+# Мастер оценки с подписанными токенами вместо сессии (см. rate_food.wizard)
+SIGNED_STATE = "signed_state"
+
+
+class Command(BaseCommand):
+    help = (
+        "Проходит путь добавление -> оценка -> сохранение с каждым движком "
+        "сессий и печатает число запросов к БД и время каждого шага. "
+        "Созданные данные откатываются в конце."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument(
+            "--engines",
+            nargs="+",
+            default=[*settings.SESSION_ENGINES, SIGNED_STATE],
+            choices=[*settings.SESSION_ENGINES, SIGNED_STATE],
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic(), tempfile.TemporaryDirectory() as session_dir:
+            product, tag = self._seed()
+            self.stdout.write(
+                f"{'движок':<16}{'шаг':<12}{'запросов':>10}{'медиана, мс':>14}"
+            )
+            for engine in options["engines"]:
+                overrides = {
+                    "ALLOWED_HOSTS": ["testserver"],
+                    "SESSION_FILE_PATH": session_dir,
+                    "SESSION_ENGINE": settings.SESSION_ENGINES.get(
+                        engine, settings.SESSION_ENGINE
+                    ),
+                    "RATING_WIZARD_SIGNED_STATE": engine == SIGNED_STATE,
+                }
+                with override_settings(**overrides):
+                    results = self._measure(product, tag, options["repeat"])
+                for step in STEPS:
+                    queries, timings = results[step]
+                    self.stdout.write(
+                        f"{engine:<16}{step:<12}{queries:>10.1f}"
+                        f"{statistics.median(timings):>14.2f}"
+                    )
+            transaction.set_rollback(True)
+
+    def _measure(self, product, tag, repeat):
+        results = {step: ([], []) for step in STEPS}
+        for _ in range(repeat):
+            for step, queries, elapsed in self._run_flow(product, tag):
+                results[step][0].append(queries)
+                results[step][1].append(elapsed)
+        return {
+            step: (statistics.mean(queries), timings)
+            for step, (queries, timings) in results.items()
+        }
+
+    def _run_flow(self, product, tag):
+        # Новый клиент - новый пользователь: первая запись создаёт сессию
+        client = Client()
+        state = {}
+
+        def step(name, method, url, data=None, **kwargs):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = getattr(client, method)(url, data, **kwargs)
+                elapsed = (time.perf_counter() - started) * 1000
+            token = TOKEN_RE.search(response.content.decode())
+            if token:
+                state["wizard_state"] = token.group(1)
+            return (name, len(queries), elapsed), response
+
+        added, response = step(
+            "add",
+            "post",
+            reverse("add_food:add_product"),
+            {"ean_code": product.ean_code},
+        )
+        page, _ = step(
+            "rate page", "get", response["Location"], headers={"HX-Request": "true"}
+        )
+        rated, _ = step(
+            "rate", "post", reverse("rate_food:add_rate"), {"rate": 5, **state}
+        )
+        saved, _ = step(
+            "save",
+            "post",
+            reverse("rate_food:save_rate"),
+            {"taste_tags": [tag.pk], **state},
+        )
+        return [added, page, rated, saved]
+
+    def _seed(self):
+        country = Country.objects.create(name="Бенчмарк")
+        company = Company.objects.create(name="Бенч компания", country=country)
+        category = Category.objects.create(name="Бенч категория")
+        tag = TasteTag.objects.create(
+            name="Бенч тег", taste_type=TasteTag.TypeTag.POSITIVE, slug="bench-tag"
+        )
+        category.taste_tags.add(tag)
+        code = "299999999999"
+        product = Product.objects.create(
+            name="Бенч продукт",
+            company=company,
+            category=category,
+            ean_code=code + ean.calc_check_digit(code),
+            img_field="products/default_image.png",
+        )
+        return product, tag
@@ -0,0 +1,75 @@
+import csv
+import json
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from rate_food.services import InvalidRow, ingest_ratings
+
+
+class Command(BaseCommand):
+    help = (
+        "Массовый импорт оценок из CSV или JSONL (файл или stdin). "
+        "Колонки: ean_code, rate, taste_tags (slug через '|'), comment. "
+        "Строки с ошибками пропускаются, остальные пишутся пачками."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path", nargs="?", default="-", help="Файл с оценками ('-' - stdin)"
+        )
+        parser.add_argument(
+            "--format",
+            choices=("csv", "jsonl"),
+            help="Формат входа, по умолчанию - по расширению файла",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.RATING_INGEST_BATCH_SIZE,
+            help="Сколько оценок записывать одной транзакцией",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or ("jsonl" if path.endswith(".jsonl") else "csv")
+        if path == "-":
+            stream = sys.stdin
+        else:
+            try:
+                stream = open(path, encoding="utf-8", newline="")
+            except OSError as error:
+                raise CommandError(f"Не удалось открыть {path}: {error.strerror}")
+        try:
+            # Номера строк в отчёте - номера строк файла (у CSV первая - заголовок)
+            if fmt == "csv":
+                rows, start = csv.DictReader(stream), 2
+            else:
+                rows, start = self._read_jsonl(stream), 1
+            result = ingest_ratings(
+                rows, batch_size=options["batch_size"], start=start
+            )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        for row, error in result.errors:
+            self.stdout.write(f"{row}\t{error}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Готово. created: {result.created}, failed: {len(result.errors)}"
+            )
+        )
+
+    def _read_jsonl(self, stream):
+        # Плохая строка не прерывает импорт: уже записанные пачки остаются,
+        # а она попадает в отчёт вместе с остальными ошибками
+        for line in stream:
+            if not line.strip():
+                yield InvalidRow("Пустая строка")
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as error:
+                yield InvalidRow(f"Некорректный JSON ({error})")
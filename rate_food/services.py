@@ -0,0 +1,166 @@
+import logging
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+
+from food_hub.aggregates import increment_tag_picks, refresh_product_aggregates
+from food_hub.models import Category, Product, ProductRating
+from search_hub.engine import bump_search_version
+
+logger = logging.getLogger("rate_food")
+
+COMMENT_MAX_LENGTH = ProductRating._meta.get_field("comment").max_length
+
+
+@dataclass
+class IngestResult:
+    created: int = 0
+    # (номер строки, причина)
+    errors: list[tuple[int, str]] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class InvalidRow:
+    """Строка, которую не удалось разобрать: попадает в errors как есть."""
+
+    reason: str
+
+
+@dataclass
+class _ValidRating:
+    product_id: int
+    category_id: int
+    rate: int
+    comment: str | None
+    tag_ids: list[int]
+
+
+def ingest_ratings(
+    rows, batch_size: int | None = None, start: int = 1
+) -> IngestResult:
+    """
+    Массовая загрузка оценок. Строка - словарь с ean_code, rate (1-5),
+    taste_tags (slug тегов, разрешённых категории продукта) и необязательным
+    comment. Ошибочные строки (и InvalidRow от разбора файла) пропускаются
+    и попадают в errors с номером от start, остальные пишутся пачками:
+    одна транзакция, bulk_create оценок и связей с тегами и один пересчёт
+    агрегатов на пачку.
+    """
+    batch_size = batch_size or settings.RATING_INGEST_BATCH_SIZE
+    result = IngestResult()
+    numbered = enumerate(rows, start=start)
+    while batch := list(islice(numbered, batch_size)):
+        valid = _validate_batch(batch, result.errors)
+        if valid:
+            _write_batch(valid)
+            result.created += len(valid)
+    logger.info(
+        f"[BULK] Ingested ratings: {result.created}, rejected: {len(result.errors)}"
+    )
+    return result
+
+
+def _validate_batch(batch, errors) -> list[_ValidRating]:
+    eans = {
+        str(row.get("ean_code", "")).strip()
+        for _, row in batch
+        if isinstance(row, dict)
+    }
+    products = {
+        ean: (product_id, category_id)
+        for ean, product_id, category_id in Product.objects.filter(
+            ean_code__in=eans
+        ).values_list("ean_code", "id", "category_id")
+    }
+    allowed = defaultdict(dict)
+    links = Category.taste_tags.through.objects.filter(
+        category_id__in={category_id for _, category_id in products.values()}
+    ).values_list("category_id", "tastetag__slug", "tastetag_id")
+    for category_id, slug, tag_id in links:
+        allowed[category_id][slug] = tag_id
+
+    valid = []
+    for number, row in batch:
+        try:
+            valid.append(_validate_row(row, products, allowed))
+        except ValueError as error:
+            errors.append((number, str(error)))
+    return valid
+
+
+def _validate_row(row, products, allowed) -> _ValidRating:
+    if isinstance(row, InvalidRow):
+        raise ValueError(row.reason)
+    if not isinstance(row, dict):
+        raise ValueError("Строка должна быть объектом")
+
+    ean = str(row.get("ean_code", "")).strip()
+    if ean not in products:
+        raise ValueError(f"Продукт не найден: {ean}")
+    product_id, category_id = products[ean]
+
+    rate = _parse_rate(row.get("rate"))
+    if rate not in range(1, 6):
+        raise ValueError("Оценка должна быть от 1 до 5")
+
+    slugs = row.get("taste_tags") or []
+    if isinstance(slugs, str):
+        slugs = slugs.split("|")
+    if not isinstance(slugs, list) or not all(isinstance(slug, str) for slug in slugs):
+        raise ValueError("Теги должны быть строкой или списком строк")
+    slugs = [slug.strip() for slug in slugs if slug.strip()]
+    category_tags = allowed[category_id]
+    unknown = [slug for slug in slugs if slug not in category_tags]
+    if unknown:
+        raise ValueError(f"Теги не разрешены для категории: {', '.join(unknown)}")
+
+    comment = row.get("comment") or None
+    if comment is not None and not isinstance(comment, str):
+        raise ValueError("Комментарий должен быть строкой")
+    if comment is not None and len(comment) > COMMENT_MAX_LENGTH:
+        raise ValueError(f"Комментарий длиннее {COMMENT_MAX_LENGTH} символов")
+
+    tag_ids = list(dict.fromkeys(category_tags[slug] for slug in slugs))
+    return _ValidRating(product_id, category_id, rate, comment, tag_ids)
+
+
+def _parse_rate(value) -> int | None:
+    # bool - подкласс int, а 4.9 и "4.9" не должны молча стать 4
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    return None
+
+
+def _write_batch(valid: list[_ValidRating]) -> None:
+    Through = ProductRating.taste_tags.through
+    with transaction.atomic():
+        ratings = ProductRating.objects.bulk_create(
+            ProductRating(
+                product_id=item.product_id, rate=item.rate, comment=item.comment
+            )
+            for item in valid
+        )
+        Through.objects.bulk_create(
+            [
+                Through(productrating_id=rating.pk, tastetag_id=tag_id)
+                for rating, item in zip(ratings, valid)
+                for tag_id in item.tag_ids
+            ],
+            batch_size=1000,
+        )
+        # Сводки и статистика тегов затронутых продуктов - одним пересчётом
+        refresh_product_aggregates({item.product_id for item in valid})
+        increment_tag_picks(
+            Counter(
+                (item.category_id, item.rate, tag_id)
+                for item in valid
+                for tag_id in item.tag_ids
+            )
+        )
+        # bulk_create не шлёт post_save, версию поиска меняем сами
+        transaction.on_commit(bump_search_version)
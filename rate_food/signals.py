@@ -0,0 +1,26 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from food_hub.models import Category, TasteTag
+from rate_food.tags_choose import bump_tag_menu_version
+
+
+def _bump_after_commit(**kwargs):
+    transaction.on_commit(bump_tag_menu_version)
+
+
+# Имя и тип тега входят в меню всех его категорий
+post_save.connect(_bump_after_commit, sender=TasteTag, dispatch_uid="tag_menu_save")
+post_delete.connect(
+    _bump_after_commit, sender=TasteTag, dispatch_uid="tag_menu_delete"
+)
+post_delete.connect(
+    _bump_after_commit, sender=Category, dispatch_uid="tag_menu_category_delete"
+)
+
+
+@receiver(m2m_changed, sender=Category.taste_tags.through)
+def bump_on_category_tags_change(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        _bump_after_commit()
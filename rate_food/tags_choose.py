@@ -1,43 +1,103 @@
 import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
 
-from food_hub.models import TasteTag
+from django.conf import settings
+from django.core.cache import cache
+
+from food_hub.models import CacheVersion, CategoryTagRateStat, TasteTag
 
 logger = logging.getLogger("rate_food")
 
+TAG_MENU_VERSION_KEY = "rate_food:tag_menu:version"
+TAGS_PER_STEP = 6
+
+
+@dataclass(frozen=True)
+class TagMenu:
+    """
+    Теги категории, разделённые на положительные и отрицательные,
+    пары (id, имя) в порядке создания тегов. ranked - те же списки для
+    каждой оценки, по убыванию того, как часто тег выбирали с этой оценкой;
+    оценок без выбранных тегов в нём нет.
+    """
+
+    positive: tuple[tuple[int, str], ...] = ()
+    negative: tuple[tuple[int, str], ...] = ()
+    ranked: dict[int, tuple[tuple, tuple]] = field(default_factory=dict)
+
+    def pick(self, rate) -> list[tuple[int, str]]:
+        """Теги шага выбора: на 5 - хвалебные, на 1-2 - критические, иначе поровну."""
+        positive, negative = self.ranked.get(rate, (self.positive, self.negative))
+        half = TAGS_PER_STEP // 2
+        if rate == 5:
+            return list(positive[:TAGS_PER_STEP])
+        if rate in (3, 4):
+            return list(positive[:half] + negative[:half])
+        if rate in (1, 2):
+            return list(negative[:TAGS_PER_STEP])
+        logger.error(f"[TAGS_CHOOSE] Invalid rate value: {rate}")
+        return []
+
+
+def _rank(tags, picks: dict[int, int]) -> tuple:
+    # sorted устойчив: при равенстве остаётся порядок создания
+    return tuple(sorted(tags, key=lambda tag: -picks.get(tag[0], 0)))
+
+
+def tag_menu_version() -> int:
+    return CacheVersion.objects.current(TAG_MENU_VERSION_KEY)
+
+
+def bump_tag_menu_version() -> None:
+    CacheVersion.objects.bump(TAG_MENU_VERSION_KEY)
+
+
+def get_tag_menu(category_id: int) -> TagMenu:
+    """
+    Меню тегов категории из кэша (один запрос версии); при промахе - ещё
+    два (теги и счётчики выбора). Смена тегов категории сбрасывает меню
+    сразу, новые счётчики попадают в ранжирование по истечении
+    TAG_MENU_CACHE_TIMEOUT.
+    """
+    key = f"rate_food:tag_menu:{tag_menu_version()}:{category_id}"
+    menu = cache.get(key)
+    if menu is not None:
+        return menu
+
+    tags = (
+        TasteTag.objects.filter(categories=category_id)
+        .order_by("id")
+        .values_list("id", "name", "taste_type")
+    )
+    positive, negative = [], []
+    for tag_id, name, taste_type in tags:
+        group = positive if taste_type == TasteTag.TypeTag.POSITIVE else negative
+        group.append((tag_id, name))
+
+    picks = defaultdict(dict)
+    stats = CategoryTagRateStat.objects.filter(category_id=category_id).values_list(
+        "rate", "taste_tag_id", "picks_count"
+    )
+    for rate, tag_id, count in stats:
+        picks[rate][tag_id] = count
+    menu = TagMenu(
+        positive=tuple(positive),
+        negative=tuple(negative),
+        ranked={
+            rate: (_rank(positive, counts), _rank(negative, counts))
+            for rate, counts in picks.items()
+        },
+    )
+    cache.set(key, menu, settings.TAG_MENU_CACHE_TIMEOUT)
+    return menu
+
 
 def choose_taste_tags(rate, category):
     try:
-        base_orm_request = category.taste_tags.all()
-        if rate == 5:
-            ids = list(
-                base_orm_request.filter(
-                    taste_type=TasteTag.TypeTag.POSITIVE
-                ).values_list("id", flat=True)[:6]
-            )
-
-        elif rate in (3, 4):
-            ids_p = list(
-                base_orm_request.filter(
-                    taste_type=TasteTag.TypeTag.POSITIVE
-                ).values_list("id", flat=True)[:3]
-            )
-            ids_n = list(
-                base_orm_request.filter(
-                    taste_type=TasteTag.TypeTag.NEGATIVE
-                ).values_list("id", flat=True)[:3]
-            )
-            ids = ids_p + ids_n
-
-        elif rate in (1, 2):
-            ids = list(
-                base_orm_request.filter(
-                    taste_type=TasteTag.TypeTag.NEGATIVE
-                ).values_list("id", flat=True)[:6]
-            )
-        else:
-            logger.error(f"[TAGS_CHOOSE] Invalid rate value: {rate}")
-            return TasteTag.objects.none()
+        menu = get_tag_menu(category.pk)
     except AttributeError:
         logger.error(f"[TAGS_CHOOSE] Invalid category: {category}")
         return TasteTag.objects.none()
+    ids = [tag_id for tag_id, _ in menu.pick(rate)]
     return TasteTag.objects.filter(id__in=ids)
@@ -0,0 +1,11 @@
+import pytest
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Меню тегов кэшируется, а в тестах транзакции не коммитятся
+    # и версия меню не меняется
+    cache.clear()
+    yield
+    cache.clear()
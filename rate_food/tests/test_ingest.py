@@ -0,0 +1,154 @@
+import json
+
+import pytest
+from django.contrib.auth.models import Permission, User
+from django.core.management import CommandError, call_command
+from django.urls import reverse
+
+from food_hub.models import (Category, CategoryTagRateStat, Company, Country,
+                             Product, ProductRating, ProductRatingSummary,
+                             TasteTag)
+from rate_food.services import ingest_ratings
+
+
+@pytest.fixture
+def product(db):
+    country = Country.objects.create(name="Россия")
+    company = Company.objects.create(name="Компания", country=country)
+    category = Category.objects.create(name="Десерты")
+    sweet = TasteTag.objects.create(
+        name="Сладкий", taste_type=TasteTag.TypeTag.POSITIVE, slug="sladkiy"
+    )
+    category.taste_tags.add(sweet)
+    TasteTag.objects.create(
+        name="Горький", taste_type=TasteTag.TypeTag.NEGATIVE, slug="gorkiy"
+    )
+    return Product.objects.create(
+        company=company, category=category, name="Мороженое", ean_code="4006381333931"
+    )
+
+
+def row(**overrides):
+    return {"ean_code": "4006381333931", "rate": 5, "taste_tags": ["sladkiy"]} | (
+        overrides
+    )
+
+
+class TestIngestRatings:
+    def test_creates_ratings_and_aggregates(self, product):
+        result = ingest_ratings([row(), row(rate=3, taste_tags=[])], batch_size=1)
+
+        assert result.created == 2
+        assert result.errors == []
+        rating = ProductRating.objects.get(product=product, rate=5)
+        assert [tag.slug for tag in rating.taste_tags.all()] == ["sladkiy"]
+        summary = ProductRatingSummary.objects.get(product=product)
+        assert summary.ratings_count == 2
+        assert summary.histogram == [0, 0, 1, 0, 1]
+        stat = CategoryTagRateStat.objects.get(category=product.category, rate=5)
+        assert stat.picks_count == 1
+
+    def test_invalid_rows_reported(self, product):
+        result = ingest_ratings(
+            [
+                row(ean_code="0000000000000"),
+                row(rate=7),
+                row(taste_tags=["gorkiy"]),
+                row(comment="x" * 101),
+                row(),
+            ]
+        )
+
+        assert result.created == 1
+        assert [number for number, _ in result.errors] == [1, 2, 3, 4]
+        assert "gorkiy" in result.errors[2][1]
+
+    @pytest.mark.parametrize(
+        "overrides, error",
+        [
+            ({"comment": 5}, "Комментарий должен быть строкой"),
+            ({"taste_tags": [1]}, "Теги должны быть строкой или списком строк"),
+            ({"taste_tags": 7}, "Теги должны быть строкой или списком строк"),
+            ({"rate": 4.9}, "Оценка должна быть от 1 до 5"),
+            ({"rate": True}, "Оценка должна быть от 1 до 5"),
+            ({"rate": "4.9"}, "Оценка должна быть от 1 до 5"),
+        ],
+    )
+    def test_wrong_types_reported(self, product, overrides, error):
+        result = ingest_ratings([row(**overrides)])
+        assert result.created == 0
+        assert result.errors == [(1, error)]
+
+    def test_rate_as_digit_string(self, product):
+        assert ingest_ratings([row(rate="4", taste_tags="sladkiy")]).created == 1
+
+
+class TestImportCommand:
+    def test_imports_csv(self, product, tmp_path, capsys):
+        path = tmp_path / "ratings.csv"
+        path.write_text(
+            "ean_code,rate,taste_tags,comment\n"
+            "4006381333931,4,sladkiy,Вкусно\n"
+            "4006381333931,0,,\n",
+            encoding="utf-8",
+        )
+
+        call_command("import_ratings", str(path))
+
+        out = capsys.readouterr().out
+        assert "3\tОценка должна быть от 1 до 5" in out
+        assert "created: 1, failed: 1" in out
+        assert ProductRating.objects.get().comment == "Вкусно"
+
+    def test_bad_jsonl_line_is_row_error(self, product, tmp_path, capsys):
+        path = tmp_path / "ratings.jsonl"
+        lines = [json.dumps(row()), json.dumps(row(rate=4)), "{oops", json.dumps(row())]
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+        call_command("import_ratings", str(path), batch_size=1)
+
+        out = capsys.readouterr().out
+        assert "3\tНекорректный JSON" in out
+        assert "created: 3, failed: 1" in out
+        assert ProductRating.objects.count() == 3
+
+    def test_missing_file(self, tmp_path):
+        with pytest.raises(CommandError):
+            call_command("import_ratings", str(tmp_path / "missing.csv"))
+
+
+class TestBulkRatingView:
+    def post(self, client, payload):
+        return client.post(
+            reverse("rate_food:bulk_rate"),
+            json.dumps(payload),
+            content_type="application/json",
+        )
+
+    def test_requires_permission(self, client, product):
+        client.force_login(User.objects.create_user("user"))
+        response = self.post(client, {"ratings": [row()]})
+        assert response.status_code == 403
+        assert not ProductRating.objects.exists()
+
+    def test_creates_ratings(self, client, product):
+        user = User.objects.create_user("importer")
+        user.user_permissions.add(Permission.objects.get(codename="add_productrating"))
+        client.force_login(user)
+
+        response = self.post(client, {"ratings": [row(), row(rate=9)]})
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "created": 1,
+            "errors": [{"row": 2, "error": "Оценка должна быть от 1 до 5"}],
+        }
+
+    def test_wrong_types_are_row_errors(self, admin_client, product):
+        response = self.post(admin_client, {"ratings": [row(comment=5)]})
+        assert response.status_code == 200
+        assert response.json()["errors"][0]["row"] == 1
+
+    def test_rejects_malformed_body(self, admin_client):
+        response = self.post(admin_client, ["not", "an", "object"])
+        assert response.status_code == 400
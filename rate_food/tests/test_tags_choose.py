@@ -1,7 +1,8 @@
 import pytest
 
+from food_hub.aggregates import register_tag_picks
 from food_hub.models import Category, TasteTag
-from rate_food.tags_choose import choose_taste_tags
+from rate_food.tags_choose import TagMenu, choose_taste_tags, get_tag_menu
 
 
 @pytest.fixture
@@ -106,3 +107,88 @@ class TestInvalidReturn:
     def test_no_category(self, db):
         result = choose_taste_tags(5, category=None)
         assert len(result) == 0
+
+
+class TestTagMenu:
+    def test_split_and_ordered(self, category_with_tags):
+        menu = get_tag_menu(category_with_tags.pk)
+        assert [name for _, name in menu.positive][:3] == [
+            "Сладкий",
+            "Ванильный",
+            "Шоколадный",
+        ]
+        assert [name for _, name in menu.negative][:3] == [
+            "Кислый",
+            "Горький",
+            "Пересоленный",
+        ]
+
+    def test_cached_menu_reads_only_version(
+        self, category_with_tags, django_assert_num_queries
+    ):
+        first = get_tag_menu(category_with_tags.pk)
+        with django_assert_num_queries(1):
+            assert get_tag_menu(category_with_tags.pk) == first
+            assert len(first.pick(4)) == 6
+
+    def test_pick_without_db(self):
+        menu = TagMenu(positive=((1, "Сладкий"),), negative=((2, "Кислый"),))
+        assert menu.pick(5) == [(1, "Сладкий")]
+        assert menu.pick(3) == [(1, "Сладкий"), (2, "Кислый")]
+        assert menu.pick(1) == [(2, "Кислый")]
+        assert menu.pick(0) == []
+
+    def test_category_tags_change_invalidates(
+        self, category, make_taste_tag, django_capture_on_commit_callbacks
+    ):
+        assert get_tag_menu(category.pk) == TagMenu()
+        with django_capture_on_commit_callbacks(execute=True):
+            category.taste_tags.add(
+                make_taste_tag("Сладкий", TasteTag.TypeTag.POSITIVE, "sladkiy")
+            )
+        assert [name for _, name in get_tag_menu(category.pk).positive] == [
+            "Сладкий"
+        ]
+
+    def test_tag_rename_invalidates(
+        self, category_with_tags, django_capture_on_commit_callbacks
+    ):
+        get_tag_menu(category_with_tags.pk)
+        with django_capture_on_commit_callbacks(execute=True):
+            tag = TasteTag.objects.get(slug="sladkiy")
+            tag.name = "Сахарный"
+            tag.save()
+        assert get_tag_menu(category_with_tags.pk).positive[0][1] == "Сахарный"
+
+
+class TestPopularityRanking:
+    def test_popular_tags_first_for_rate(self, category_with_tags):
+        caramel = TasteTag.objects.get(slug="karamelniy")
+        peach = TasteTag.objects.get(slug="persikoviy")
+        register_tag_picks(category_with_tags.pk, 5, [caramel.pk, peach.pk])
+        register_tag_picks(category_with_tags.pk, 5, [caramel.pk])
+
+        names = [name for _, name in get_tag_menu(category_with_tags.pk).pick(5)]
+
+        # Дальше - невыбранные теги в порядке создания
+        assert names == [
+            "Карамельный",
+            "Персиковый",
+            "Сладкий",
+            "Ванильный",
+            "Шоколадный",
+            "Клубничный",
+        ]
+
+    def test_ranking_is_per_rate(self, category_with_tags):
+        chemical = TasteTag.objects.get(slug="himichesky")
+        register_tag_picks(category_with_tags.pk, 1, [chemical.pk])
+
+        menu = get_tag_menu(category_with_tags.pk)
+
+        assert menu.pick(1)[0][1] == "Химический"
+        assert [name for _, name in menu.pick(3)][3:] == [
+            "Кислый",
+            "Горький",
+            "Пересоленный",
+        ]
@@ -1,10 +1,13 @@
 from unittest.mock import MagicMock, patch
 
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from food_hub.models import (Category, Company, Country, Product,
-                             ProductRating, TasteTag)
+from food_hub.models import (Category, CategoryTagRateStat, Company, Country,
+                             Product, ProductRating, ProductRatingSummary,
+                             TasteTag)
 from rate_food.forms import RatingForm, TasteTagForm
 from rate_food.views import get_product_from_session
 
@@ -112,6 +115,16 @@ class TestRateProductViewPost:
         tags_form = response.context["tags_form"]
         assert taste_tag in tags_form.fields["taste_tags"].queryset
 
+    def test_warm_menu_skips_tag_queries(
+        self, client, product_with_session, taste_tag
+    ):
+        client.post(reverse("rate_food:add_rate"), {"rate": 5})
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(reverse("rate_food:add_rate"), {"rate": 5})
+        checkbox = response.context["tags_form"]["taste_tags"][0]
+        assert checkbox.data["label"] == "Сладкий"
+        assert not [q for q in queries if "food_hub_tastetag" in q["sql"]]
+
     def test_invalid_rate_form(self, client, product_with_session):
         response = client.post(reverse("rate_food:add_rate"), {"rate": "invalid"})
         assert response.status_code == 200
@@ -165,6 +178,29 @@ class TestSaveRatingView:
         assert client.session.get("rate") is None
         assert client.session.get("tag_ids") is None
 
+    def test_valid_work_counts_tag_picks(
+        self, client, product_with_session, taste_tag
+    ):
+        client.post(reverse("rate_food:add_rate"), {"rate": 5})
+        client.post(reverse("rate_food:save_rate"), {"taste_tags": [taste_tag.pk]})
+        stat = CategoryTagRateStat.objects.get(
+            category=product_with_session.category, rate=5
+        )
+        assert stat.taste_tag == taste_tag
+        assert stat.picks_count == 1
+        assert client.session.get("category_id") is None
+
+    def test_valid_work_updates_summary(self, client, product_with_session, taste_tag):
+        session = client.session
+        session["rate"] = 4
+        session["tag_ids"] = [taste_tag.pk]
+        session.save()
+        client.post(reverse("rate_food:save_rate"), {"taste_tags": [taste_tag.pk]})
+        summary = ProductRatingSummary.objects.get(product=product_with_session)
+        assert summary.ratings_count == 1
+        assert summary.last_rate == 4
+        assert summary.histogram == [0, 0, 0, 1, 0]
+
     def test_pk_is_not_in_session(self, client, db, taste_tag):
         session = client.session
         session["rate"] = 5
@@ -0,0 +1,122 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from food_hub.models import (Category, Company, Country, Product,
+                             ProductRating, ProductRatingSummary, TasteTag)
+from rate_food.wizard import start_url
+
+
+@pytest.fixture
+def signed_state(settings):
+    settings.RATING_WIZARD_SIGNED_STATE = True
+
+
+@pytest.fixture
+def product(db):
+    country = Country.objects.create(name="Россия")
+    company = Company.objects.create(name="Завод мороженого", country=country)
+    category = Category.objects.create(name="Десерты")
+    tag = TasteTag.objects.create(
+        name="Сладкий", taste_type=TasteTag.TypeTag.POSITIVE, slug="sladkiy"
+    )
+    category.taste_tags.add(tag)
+    return Product.objects.create(
+        company=company, category=category, name="Пломбир", ean_code="4006381333931"
+    )
+
+
+def test_flow_without_session_io(client, rf, product, signed_state):
+    tag = TasteTag.objects.get(slug="sladkiy")
+    with CaptureQueriesContext(connection) as queries:
+        url = start_url(rf.get("/"), product.pk)
+        page = client.get(url, headers={"HX-Request": "true"})
+        token = page.context["wizard_state"]
+        tags_step = client.post(
+            reverse("rate_food:add_rate"), {"rate": 5, "wizard_state": token}
+        )
+        response = client.post(
+            reverse("rate_food:save_rate"),
+            {
+                "taste_tags": [tag.pk],
+                "wizard_state": tags_step.context["wizard_state"],
+            },
+        )
+
+    assert 'name="wizard_state"' in page.content.decode()
+    assert response.status_code == 302
+    rating = ProductRating.objects.get(product=product)
+    assert rating.rate == 5
+    assert list(rating.taste_tags.all()) == [tag]
+    assert not [q for q in queries if "django_session" in q["sql"]]
+    assert "sessionid" not in client.cookies
+
+
+def test_tag_outside_token_is_rejected(client, rf, product, signed_state):
+    other = TasteTag.objects.create(
+        name="Кислый", taste_type=TasteTag.TypeTag.NEGATIVE, slug="kisliy"
+    )
+    token = client.get(
+        start_url(rf.get("/"), product.pk), headers={"HX-Request": "true"}
+    ).context["wizard_state"]
+    tags_step = client.post(
+        reverse("rate_food:add_rate"), {"rate": 5, "wizard_state": token}
+    )
+    response = client.post(
+        reverse("rate_food:save_rate"),
+        {
+            "taste_tags": [other.pk],
+            "wizard_state": tags_step.context["wizard_state"],
+        },
+    )
+    assert response.status_code == 200
+    assert not ProductRating.objects.exists()
+
+
+def test_token_is_single_use(client, rf, product, signed_state):
+    tag = TasteTag.objects.get(slug="sladkiy")
+    token = client.get(
+        start_url(rf.get("/"), product.pk), headers={"HX-Request": "true"}
+    ).context["wizard_state"]
+
+    def rate_once():
+        tags_step = client.post(
+            reverse("rate_food:add_rate"), {"rate": 5, "wizard_state": token}
+        )
+        return client.post(
+            reverse("rate_food:save_rate"),
+            {
+                "taste_tags": [tag.pk],
+                "wizard_state": tags_step.context["wizard_state"],
+            },
+        )
+
+    assert rate_once().headers["Location"] == reverse("food_hub:product_list")
+    # Повтор токена первого шага - та же цепочка, вторая оценка не создаётся
+    assert rate_once().headers["Location"] == reverse("add_food:add_product")
+    assert ProductRating.objects.filter(product=product).count() == 1
+    assert ProductRatingSummary.objects.get(product=product).ratings_count == 1
+
+
+@pytest.mark.parametrize("token", ["", "forged:token"])
+def test_missing_or_forged_token(client, product, signed_state, token):
+    response = client.post(
+        reverse("rate_food:add_rate"), {"rate": 5, "wizard_state": token}
+    )
+    assert response.status_code == 302
+    assert response.headers["Location"] == reverse("add_food:add_product")
+
+
+def test_expired_token(client, rf, product, signed_state, settings):
+    url = start_url(rf.get("/"), product.pk)
+    settings.RATING_WIZARD_STATE_MAX_AGE = -1
+    response = client.get(url, headers={"HX-Request": "true"})
+    assert response.headers.get("HX-Redirect") == reverse("add_food:add_product")
+
+
+def test_session_mode_keeps_plain_url(rf, product):
+    request = rf.get("/")
+    request.session = {}
+    assert start_url(request, product.pk) == reverse("rate_food:add_rate")
+    assert request.session["current_product_id"] == product.pk
@@ -6,4 +6,5 @@ app_name = 'rate_food'
 urlpatterns = [
     path("add_rate/", views.RateProductView.as_view(), name="add_rate"),
     path("save_rate/", views.SaveRatingView.as_view(), name="save_rate"),
+    path("bulk/", views.BulkRatingView.as_view(), name="bulk_rate"),
 ]
\ No newline at end of file
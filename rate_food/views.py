@@ -1,21 +1,29 @@
+import json
 import logging
 
+from django.conf import settings
 from django.contrib import messages
-from django.db import transaction
+from django.contrib.auth.decorators import permission_required
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse
 from django.shortcuts import redirect, render
 from django.urls import reverse
+from django.utils.decorators import method_decorator
 from django.views import View
 from django_htmx.http import HttpResponseClientRedirect
 
+from food_hub.aggregates import register_rating, register_tag_picks
 from food_hub.models import Product, ProductRating, TasteTag
 from rate_food.forms import RatingForm, TasteTagForm
-from rate_food.tags_choose import choose_taste_tags
+from rate_food.services import ingest_ratings
+from rate_food.tags_choose import get_tag_menu
+from rate_food.wizard import STATE_FIELD, clear_state, load_state, save_state
 
 logger = logging.getLogger("rate_food")
 
 
 def get_product_from_session(request, select_category=False):
-    product_id = request.session.get("current_product_id")
+    product_id = load_state(request).get("current_product_id")
     if product_id is None:
         logger.warning("[Cookie] Product id is not found")
         messages.error(request, "Сессия истекла. Начните заново")
@@ -27,8 +35,7 @@ def get_product_from_session(request, select_category=False):
             product = Product.objects.only("id").get(pk=product_id)
     except Product.DoesNotExist:
         logger.warning(f"[DB] Product with pk = {product_id} is not found")
-        request.session.pop("current_product_id", None)
-        request.session.pop("rate", None)
+        clear_state(request)
         messages.error(request, "Продукт не найден. Начните заново")
         return None, True
     return product, None
@@ -50,7 +57,12 @@ class RateProductView(View):
                 return HttpResponseClientRedirect(reverse("add_food:add_product"))
             return redirect("add_food:add_product")
 
-        context = {"product": product, "rate_form": rate_form}
+        context = {
+            "product": product,
+            "rate_form": rate_form,
+            # Токен первого шага передаётся дальше как есть
+            "wizard_state": request.GET.get(STATE_FIELD),
+        }
 
         if is_htmx(request):
             logger.info("[S1] HTMX — load rate_selector")
@@ -73,41 +85,56 @@ class RateProductView(View):
             context = {
                 "product": product,
                 "rate_form": rate_form,
+                "wizard_state": request.POST.get(STATE_FIELD),
             }
             return render(request, "rate_food/partials/rate_selector.html", context)
 
         rate = rate_form.cleaned_data["rate"]
-        request.session["rate"] = rate  # Save rate to session
 
         tags_form = TasteTagForm()
         # Load filtered tags based on rate and category
 
-        unique_tags = choose_taste_tags(rate, product.category)
-        if not unique_tags.exists():  # No tags available for this category yet
+        # Меню тегов категории берётся из кэша, запросов к тегам нет
+        choices = get_tag_menu(product.category_id).pick(rate)
+        if not choices:  # No tags available for this category yet
             logger.warning(
-                f"[TAGS] No tags available rate={rate}, category={product.category.id}"
+                f"[TAGS] No tags available rate={rate}, category={product.category_id}"
             )
             messages.info(
                 request,
                 "Для этого продукта нет тегов. Администратор добавит их",
             )
-        tags_form.fields["taste_tags"].queryset = unique_tags
-
-        tag_ids = list(unique_tags.values_list("id", flat=True))
-        request.session["tag_ids"] = tag_ids
+        tag_ids = [tag_id for tag_id, _ in choices]
+        field = tags_form.fields["taste_tags"]
+        # queryset ленивый и нужен только для проверки формы на шаге сохранения,
+        # чекбоксы строятся из готовых пар (id, имя)
+        field.queryset = TasteTag.objects.filter(id__in=tag_ids)
+        field.choices = choices
+
+        # Save rate and offered tags: to the session or into a signed token
+        wizard_state = save_state(
+            request,
+            {
+                "current_product_id": product.pk,
+                "rate": rate,
+                "tag_ids": tag_ids,
+                "category_id": product.category_id,
+            },
+        )
 
         return render(
             request,
             "rate_food/partials/tag_selector.html",
-            context={"tags_form": tags_form},
+            context={"tags_form": tags_form, "wizard_state": wizard_state},
         )
 
 
 class SaveRatingView(View):
     def post(self, request):
         logger.info("[S3] User on Stage 3")
-        rate = request.session.get("rate")
-        tag_ids = request.session.get("tag_ids")
+        state = load_state(request)
+        rate = state.get("rate")
+        tag_ids = state.get("tag_ids")
 
         product, error = get_product_from_session(request)
         if error or rate is None:
@@ -121,20 +148,69 @@ class SaveRatingView(View):
         if not tags_form.is_valid():
             logger.warning("[RATE] TasteTagsForm is not valid")
             return render(
-                request, "rate_food/add_rating.html", {"tags_form": tags_form}
+                request,
+                "rate_food/add_rating.html",
+                {"tags_form": tags_form, "wizard_state": request.POST.get(STATE_FIELD)},
             )
 
         tags = tags_form.cleaned_data["taste_tags"]
 
-        with transaction.atomic():
-            rating_obj = ProductRating.objects.create(product=product, rate=rate)
-            rating_obj.taste_tags.set(tags)
+        try:
+            with transaction.atomic():
+                rating_obj = ProductRating.objects.create(
+                    product=product, rate=rate, wizard_nonce=state.get("nonce")
+                )
+                rating_obj.taste_tags.set(tags)
+                picked_ids = [tag.pk for tag in tags]
+                register_rating(rating_obj, picked_ids)
+                # Популярность тегов для ранжирования на шаге выбора
+                register_tag_picks(state.get("category_id"), rate, picked_ids)
+        except IntegrityError:
+            # Токен уже использован - повтор отправки не создаёт вторую оценку
+            logger.warning("[WIZARD] State token reused")
+            messages.error(request, "Оценка уже сохранена. Начните заново")
+            return redirect("add_food:add_product")
         logger.info("[DB] Add new rate for product")
 
-        request.session.pop("current_product_id", None)
-        request.session.pop("rate", None)
-        request.session.pop("tag_ids", None)
+        clear_state(request)
 
         # Regular redirect here — HTMX is not involved at this stage,
         # full page reload is expected
         return redirect("food_hub:product_list")
+
+
+@method_decorator(
+    permission_required("food_hub.add_productrating", raise_exception=True),
+    name="dispatch",
+)
+class BulkRatingView(View):
+    """
+    Массовая загрузка оценок: POST JSON {"ratings": [...]} в формате строк
+    ingest_ratings. Ответ - число созданных оценок и ошибки по номерам строк.
+    """
+
+    def post(self, request):
+        try:
+            rows = json.loads(request.body).get("ratings")
+        except (ValueError, AttributeError):
+            rows = None
+        if not isinstance(rows, list):
+            return JsonResponse(
+                {"error": "Ожидается JSON объект со списком ratings"}, status=400
+            )
+        if len(rows) > settings.RATING_INGEST_MAX_ROWS:
+            return JsonResponse(
+                {"error": f"Не больше {settings.RATING_INGEST_MAX_ROWS} строк"},
+                status=400,
+            )
+
+        result = ingest_ratings(rows)
+        logger.info(f"[BULK] API ingest: {result.created} of {len(rows)} ratings")
+        return JsonResponse(
+            {
+                "created": result.created,
+                "errors": [
+                    {"row": row, "error": error} for row, error in result.errors
+                ],
+            }
+        )
@@ -0,0 +1,67 @@
+import logging
+import secrets
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core import signing
+from django.urls import reverse
+
+logger = logging.getLogger("rate_food")
+
+STATE_FIELD = "wizard_state"
+STATE_KEYS = ("current_product_id", "rate", "tag_ids", "category_id")
+STATE_SALT = "rate_food.wizard"
+
+
+def signed_mode() -> bool:
+    return settings.RATING_WIZARD_SIGNED_STATE
+
+
+def load_state(request) -> dict:
+    """
+    Состояние мастера оценки. По умолчанию - ключи сессии; в режиме
+    RATING_WIZARD_SIGNED_STATE - подписанный токен из формы или строки
+    запроса. Испорченный или просроченный токен даёт пустое состояние.
+    """
+    if not signed_mode():
+        return {key: request.session.get(key) for key in STATE_KEYS}
+    token = request.POST.get(STATE_FIELD) or request.GET.get(STATE_FIELD)
+    if not token:
+        return {}
+    try:
+        return signing.loads(
+            token, salt=STATE_SALT, max_age=settings.RATING_WIZARD_STATE_MAX_AGE
+        )
+    except signing.BadSignature:
+        logger.warning("[WIZARD] Invalid or expired state token")
+        return {}
+
+
+def save_state(request, state: dict) -> str | None:
+    """
+    Сохраняет состояние шага. В режиме токенов сессия не трогается,
+    а возвращается токен, который шаблон кладёт в форму следующего шага.
+    Токен несёт nonce первого шага: оценка сохраняется с ним один раз,
+    и повтор любого токена той же цепочки отклоняется.
+    """
+    if not signed_mode():
+        for key, value in state.items():
+            request.session[key] = value
+        return None
+    nonce = load_state(request).get("nonce") or secrets.token_hex(16)
+    return signing.dumps({**state, "nonce": nonce}, salt=STATE_SALT, compress=True)
+
+
+def clear_state(request) -> None:
+    if not signed_mode():
+        for key in STATE_KEYS:
+            request.session.pop(key, None)
+
+
+def start_url(request, product_id: int) -> str:
+    """Адрес первого шага мастера для выбранного продукта."""
+    token = save_state(request, {"current_product_id": product_id})
+    url = reverse("rate_food:add_rate")
+    if token is None:
+        return url
+    return f"{url}?{urlencode({STATE_FIELD: token})}"
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SearchHubConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "search_hub"
+
+    def ready(self):
+        from search_hub import lookups, signals  # noqa: F401
@@ -0,0 +1,262 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            TrigramWordSimilarity)
+from django.core.cache import cache
+from django.db import models
+from django.db.models import (Case, Count, F, FloatField, Min, Q, Value, When,
+                              Window)
+from django.db.models.functions import Greatest, RowNumber
+
+from food_hub.models import (CacheVersion, Category, Company, Product,
+                             ProductTagStat)
+
+
+class Stage(models.IntegerChoices):
+    PREFIX = 0, "Префикс"
+    FULLTEXT = 1, "Полнотекстовый"
+    SUBSTRING = 2, "Подстрока"
+    FUZZY = 3, "Нечёткий"
+
+
+SEARCH_FIELDS = ("name", "company__name", "category__name")
+
+
+def _lookup(lookup: str, query: str) -> Q:
+    condition = Q()
+    for field in SEARCH_FIELDS:
+        condition |= Q(**{f"{field}__{lookup}": query})
+    return condition
+
+
+def _trigram_match(query: str) -> Q:
+    # Компании и категории - маленькие таблицы: подзапросы по их индексам
+    # дают планировщику BitmapOr вместо фильтра по соединению трёх таблиц
+    return (
+        Q(name__trigram_word_similar=query)
+        | Q(
+            company_id__in=Company.objects.filter(
+                name__trigram_word_similar=query
+            ).values("id")
+        )
+        | Q(
+            category_id__in=Category.objects.filter(
+                name__trigram_word_similar=query
+            ).values("id")
+        )
+    )
+
+
+def _similarity(query: str):
+    return Greatest(*(TrigramWordSimilarity(query, field) for field in SEARCH_FIELDS))
+
+
+def fuzzy_search(queryset, query: str, limit: int | None = None):
+    """
+    Нечёткий поиск по опечаткам: оператор %> использует индексы
+    gin_trgm_ops, порог - settings.SEARCH_TRIGRAM_THRESHOLD
+    (передаётся в соединение как pg_trgm.word_similarity_threshold).
+    """
+    limit = limit or settings.SEARCH_FUZZY_LIMIT
+    return (
+        queryset.filter(_trigram_match(query))
+        .annotate(rank=_similarity(query))
+        .order_by("-rank", "name")[:limit]
+    )
+
+
+def search_products(queryset, query: str):
+    """
+    Каскад поиска (префикс -> FTS -> подстрока -> нечёткий) одним SQL запросом.
+
+    Каждой найденной строке присваивается номер лучшего сработавшего этапа,
+    оконная функция MIN(stage) OVER () находит лучший этап по всей выборке,
+    и в результат попадают только его строки - как если бы этапы
+    проверялись по очереди через exists(), но без лишних планов запроса.
+    """
+    search_query = SearchQuery(query, config="russian", search_type="websearch")
+    prefix = _lookup("istartswith", query)
+    fulltext = Q(search_vector=search_query)
+    substring = _lookup("icontains", query)
+    # На одном-двух символах триграммы совпадают почти с чем угодно
+    fuzzy = (
+        _trigram_match(query)
+        if len(query) >= settings.SEARCH_FUZZY_MIN_LENGTH
+        else Q(pk__in=[])
+    )
+
+    return (
+        queryset.filter(fulltext | substring | fuzzy)
+        .annotate(
+            stage=Case(
+                When(prefix, then=Value(Stage.PREFIX)),
+                When(fulltext, then=Value(Stage.FULLTEXT)),
+                When(substring, then=Value(Stage.SUBSTRING)),
+                default=Value(Stage.FUZZY),
+            ),
+        )
+        .annotate(
+            # FTS этап сортируется по SearchRank, подстрока и нечёткий -
+            # по триграммной близости, префикс - по имени
+            rank=Case(
+                When(
+                    stage=Stage.FULLTEXT,
+                    then=SearchRank(F("search_vector"), search_query),
+                ),
+                When(stage__gte=Stage.SUBSTRING, then=_similarity(query)),
+                default=Value(0.0),
+                output_field=FloatField(),
+            ),
+            best_stage=Window(Min("stage")),
+        )
+        .annotate(
+            stage_position=Window(
+                RowNumber(), partition_by=F("stage"), order_by=F("rank").desc()
+            ),
+        )
+        .filter(
+            stage=F("best_stage"),
+            # Ограничение по количеству действует только на нечёткий этап
+            stage_position__lte=Case(
+                When(stage=Stage.FUZZY, then=Value(settings.SEARCH_FUZZY_LIMIT)),
+                default=F("stage_position"),
+            ),
+        )
+        .order_by("-rank", "name")
+    )
+
+
+def _suggest_prefix(query: str, limit: int) -> list[dict]:
+    # Один UNION ALL запрос; iprefix (name ILIKE 'q%') обслуживается
+    # индексами gin_trgm_ops, в отличие от istartswith с UPPER(name)
+    sources = [
+        (Product, Value("product")),
+        (Company, Value("company")),
+        (Category, Value("category")),
+    ]
+    parts = [
+        model.objects.filter(name__iprefix=query)
+        .annotate(kind=kind)
+        .order_by("name")
+        .values_list("kind", "name")[:limit]
+        for model, kind in sources
+    ]
+    rows = parts[0].union(*parts[1:], all=True)
+    return [{"kind": kind, "label": name} for kind, name in rows]
+
+
+def suggest(query: str) -> list[dict]:
+    """
+    Подсказки для поиска по мере ввода: имена продуктов, компаний и категорий.
+    Сначала префиксные совпадения, если их мало - добираются триграммные
+    по именам продуктов. Короткие префиксы кэшируются.
+    """
+    query = " ".join(query.split())
+    if not query:
+        return []
+
+    limit = settings.SEARCH_SUGGEST_LIMIT
+    cacheable = len(query) <= settings.SEARCH_SUGGEST_CACHE_PREFIX_LENGTH
+    if cacheable:
+        digest = hashlib.md5(query.casefold().encode()).hexdigest()
+        cache_key = f"search:suggest:{digest}"
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    suggestions = _suggest_prefix(query, limit)[:limit]
+    if len(suggestions) < limit and len(query) >= settings.SEARCH_FUZZY_MIN_LENGTH:
+        seen = {item["label"] for item in suggestions}
+        similar = (
+            Product.objects.filter(name__trigram_word_similar=query)
+            .annotate(rank=TrigramWordSimilarity(query, "name"))
+            .order_by("-rank", "name")
+            .values_list("name", flat=True)[:limit]
+        )
+        suggestions += [
+            {"kind": "product", "label": name} for name in similar if name not in seen
+        ][: limit - len(suggestions)]
+
+    if cacheable:
+        cache.set(cache_key, suggestions, settings.SEARCH_SUGGEST_CACHE_TIMEOUT)
+    return suggestions
+
+
+SEARCH_VERSION_KEY = "search:version"
+
+
+def search_version() -> int:
+    return CacheVersion.objects.current(SEARCH_VERSION_KEY)
+
+
+def bump_search_version() -> None:
+    """
+    Делает недействительными все закэшированные результаты поиска.
+    Версия лежит в таблице CacheVersion, поэтому сброс из воркера или
+    импорта видят все веб-процессы, даже с локальным кэшем у каждого.
+    """
+    CacheVersion.objects.bump(SEARCH_VERSION_KEY)
+
+
+def filter_by_tags(queryset, tag_ids):
+    """
+    Продукты, у оценок которых есть все выбранные теги.
+
+    Пересечение через HAVING COUNT(DISTINCT) по агрегату ProductTagStat:
+    по индексу (taste_tag, product) читаются только строки выбранных тегов -
+    по одной на пару продукт-тег, а не на каждую оценку, - и остаются
+    продукты, набравшие их все.
+    """
+    tag_ids = set(tag_ids)
+    matching = (
+        ProductTagStat.objects.filter(taste_tag_id__in=tag_ids)
+        .values("product_id")
+        .annotate(matched=Count("taste_tag_id", distinct=True))
+        .filter(matched=len(tag_ids))
+        .values("product_id")
+    )
+    return queryset.filter(pk__in=matching)
+
+
+def search_product_ids(query: str, tag_ids) -> list[int]:
+    """
+    Упорядоченные id найденных продуктов (не больше SEARCH_MAX_RESULTS).
+    Результат кэшируется по нормализованному запросу и набору тегов
+    в пределах текущей версии поиска.
+    """
+    query = " ".join(query.split())
+    tag_ids = sorted(set(tag_ids))
+    raw_key = f"{query.casefold()}|{','.join(map(str, tag_ids))}"
+    digest = hashlib.md5(raw_key.encode()).hexdigest()
+    cache_key = f"search:results:{search_version()}:{digest}"
+    ids = cache.get(cache_key)
+    if ids is not None:
+        return ids
+
+    queryset = Product.objects.all()
+    if tag_ids:
+        queryset = filter_by_tags(queryset, tag_ids)
+    if query:
+        queryset = search_products(queryset, query)
+    else:
+        queryset = queryset.order_by("created_at", "id")
+    ids = list(queryset.values_list("id", flat=True)[: settings.SEARCH_MAX_RESULTS])
+    cache.set(cache_key, ids, settings.SEARCH_RESULT_CACHE_TIMEOUT)
+    return ids
+
+
+def hydrate_products(ids):
+    """Карточки продуктов по первичным ключам с сохранением порядка ids."""
+    if not ids:
+        return Product.objects.none()
+    position = Case(
+        *(When(pk=pk, then=Value(index)) for index, pk in enumerate(ids)),
+        output_field=models.IntegerField(),
+    )
+    return (
+        Product.objects.for_cards()
+        .select_related("category")
+        .filter(pk__in=ids)
+        .order_by(position)
+    )
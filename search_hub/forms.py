@@ -1,4 +1,5 @@
 from django import forms
+from django.urls import reverse_lazy
 
 from food_hub.models import TasteTag
 
@@ -10,6 +11,10 @@ class SearchForm(forms.Form):
             attrs={
                 "placeholder": "Поиск по имени продукта, компании",
                 "class": "search-input",
+                "autocomplete": "off",
+                "hx-get": reverse_lazy("search_hub:suggest"),
+                "hx-trigger": "input changed delay:250ms",
+                "hx-target": "#search-suggestions",
             }
         ),
     )
@@ -0,0 +1,20 @@
+from django.db.models import CharField, Lookup
+
+
+@CharField.register_lookup
+class IPrefix(Lookup):
+    """
+    Префикс без учёта регистра как name ILIKE 'q%'. Встроенный istartswith
+    в PostgreSQL компилируется в UPPER(name) LIKE UPPER('q%'), и индексы
+    gin_trgm_ops по name для него не годятся; ILIKE pg_trgm обслуживает.
+    """
+
+    lookup_name = "iprefix"
+
+    def get_db_prep_lookup(self, value, connection):
+        return "%s", [f"{connection.ops.prep_for_like_query(value)}%"]
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} ILIKE {rhs}", (*lhs_params, *rhs_params)
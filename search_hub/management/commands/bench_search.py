@@ -0,0 +1,102 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from food_hub.models import Category, Company, Country, Product
+from search_hub.engine import _lookup, fuzzy_search
+
+WORDS = [
+    "Мороженое", "Шоколад", "Вафли", "Печенье", "Сырок", "Йогурт", "Кефир",
+    "Пряник", "Зефир", "Мармелад", "Творог", "Сметана", "Батончик", "Кекс",
+]
+FLAVOURS = [
+    "сливочное", "клубничный", "ванильный", "овсяное", "глазированный",
+    "молочный", "горький", "карамельный", "фруктовый", "ореховый",
+]
+# Запросы с типичными опечатками
+QUERIES = [
+    "мароженое",
+    "шоколат горкий",
+    "вафли клубнишные",
+    "сырок глазированый",
+    "печенье авсяное",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает нечёткий (trigram) поиск с icontains на синтетическом "
+        "каталоге. Все созданные данные откатываются в конце."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=100_000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        random.seed(options["seed"])
+        with transaction.atomic():
+            self._seed_catalogue(options["products"])
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE food_hub_product")
+
+            self.stdout.write(
+                f"{'запрос':<22}{'icontains, мс':>15}{'найдено':>10}"
+                f"{'fuzzy, мс':>12}{'найдено':>10}"
+            )
+            for query in QUERIES:
+                icontains = Product.objects.filter(
+                    _lookup("icontains", query)
+                ).order_by("name")
+                fuzzy = fuzzy_search(Product.objects.all(), query)
+                icontains_ms, icontains_hits = self._measure(
+                    icontains, options["repeat"]
+                )
+                fuzzy_ms, fuzzy_hits = self._measure(fuzzy, options["repeat"])
+                self.stdout.write(
+                    f"{query:<22}{icontains_ms:>15.1f}{icontains_hits:>10}"
+                    f"{fuzzy_ms:>12.1f}{fuzzy_hits:>10}"
+                )
+            transaction.set_rollback(True)
+
+    def _measure(self, queryset, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            ids = list(queryset.values_list("id", flat=True))
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), len(ids)
+
+    def _seed_catalogue(self, count):
+        country = Country.objects.create(name="Бенчмарк")
+        companies = Company.objects.bulk_create(
+            Company(name=f"Бенч компания {chr(1040 + i % 32)}{i}", country=country)
+            for i in range(200)
+        )
+        categories = Category.objects.bulk_create(
+            Category(name=f"Бенч категория {chr(1040 + i % 32)}{i}") for i in range(30)
+        )
+        batch = []
+        for i in range(count):
+            name = (
+                f"{random.choice(WORDS)} {random.choice(FLAVOURS)} "
+                f"{random.randint(10, 999)}г №{i}"
+            )
+            batch.append(
+                Product(
+                    name=name,
+                    company=random.choice(companies),
+                    category=random.choice(categories),
+                    ean_code=f"2{i:012d}",
+                    img_field="products/default_image.png",
+                )
+            )
+            if len(batch) == 5000:
+                Product.objects.bulk_create(batch)
+                batch = []
+        Product.objects.bulk_create(batch)
+        self.stdout.write(f"Создано продуктов: {count}")
@@ -0,0 +1,31 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from food_hub.models import Category, Company, Product, ProductRating, TasteTag
+from search_hub.engine import bump_search_version
+
+# Всё, от чего зависят найденные id: имена в векторе поиска
+# и теги оценок для фильтра
+WATCHED_MODELS = (Product, Company, Category, ProductRating, TasteTag)
+
+
+def _bump_after_commit(**kwargs):
+    # После коммита: иначе параллельный поиск успеет закэшировать
+    # ещё не закоммиченное состояние под новой версией
+    transaction.on_commit(bump_search_version)
+
+
+for model in WATCHED_MODELS:
+    for signal in (post_save, post_delete):
+        signal.connect(
+            _bump_after_commit,
+            sender=model,
+            dispatch_uid=f"search_version_{model.__name__}_{id(signal)}",
+        )
+
+
+@receiver(m2m_changed, sender=ProductRating.taste_tags.through)
+def bump_on_rating_tags_change(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        _bump_after_commit()
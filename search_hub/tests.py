@@ -1,7 +1,27 @@
 import pytest
+from django.core.cache import cache
+from django.db import connection
 from django.urls import reverse
 
 import food_hub.models as models
+from food_hub.aggregates import refresh_tag_stats
+from search_hub.engine import (
+    Stage,
+    filter_by_tags,
+    fuzzy_search,
+    search_product_ids,
+    search_products,
+    search_version,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Результаты поиска и подсказки кэшируются, а в тестах транзакции
+    # не коммитятся и версия поиска не меняется
+    cache.clear()
+    yield
+    cache.clear()
 
 
 @pytest.fixture
@@ -54,7 +74,7 @@ def setup_products(db, make_company, make_product, category, country):
         (" ", []),
         ("", []),
         ("МоРОЖЕное", ["Мороженое Сливочное Яшкино 20% 70г"]),
-        ("МаРОЖЕное", []),
+        ("МаРОЖЕное", ["Мороженое Сливочное Яшкино 20% 70г"]),
         ("Ваф", ["Вафли Яшкино 200г"]),
         ("Крем", ["Крем-брюле Бодрая Корова 200г"]),
         ("Крем-брюле Бодрая Корова 200г", ["Крем-брюле Бодрая Корова 200г"]),
@@ -103,6 +123,7 @@ def test_filter_by_multiple_tags_and(
 
     r_c = models.ProductRating.objects.create(product=p_c, rate=3)
     r_c.taste_tags.add(t2)
+    refresh_tag_stats()
 
     url = reverse("search_hub:product_search")
 
@@ -154,6 +175,7 @@ def test_filter_sort_by_number_of_matching_tags(
 
     r3 = models.ProductRating.objects.create(product=p3, rate=5)
     r3.taste_tags.add(t1)
+    refresh_tag_stats()
 
     url = reverse("search_hub:product_search")
     resp = client.get(url, {"tags": [t1.id, t2.id]})
@@ -188,6 +210,7 @@ def test_tags_only_filter(client, make_company, make_product, category, country)
 
     r_bad = models.ProductRating.objects.create(product=p_bad, rate=3)
     r_bad.taste_tags.add(t1)
+    refresh_tag_stats()
 
     url = reverse("search_hub:product_search")
     resp = client.get(url, {"tags": [t1.id, t2.id]})
@@ -214,6 +237,7 @@ def test_clear_action_removes_tags_and_shows_query_results(
 
     r_bad = models.ProductRating.objects.create(product=p_bad, rate=3)
     r_bad.taste_tags.add(t1)
+    refresh_tag_stats()
 
     url = reverse("search_hub:product_search")
 
@@ -238,3 +262,300 @@ def test_clear_action_removes_tags_and_shows_query_results(
     # И продукты возвращаются по текстовому запросу (оба продукта)
     names2 = list(resp2.context["products"].values_list("name", flat=True))
     assert set(names2) == {"Prod OK", "Prod BAD"}
+
+
+@pytest.mark.django_db
+def test_fts_stage_uses_stored_vector(client, setup_products):
+    url = reverse("search_hub:product_search")
+    response = client.get(url, {"query": "сливочное мороженое"})
+    found = list(response.context["products"].values_list("name", flat=True))
+    assert found == ["Мороженое Сливочное Яшкино 20% 70г"]
+    qs = search_products(models.Product.objects.all(), "сливочное мороженое")
+    assert "search_vector" in str(qs.query)
+
+
+@pytest.mark.django_db
+def test_fts_follows_company_rename(client, setup_products):
+    company = setup_products[2].company
+    company.name = "Молочная ферма"
+    company.save()
+    url = reverse("search_hub:product_search")
+    response = client.get(url, {"query": "ферма"})
+    found = list(response.context["products"].values_list("name", flat=True))
+    assert found == ["Крем-брюле Бодрая Корова 200г"]
+
+
+@pytest.mark.parametrize(
+    "query,stage",
+    [
+        ("Моро", Stage.PREFIX),
+        ("сливочное мороженое", Stage.FULLTEXT),
+        ("рожен", Stage.SUBSTRING),
+        ("мароженое", Stage.FUZZY),
+    ],
+)
+@pytest.mark.django_db
+def test_search_engine_single_query(
+    setup_products, query, stage, django_assert_num_queries
+):
+    qs = search_products(models.Product.objects.all(), query)
+    with django_assert_num_queries(1):
+        results = list(qs)
+    assert [p.name for p in results] == ["Мороженое Сливочное Яшкино 20% 70г"]
+    assert results[0].stage == stage
+
+
+@pytest.mark.django_db
+def test_search_with_tags_and_query(
+    client, make_company, make_product, category, country
+):
+    t1 = models.TasteTag.objects.create(name="t1", slug="t1", taste_type="P")
+    company = make_company("Comp")
+    p_ok = make_product(company, "Prod OK", "0000000000001")
+    make_product(company, "Prod BAD", "0000000000002")
+    make_product(company, "Other", "0000000000003")
+    models.ProductRating.objects.create(product=p_ok, rate=5).taste_tags.add(t1)
+    refresh_tag_stats()
+
+    url = reverse("search_hub:product_search")
+    resp = client.get(url, {"tags": [t1.id], "query": "Prod"})
+    names = list(resp.context["products"].values_list("name", flat=True))
+    assert names == ["Prod OK"]
+
+
+@pytest.mark.django_db
+def test_fuzzy_search_ranks_by_similarity(setup_products):
+    results = list(fuzzy_search(models.Product.objects.all(), "вофли яшкино"))
+    assert results[0].name == "Вафли Яшкино 200г"
+    assert results[0].rank >= results[-1].rank
+
+
+@pytest.mark.django_db
+def test_fuzzy_stage_respects_limit(settings, make_company, make_product):
+    settings.SEARCH_FUZZY_LIMIT = 2
+    company = make_company("Comp")
+    for i in range(4):
+        make_product(company, f"Мороженое {i}", f"000000000000{i}")
+    found = list(search_products(models.Product.objects.all(), "мароженое"))
+    assert len(found) == 2
+    assert {p.stage for p in found} == {Stage.FUZZY}
+
+
+@pytest.mark.django_db
+def test_fuzzy_stage_skips_short_queries(setup_products):
+    assert list(search_products(models.Product.objects.all(), "№2")) == []
+
+
+@pytest.mark.django_db
+def test_suggest_json(client, setup_products, clear_cache):
+    response = client.get(reverse("search_hub:suggest"), {"query": "Ваф"})
+    assert response.status_code == 200
+    data = response.json()
+    assert {"kind": "product", "label": "Вафли Яшкино 200г"} in data["suggestions"]
+    assert {"kind": "company", "label": "Вафельный комбинат"} in data["suggestions"]
+
+
+@pytest.mark.django_db
+def test_suggest_htmx_partial(client, setup_products, clear_cache):
+    response = client.get(
+        reverse("search_hub:suggest"), {"query": "Крем"}, headers={"HX-Request": "true"}
+    )
+    assert response.templates[0].name == "search_hub/partials/suggestions.html"
+    assert "Крем-брюле Бодрая Корова 200г" in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_suggest_respects_limit(
+    client, settings, make_company, make_product, clear_cache
+):
+    settings.SEARCH_SUGGEST_LIMIT = 3
+    company = make_company("Comp")
+    for i in range(5):
+        make_product(company, f"Пломбир {i}", f"000000000000{i}")
+    response = client.get(reverse("search_hub:suggest"), {"query": "Пломбир"})
+    assert len(response.json()["suggestions"]) == 3
+
+
+@pytest.mark.django_db
+def test_suggest_short_prefix_is_cached(
+    client, setup_products, clear_cache, django_assert_num_queries
+):
+    url = reverse("search_hub:suggest")
+    client.get(url, {"query": "Мор"})
+    with django_assert_num_queries(0):
+        response = client.get(url, {"query": "мор"})
+    assert response.json()["suggestions"][0]["label"].startswith("Мороженое")
+
+
+@pytest.mark.django_db
+def test_suggest_fuzzy_fill(client, setup_products, clear_cache):
+    response = client.get(reverse("search_hub:suggest"), {"query": "мароженое"})
+    labels = [item["label"] for item in response.json()["suggestions"]]
+    assert labels == ["Мороженое Сливочное Яшкино 20% 70г"]
+
+
+@pytest.mark.django_db
+def test_suggest_empty_query(client, clear_cache, django_assert_num_queries):
+    with django_assert_num_queries(0):
+        response = client.get(reverse("search_hub:suggest"), {"query": "  "})
+    assert response.json()["suggestions"] == []
+
+
+@pytest.mark.django_db
+def test_search_results_are_cached(client, setup_products, django_assert_num_queries):
+    url = reverse("search_hub:product_search")
+    client.get(url, {"query": "Моро"})
+    # Повторный запрос: id из кэша - версия поиска, меню тегов,
+    # выборка карточек по pk и prefetch тегов
+    with django_assert_num_queries(4):
+        response = client.get(url, {"query": "  моро "})
+    names = [p.name for p in response.context["products"]]
+    assert names == ["Мороженое Сливочное Яшкино 20% 70г"]
+
+
+@pytest.mark.django_db
+def test_search_cache_key_ignores_tag_order(setup_products, django_assert_num_queries):
+    t1 = models.TasteTag.objects.create(name="t1", slug="t1", taste_type="P")
+    t2 = models.TasteTag.objects.create(name="t2", slug="t2", taste_type="P")
+    search_product_ids("Ваф", [t1.pk, t2.pk])
+    # Только чтение версии поиска
+    with django_assert_num_queries(1):
+        search_product_ids("Ваф", [t2.pk, t1.pk, t1.pk])
+
+
+@pytest.mark.django_db
+def test_hydrated_results_keep_search_order(client, make_company, make_product):
+    company = make_company("Comp")
+    for i, name in enumerate(["Мороженое ванильное", "Мороженое", "Мороженка"]):
+        make_product(company, name, f"000000000000{i}")
+    expected = list(
+        search_products(models.Product.objects.all(), "мороженое").values_list(
+            "name", flat=True
+        )
+    )
+    response = client.get(reverse("search_hub:product_search"), {"query": "мороженое"})
+    assert [p.name for p in response.context["products"]] == expected
+
+
+@pytest.mark.django_db(transaction=True)
+def test_search_version_bumped_on_change(make_company, make_product):
+    company = make_company("Comp")
+    version = search_version()
+    product = make_product(company, "Вафли", "0000000000001")
+    assert search_version() != version
+
+    version = search_version()
+    models.ProductRating.objects.create(product=product, rate=5)
+    assert search_version() != version
+
+    version = search_version()
+    assert search_product_ids("Пломбир", []) == []
+    product.name = "Пломбир"
+    product.save()
+    assert search_version() != version
+    assert search_product_ids("Пломбир", []) == [product.pk]
+
+
+@pytest.mark.django_db
+def test_tag_filter_counts_tags_not_ratings(make_company, make_product):
+    t1 = models.TasteTag.objects.create(name="t1", slug="t1", taste_type="P")
+    t2 = models.TasteTag.objects.create(name="t2", slug="t2", taste_type="P")
+    company = make_company("Comp")
+    split = make_product(company, "Split", "0000000000001")
+    repeated = make_product(company, "Repeated", "0000000000002")
+    # Теги из разных оценок одного продукта складываются
+    models.ProductRating.objects.create(product=split, rate=5).taste_tags.add(t1)
+    models.ProductRating.objects.create(product=split, rate=4).taste_tags.add(t2)
+    # Один тег в двух оценках не заменяет второй тег
+    for rate in (5, 3):
+        models.ProductRating.objects.create(product=repeated, rate=rate).taste_tags.add(
+            t1
+        )
+    # Фильтр читает агрегат ProductTagStat
+    refresh_tag_stats()
+
+    found = filter_by_tags(models.Product.objects.all(), [t1.pk, t2.pk])
+    assert list(found.values_list("name", flat=True)) == ["Split"]
+    assert "array_agg" not in str(found.query).lower()
+
+
+@pytest.fixture
+def many_products(make_company, make_product):
+    company = make_company("Comp")
+    return [
+        make_product(company, f"Мороженое {i:02d}", f"{i:013d}") for i in range(30)
+    ]
+
+
+@pytest.mark.django_db
+def test_search_is_paginated(client, settings, many_products):
+    settings.SEARCH_PAGE_SIZE = 10
+    url = reverse("search_hub:product_search")
+    response = client.get(url, {"query": "Моро"})
+    assert len(response.context["products"]) == 10
+    assert response.context["total_count"] == 30
+    assert response.context["total_is_estimate"] is False
+    assert 'hx-trigger="click, revealed"' in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_search_pages_cover_results_once(client, settings, many_products):
+    settings.SEARCH_PAGE_SIZE = 12
+    url = reverse("search_hub:product_search")
+    seen = []
+    page = 1
+    while True:
+        response = client.get(
+            url, {"query": "Моро", "page": page}, headers={"HX-Request": "true"}
+        )
+        assert response.templates[0].name == "search_hub/partials/results_page.html"
+        seen.extend(p.pk for p in response.context["products"])
+        if not response.context["page_obj"].has_next():
+            break
+        page += 1
+    assert sorted(seen) == sorted(p.pk for p in many_products)
+    assert len(seen) == len(set(seen))
+    assert "feed-more" not in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_search_page_size_is_clamped(client, settings, many_products):
+    settings.SEARCH_MAX_PAGE_SIZE = 5
+    url = reverse("search_hub:product_search")
+    response = client.get(url, {"query": "Моро", "page_size": 1000})
+    assert len(response.context["products"]) == 5
+    response = client.get(url, {"query": "Моро", "page_size": "abc"})
+    assert len(response.context["products"]) == 5
+
+
+@pytest.mark.django_db
+def test_search_total_is_estimate_at_limit(client, settings, many_products):
+    settings.SEARCH_MAX_RESULTS = 20
+    response = client.get(reverse("search_hub:product_search"), {"query": "Моро"})
+    assert response.context["total_count"] == 20
+    assert response.context["total_is_estimate"] is True
+    assert "Найдено: 20+" in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_suggest_prefix_uses_trigram_index(setup_products):
+    with connection.cursor() as cursor:
+        cursor.execute("SET LOCAL enable_seqscan = off")
+    plan = models.Product.objects.filter(name__iprefix="Мор").order_by().explain()
+    assert "product_name_trgm_gin" in plan
+    # istartswith сравнивает UPPER(name) - индекс по name ему не подходит
+    plan = (
+        models.Product.objects.filter(name__istartswith="Мор").order_by().explain()
+    )
+    assert "product_name_trgm_gin" not in plan
+
+
+@pytest.mark.django_db
+def test_iprefix_escapes_wildcards(make_company, make_product):
+    company = make_company("Comp")
+    make_product(company, "100% сок", "0000000000001")
+    make_product(company, "1000 мелочей", "0000000000002")
+    names = models.Product.objects.filter(name__iprefix="100%").values_list(
+        "name", flat=True
+    )
+    assert list(names) == ["100% сок"]
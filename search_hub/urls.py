@@ -5,4 +5,5 @@ app_name = 'search_hub'
 
 urlpatterns = [
     path("", views.ProductSearchView.as_view(), name="product_search"),
+    path("suggest/", views.SuggestView.as_view(), name="suggest"),
 ]
@@ -1,27 +1,43 @@
-﻿from django.contrib.postgres.aggregates import ArrayAgg
-from django.contrib.postgres.search import (SearchQuery, SearchRank,
-                                            SearchVector)
-from django.db.models import Q
+﻿from django.conf import settings
+from django.http import JsonResponse
+from django.shortcuts import render
+from django.views import View
 from django.views.generic import ListView
 
 from food_hub.models import Product
+from search_hub.engine import hydrate_products, search_product_ids, suggest
 from search_hub.forms import SearchForm, TagSelectorForm
 
 
 class ProductSearchView(ListView):
     model = Product
     template_name = "search_hub/search_page.html"
+    partial_template_name = "search_hub/partials/results_page.html"
     context_object_name = "products"
 
-    def get_queryset(self):
-        # Формирование базового queryset
-        # ArrayAgg собирает значения из нескольких строк в один массив
-        # distunct=True - убираем дубликаты
-        qs = (
-            Product.objects.select_related("company", "category")
-            .prefetch_related("ratings__taste_tags")
-            .annotate(tag_names=ArrayAgg("ratings__taste_tags__name", distinct=True))
+    def get_template_names(self):
+        # Бесконечная прокрутка: HTMX получает только следующую страницу карточек
+        if self.request.htmx:
+            return [self.partial_template_name]
+        return [self.template_name]
+
+    def get_paginate_by(self, queryset):
+        try:
+            page_size = int(
+                self.request.GET.get("page_size", settings.SEARCH_PAGE_SIZE)
+            )
+        except ValueError:
+            page_size = settings.SEARCH_PAGE_SIZE
+        return max(1, min(page_size, settings.SEARCH_MAX_PAGE_SIZE))
+
+    def paginate_queryset(self, queryset, page_size):
+        # Страницы режутся из списка id, карточки загружаются только для текущей
+        paginator, page, ids, is_paginated = super().paginate_queryset(
+            queryset, page_size
         )
+        return paginator, page, hydrate_products(ids), is_paginated
+
+    def get_queryset(self):
         get_data = self.request.GET.copy()
         if get_data.get("action") == "clear":
             get_data.pop("tags", None)
@@ -33,53 +49,18 @@ class ProductSearchView(ListView):
         if tag_form.is_valid():
             # flat - ['values'] вместо [('values',)]
             tag_ids = list(tag_form.cleaned_data["tags"].values_list("id", flat=True))
-            if tag_ids:
-                qs = qs.annotate(
-                    tag_ids=ArrayAgg("ratings__taste_tags__id", distinct=True)
-                    )
-                qs = qs.filter(tag_ids__contains=tag_ids)
 
         # Поисковая форма
         self.searchform = SearchForm(self.request.GET)
         if not self.searchform.is_valid():
-            return qs.none()
+            return []
 
         query = (self.searchform.cleaned_data.get("query") or "").strip()
-        if not query:
-            if tag_ids:
-                return qs.distinct()
-            return qs.none()
-        # Префикс поиск
-        prefix_qs = qs.filter(
-            Q(name__istartswith=query)
-            | Q(company__name__istartswith=query)
-            | Q(category__name__istartswith=query)
-        ).order_by("name")
-        if prefix_qs.exists():
-            return prefix_qs
-        # FTS поиск
-        vector = (  # Приоритет поиска - name, company name, category name
-            SearchVector("name", weight="A", config="russian")
-            + SearchVector("company__name", weight="B", config="russian")
-            + SearchVector("category__name", weight="C", config="russian")
-        )
-        search_query = SearchQuery(query, config="russian", search_type="websearch")
-        # SearchRank вычисляет релевантность (вес совпадения) для сортировки результатов
-        fts_qs = (
-            qs.annotate(search=vector, rank=SearchRank(vector, search_query))
-            .filter(search=search_query)
-            .order_by("-rank", "name")
-        )
-
-        if fts_qs.exists():
-            return fts_qs
-
-        # icontains поиск
-        return qs.filter(
-            Q(name__icontains=query)
-            | Q(company__name__icontains=query)
-            | Q(category__name__icontains=query)
-        ).order_by("name")
+        if not query and not tag_ids:
+            return []
+        # Поиск возвращает (возможно из кэша) только упорядоченные id,
+        # карточки догружаются по первичному ключу в paginate_queryset
+        return search_product_ids(query, tag_ids)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -88,4 +69,24 @@ class ProductSearchView(ListView):
             self, "_tag_form_for_context", TagSelectorForm(self.request.GET)
             )
         context["query"] = self.request.GET.get("query", "")
+        # Точный COUNT(*) не нужен: id уже в памяти, а при упоре в
+        # SEARCH_MAX_RESULTS итог показывается как "N+"
+        context["total_count"] = len(self.object_list)
+        context["total_is_estimate"] = (
+            len(self.object_list) >= settings.SEARCH_MAX_RESULTS
+        )
         return context
+
+
+class SuggestView(View):
+    partial_template_name = "search_hub/partials/suggestions.html"
+
+    def get(self, request):
+        query = request.GET.get("query", "")[:100]
+        suggestions = suggest(query)
+        # HTMX получает готовый список, остальные клиенты - JSON
+        if request.htmx:
+            return render(
+                request, self.partial_template_name, {"suggestions": suggestions}
+            )
+        return JsonResponse({"query": query, "suggestions": suggestions})
@@ -16,7 +16,9 @@
       clearBtn.style.display = 'none';                                                              
                                               
       const results = document.querySelector('.search-results');                                    
-      if (results) results.innerHTML = '';                                                          
+      if (results) results.innerHTML = '';
+      const suggestions = document.getElementById('search-suggestions');
+      if (suggestions) suggestions.innerHTML = '';                                                          
     });                                                                                             
                                                                                                     
     toggleClear();                                                                                  